@@ -10,21 +10,32 @@ Setup:
   - Configure .env (model endpoint, MCP command, LINUX_MCP_USER for remote hosts).
   - Use an instruction-tuned model for best tool-use behavior.
 """
+import functools
+import itertools
 import os
+import threading
 import traceback
 import json
 import time
 import requests
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from typing import Any, Optional
 
 import streamlit as st
 from dotenv import load_dotenv
 from langchain.agents import create_agent
-from langchain.agents.middleware.types import wrap_model_call
+from langchain.agents.middleware.types import AgentMiddleware
 from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import StructuredTool
 from langchain_openai import ChatOpenAI
-from pydantic import BaseModel, ConfigDict
+from langgraph.config import get_config
+from pydantic import BaseModel, ConfigDict, Field
+
+try:
+    from streamlit.runtime.scriptrunner import add_script_run_ctx
+except ImportError:
+    add_script_run_ctx = None
 
 try:
     from langchain_anthropic import ChatAnthropic, ChatAnthropicVertex
@@ -51,7 +62,24 @@ try:
 except ImportError:
     HAS_GOOGLE_GENAI = False
 
-from mcp_client import LinuxMCPClient, MCPClientError
+from mcp_cache import DEFAULT_MAX_BYTES, ToolResultCache, parse_ttls
+from mcp_catalog import DEFAULT_CATALOG_DIR, ToolCatalogCache, catalog_key, normalize_tools
+from mcp_client import (
+    HostLimitedMCPClient,
+    LinuxMCPClient,
+    MCPClientError,
+    SingleFlightMCPClient,
+    ToolCallBatcher,
+)
+from mcp_pool import HostShardedMCPClient, LinuxMCPClientPool, SupervisedMCPClient
+from mcp_reducers import DEFAULT_TOP_N, reduce_output
+from mcp_client_async import AsyncLinuxMCPClient, BlockingMCPClient, EventLoopThread
+from inventory import DEFAULT_SSH_CONFIG, inventory_groups, inventory_hosts, load_hosts, mentioned_hosts
+from mcp_fleet import DEFAULT_PARALLEL, arun_fleet, format_fleet, run_fleet
+from mcp_snapshots import DEFAULT_SNAPSHOT_DB, SnapshotCollector, SnapshotStore, format_age
+from mcp_delta import DEFAULT_DELTA_TOOLS, ObservationLog
+from mcp_metrics import DEFAULT_CAPACITY, DEFAULT_MAX_HOSTS, HAS_NUMPY, MetricSampler, MetricStore, format_history
+from mcp_anomaly import DEFAULT_BASELINE, DEFAULT_THRESHOLD, detect, format_anomalies
 from claude_vertex_wrapper import ClaudeVertexChat
 
 load_dotenv()
@@ -70,13 +98,98 @@ GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "").strip() or None
 GOOGLE_PROJECT_ID = os.getenv("GOOGLE_PROJECT_ID", "").strip() or None
 GOOGLE_LOCATION = os.getenv("GOOGLE_LOCATION", "us-central1").strip()
 REQUEST_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", "120"))
+# End-to-end budget for one question (all agent steps); each MCP call gets what is left
+QUERY_TIMEOUT = int(os.getenv("QUERY_TIMEOUT", "300"))
+# Seconds kept back from tool calls so the model can still summarize before the deadline
+QUERY_SUMMARY_RESERVE = float(os.getenv("QUERY_SUMMARY_RESERVE", "20"))
 MODEL_CONTEXT_TOKENS = int(os.getenv("MODEL_CONTEXT_TOKENS", "4096"))
 MAX_TOOL_OUTPUT_CHARS = int(os.getenv("MAX_TOOL_OUTPUT_CHARS", "2400"))
 # Tool choice sent to the API: "none" (vLLM without --enable-auto-tool-choice), "auto", or "required"
 TOOL_CHOICE = (os.getenv("TOOL_CHOICE", "none").strip().lower() or "none")
+# Async MCP client: run each round of tool calls concurrently on one event loop (graph.ainvoke)
+MCP_ASYNC = os.getenv("MCP_ASYNC", "false").strip().lower() in ("1", "true", "yes")
+# Number of linux-mcp-server subprocesses; calls go to the least-loaded one (sync client only)
+MCP_POOL_SIZE = max(1, int(os.getenv("MCP_POOL_SIZE", "1")))
+# One subprocess per remote host so a slow host can't stall the others (sync client only)
+MCP_HOST_AFFINITY = os.getenv("MCP_HOST_AFFINITY", "false").strip().lower() in ("1", "true", "yes")
+MCP_MAX_HOST_WORKERS = int(os.getenv("MCP_MAX_HOST_WORKERS", "16"))
+MCP_HOST_IDLE_TIMEOUT = float(os.getenv("MCP_HOST_IDLE_TIMEOUT", "600"))
+# Restart the MCP server if it exits; with a warm standby, failover takes milliseconds (sync client only)
+MCP_SUPERVISE = os.getenv("MCP_SUPERVISE", "true").strip().lower() in ("1", "true", "yes")
+MCP_WARM_STANDBY = os.getenv("MCP_WARM_STANDBY", "true").strip().lower() in ("1", "true", "yes")
+# Largest MCP message kept whole (bytes); bigger tool results are truncated while being read (0 = no limit)
+MCP_MAX_MESSAGE_BYTES = int(os.getenv("MCP_MAX_MESSAGE_BYTES", str(8 * 1024 * 1024)))
+# Collect tool calls started within this many ms of a call in flight and write them together (0 = off,
+# sync client only); a lone call is sent right away
+MCP_BATCH_WINDOW_MS = float(os.getenv("MCP_BATCH_WINDOW_MS", "0"))
+# Max concurrent tool calls per remote host, below sshd's MaxSessions/MaxStartups (0 = unlimited)
+MCP_MAX_CALLS_PER_HOST = int(os.getenv("MCP_MAX_CALLS_PER_HOST", "4"))
+# MCP server warnings/errors (from its stderr) shown in the sidebar
+MCP_STDERR_SHOW = int(os.getenv("MCP_STDERR_SHOW", "20"))
+# Build the MCP server, tools and agent in the background as soon as the app process runs
+WARMUP = os.getenv("WARMUP", "true").strip().lower() in ("1", "true", "yes")
+# File created once warm-up has finished (for exec readiness probes); empty = none
+WARMUP_READY_FILE = os.getenv("WARMUP_READY_FILE", "").strip()
+# Reuse recent results of read-only tools: per-tool TTLs ("tool=seconds,...") override the built-in ones
+TOOL_CACHE = os.getenv("TOOL_CACHE", "true").strip().lower() in ("1", "true", "yes")
+TOOL_CACHE_TTLS = parse_ttls(os.getenv("TOOL_CACHE_TTLS", ""))
+TOOL_CACHE_DEFAULT_TTL = float(os.getenv("TOOL_CACHE_DEFAULT_TTL", "0"))
+TOOL_CACHE_MAX_BYTES = int(os.getenv("TOOL_CACHE_MAX_BYTES", str(DEFAULT_MAX_BYTES)))
+# Keep the MCP tool catalog on disk so a cold start skips tools/list (checked in the background)
+TOOL_CATALOG_CACHE = os.getenv("TOOL_CATALOG_CACHE", "true").strip().lower() in ("1", "true", "yes")
+TOOL_CATALOG_DIR = os.path.expanduser(os.getenv("TOOL_CATALOG_DIR", "").strip()) or DEFAULT_CATALOG_DIR
+# Compact tabular tool output to the top N rows + counts; logs get repeats collapsed and both ends kept
+TOOL_OUTPUT_REDUCERS = os.getenv("TOOL_OUTPUT_REDUCERS", "true").strip().lower() in ("1", "true", "yes")
+TOOL_OUTPUT_TOP_N = int(os.getenv("TOOL_OUTPUT_TOP_N", str(DEFAULT_TOP_N)))
+# When a prompt names a known host, start these tools on it while the first LLM call runs (needs TOOL_CACHE)
+PREFETCH = os.getenv("PREFETCH", "true").strip().lower() in ("1", "true", "yes")
+PREFETCH_TOOLS = [t.strip() for t in os.getenv(
+    "PREFETCH_TOOLS", "get_system_information,get_cpu_information,get_memory_information,get_disk_usage"
+).split(",") if t.strip()]
+PREFETCH_MAX_HOSTS = int(os.getenv("PREFETCH_MAX_HOSTS", "4"))
+# Prefetched results stay cached at least this long (seconds), so they outlive the first LLM call
+PREFETCH_TTL = float(os.getenv("PREFETCH_TTL", "60"))
+# Known hosts: an inventory file (one host per line or Ansible INI) plus the SSH client config
+MCP_INVENTORY = os.path.expanduser(os.getenv("MCP_INVENTORY", "").strip())
+SSH_CONFIG_PATH = os.path.expanduser(os.getenv("SSH_CONFIG_PATH", "").strip()) or DEFAULT_SSH_CONFIG
+# Offer the agent a run_on_hosts tool: one MCP tool on many hosts (or an inventory group) in one call
+FLEET_TOOL = os.getenv("FLEET_TOOL", "true").strip().lower() in ("1", "true", "yes")
+FLEET_PARALLEL = int(os.getenv("FLEET_PARALLEL", str(DEFAULT_PARALLEL)))
+FLEET_MAX_HOSTS = int(os.getenv("FLEET_MAX_HOSTS", "100"))
+# Rows of reduced output kept per host in the fleet table
+FLEET_TOP_N = int(os.getenv("FLEET_TOP_N", "5"))
+# Answer slow-changing facts (OS, hardware, block devices, services) from a local SQLite snapshot store;
+# SNAPSHOT_TOOLS ("tool=max_age_seconds,...") override the built-in max ages
+SNAPSHOTS = os.getenv("SNAPSHOTS", "false").strip().lower() in ("1", "true", "yes")
+SNAPSHOT_DB = os.path.expanduser(os.getenv("SNAPSHOT_DB", "").strip()) or DEFAULT_SNAPSHOT_DB
+SNAPSHOT_TOOLS = parse_ttls(os.getenv("SNAPSHOT_TOOLS", ""))
+# Background collection over the MCP_INVENTORY hosts every this many seconds (0 = only store live results)
+SNAPSHOT_INTERVAL = float(os.getenv("SNAPSHOT_INTERVAL", "900"))
+SNAPSHOT_PARALLEL = int(os.getenv("SNAPSHOT_PARALLEL", "4"))
+# When a tool is re-run on the same host in a chat, say what changed since the last result: only the
+# changes while the last output is still in the agent's context (same question), else above the output;
+# DELTA_TOOLS (comma-separated) replaces the default list of diffed tools
+DELTA_MODE = os.getenv("DELTA_MODE", "true").strip().lower() in ("1", "true", "yes")
+DELTA_TOOLS = {t.strip() for t in os.getenv("DELTA_TOOLS", "").split(",") if t.strip()} or DEFAULT_DELTA_TOOLS
+# Sample CPU/memory/disk of the MCP_INVENTORY hosts (or the local host) every METRICS_INTERVAL seconds
+# into fixed-size ring buffers (needs numpy); the agent gets get_metric_history for trends
+METRICS = os.getenv("METRICS", "false").strip().lower() in ("1", "true", "yes")
+METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", "60"))
+# Samples kept per host and metric (1440 = one day at 60s)
+METRICS_CAPACITY = int(os.getenv("METRICS_CAPACITY", str(DEFAULT_CAPACITY)))
+METRICS_MAX_HOSTS = int(os.getenv("METRICS_MAX_HOSTS", str(DEFAULT_MAX_HOSTS)))
+METRICS_PARALLEL = int(os.getenv("METRICS_PARALLEL", "8"))
+# With METRICS, also offer find_anomalies: scores every sampled host against its own history and its
+# inventory group, from the ring buffers only (no calls to the hosts)
+ANOMALY_TOOL = os.getenv("ANOMALY_TOOL", "true").strip().lower() in ("1", "true", "yes")
+ANOMALY_THRESHOLD = float(os.getenv("ANOMALY_THRESHOLD", str(DEFAULT_THRESHOLD)))
+# Seconds of history each host is compared with
+ANOMALY_BASELINE = float(os.getenv("ANOMALY_BASELINE", str(DEFAULT_BASELINE)))
 
 # Cap tool output so the prompt fits in context
 _SAFE_CHARS = min(MAX_TOOL_OUTPUT_CHARS, int(MODEL_CONTEXT_TOKENS * 0.12 * 4))
+# One ID per agent run, so delta mode knows which earlier tool outputs the model still has
+_RUN_IDS = itertools.count(1)
 
 
 # -----------------------------------------------------------------------------
@@ -123,6 +236,24 @@ def _truncate(text: str) -> str:
     return text[:_SAFE_CHARS] + "\n\n... (truncated)"
 
 
+def _tool_output(name: str, text: str, args: Optional[dict] = None,
+                 observations: Optional[ObservationLog] = None, context=None) -> str:
+    """What the LLM sees of a tool result: reduced (if enabled), as changes (if seen before), then truncated.
+
+    `context` identifies the agent run: a repeat within it is sent as its changes only.
+    """
+    if not text:
+        return "(No output)"
+    if TOOL_OUTPUT_REDUCERS:
+        # Leave room for a change summary so that it doesn't push rows past the truncation
+        seen = observations is not None and observations.seen(name, args)
+        room = _SAFE_CHARS - (observations.summary_chars if seen else 0)
+        text = reduce_output(name, text, TOOL_OUTPUT_TOP_N, max(room, _SAFE_CHARS // 2))
+    if observations is not None:
+        text = observations.observe(name, args, text, context)
+    return _truncate(text)
+
+
 class _MCPToolArgs(BaseModel):
     """Schema for MCP tool args: optional host + any other params the tool accepts."""
 
@@ -132,30 +263,394 @@ class _MCPToolArgs(BaseModel):
     Host: Optional[str] = None  # some models send capital H
 
 
-def _make_tool(name: str, description: str, mcp: LinuxMCPClient):
-    """Build a LangChain tool that calls the MCP server (tool-calling: LLM sends a dict of args)."""
+def _tool_args(kwargs: dict) -> dict:
+    """Drop empty args and normalize "Host" to "host"."""
+    args = {k: v for k, v in kwargs.items() if v is not None and v != ""}
+    if "Host" in args and "host" not in args:
+        args["host"] = args.pop("Host")
+    return args
+
+
+_BUDGET_EXHAUSTED = (
+    "Error: the time budget for this question is used up. Do not call more tools; "
+    "answer with the data gathered so far and say what could not be checked."
+)
+
+
+def _tool_budget(config: Optional[RunnableConfig]) -> Optional[float]:
+    """Seconds left for tool calls in this query (None when no deadline was set)."""
+    deadline = ((config or {}).get("configurable") or {}).get("deadline")
+    if not deadline:
+        return None
+    return deadline - QUERY_SUMMARY_RESERVE - time.time()
+
+
+class _ToolActivity:
+    """Live record of one query's tool calls, fed by tool threads and drawn by the script thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = []
+
+    def start(self, name: str, args: dict) -> dict:
+        call = {"name": name, "host": args.get("host") or "local", "started": time.time(),
+                "finished": None, "ok": None, "status": "", "cached": False}
+        with self._lock:
+            self._calls.append(call)
+        return call
+
+    def update(self, call: dict, event: dict):
+        """on_progress callback target: keep the latest progress/log line for the call."""
+        if event.get("type") == "progress":
+            done, total = event.get("progress"), event.get("total")
+            status = f"{done}/{total}" if total else f"{done}"
+            if event.get("message"):
+                status += f" · {event['message']}"
+        else:
+            status = f"[{event.get('level', 'info')}] {event.get('message', '')}"
+        with self._lock:
+            call["status"] = status[:120]
+
+    def finish(self, call: dict, ok: bool, cached: bool = False, age: Optional[float] = None):
+        with self._lock:
+            call["finished"] = time.time()
+            call["ok"] = ok
+            call["cached"] = cached
+            call["age"] = age  # Set when answered from a snapshot
+
+    def render(self) -> str:
+        now = time.time()
+        lines = []
+        with self._lock:
+            for call in self._calls:
+                end = call["finished"] or now
+                icon = "⏳" if call["ok"] is None else ("✅" if call["ok"] else "⚠️")
+                line = f"{icon} `{call['name']}` on `{call['host']}` — {end - call['started']:.1f}s"
+                if call["status"] and call["ok"] is None:
+                    line += f" — {call['status']}"
+                if call.get("age") is not None:
+                    line += f" — snapshot, {format_age(call['age'])} old"
+                elif call["cached"]:
+                    line += " — cached"
+                lines.append(line)
+        return "\n\n".join(lines)
+
+
+def _make_tool(
+    name: str,
+    description: str,
+    mcp: LinuxMCPClient,
+    amcp: Optional[AsyncLinuxMCPClient] = None,
+    cache: Optional[ToolResultCache] = None,
+    snapshots: Optional[SnapshotStore] = None,
+):
+    """Build a LangChain tool that calls the MCP server (tool-calling: LLM sends a dict of args).
+
+    Each call's timeout is the remaining query budget (config["configurable"]["deadline"]), and
+    server progress is reported to config["configurable"]["activity"] (a _ToolActivity) when set.
+    With an async client, the tool also gets a coroutine so graph.ainvoke runs calls on one event loop.
+    Results are served from `cache` while fresh, unless config["configurable"]["bypass_cache"] is set
+    (the call then goes to the server and refreshes the entry). The cache keeps raw output; reducers
+    run on every read. After the cache, a young enough entry in `snapshots` answers, marked with its age.
+    With config["configurable"]["observations"] (the session's ObservationLog), repeated calls also say what changed;
+    within one config["configurable"]["run_id"] only the changes are sent.
+    """
+
+    def show(config: RunnableConfig, args: dict, out: str) -> str:
+        configurable = config.get("configurable") or {}
+        return _tool_output(name, out, args, configurable.get("observations"), configurable.get("run_id"))
 
-    def run(**kwargs: Any) -> str:
-        args = {k: v for k, v in kwargs.items() if v is not None and v != ""}
-        if "Host" in args and "host" not in args:
-            args["host"] = args.pop("Host")
+    def stored(config: RunnableConfig, args: dict, activity, call) -> Optional[str]:
+        """Tool output from the cache or a snapshot, or None to call the server."""
+        if (config.get("configurable") or {}).get("bypass_cache"):
+            return None
+        out = cache.get(name, args) if cache is not None else None
+        if out is not None:
+            if call:
+                activity.finish(call, True, cached=True)
+            return show(config, args, out)
+        snapshot = snapshots.get(name, args) if snapshots is not None else None
+        if snapshot is not None:
+            out, age = snapshot
+            if call:
+                activity.finish(call, True, cached=True, age=age)
+            return f"[snapshot, {format_age(age)} old]\n" + show(config, args, out)
+        return None
+
+    def remember(args: dict, out: str):
+        if cache is not None:
+            cache.put(name, args, out)
+        if snapshots is not None:
+            snapshots.put(name, args, out)
+
+    def run(config: RunnableConfig, **kwargs: Any) -> str:
+        budget = _tool_budget(config)
+        if budget is not None and budget <= 0:
+            return _BUDGET_EXHAUSTED
+        args = _tool_args(kwargs)
+        activity = (config.get("configurable") or {}).get("activity")
+        call = activity.start(name, args) if activity else None
+        hit = stored(config, args, activity, call)
+        if hit is not None:
+            return hit
+        ok = False
         try:
-            out = mcp.call_tool(name, args)
-            return _truncate(out or "(No output)")
+            out = mcp.call_tool(
+                name, args, timeout=budget, on_progress=functools.partial(activity.update, call) if call else None
+            )
+            ok = True
+            remember(args, out)
+            return show(config, args, out)
         except MCPClientError as e:
             return f"Error: {e}"
+        finally:
+            if call:
+                activity.finish(call, ok)
+
+    async def arun(config: RunnableConfig, **kwargs: Any) -> str:
+        budget = _tool_budget(config)
+        if budget is not None and budget <= 0:
+            return _BUDGET_EXHAUSTED
+        args = _tool_args(kwargs)
+        activity = (config.get("configurable") or {}).get("activity")
+        call = activity.start(name, args) if activity else None
+        hit = stored(config, args, activity, call)
+        if hit is not None:
+            return hit
+        ok = False
+        try:
+            out = await amcp.call_tool(
+                name, args, timeout=budget, on_progress=functools.partial(activity.update, call) if call else None
+            )
+            ok = True
+            remember(args, out)
+            return show(config, args, out)
+        except MCPClientError as e:
+            return f"Error: {e}"
+        finally:
+            if call:
+                activity.finish(call, ok)
 
     return StructuredTool.from_function(
         name=name,
         description=description or f"Call Linux MCP tool: {name}",
         func=run,
+        coroutine=arun if amcp is not None else None,
         args_schema=_MCPToolArgs,
     )
 
 
-def _build_tools(mcp: LinuxMCPClient) -> list:
+class _FleetArgs(BaseModel):
+    """Schema for run_on_hosts: which tool, on which hosts."""
+
+    tool: str = Field(description="Linux MCP tool to run on every host, e.g. get_disk_usage")
+    hosts: Optional[list[str] | str] = Field(None, description="Host names (list or comma-separated)")
+    group: Optional[str] = Field(None, description="Inventory group to use instead of hosts")
+    arguments: Optional[dict] = Field(None, description="Other arguments for the tool (host is set per call)")
+
+
+def _fleet_hosts(hosts, group: Optional[str]) -> list:
+    """Hosts for a fleet call: the given list, else the inventory group ("all" = every known host)."""
+    if isinstance(hosts, str):
+        hosts = hosts.replace(",", " ").split()
+    if hosts:
+        return list(dict.fromkeys(h for h in hosts if h))
+    if not group:
+        return []
+    groups = inventory_groups(MCP_INVENTORY) if MCP_INVENTORY else {}
+    if group in groups:
+        return groups[group]
+    return load_hosts(MCP_INVENTORY, SSH_CONFIG_PATH) if group == "all" else []
+
+
+def _make_fleet_tool(
+    tool_names: list,
+    mcp: LinuxMCPClient,
+    amcp: Optional[AsyncLinuxMCPClient] = None,
+    cache: Optional[ToolResultCache] = None,
+    snapshots: Optional[SnapshotStore] = None,
+):
+    """Build run_on_hosts: one MCP tool on many hosts concurrently, returned as one table.
+
+    Uses the same query budget, activity display, result cache and snapshots as the single-host tools.
+    """
+    name = "run_on_hosts"
+    groups = [g for g in (inventory_groups(MCP_INVENTORY) if MCP_INVENTORY else {}) if g != "ungrouped"]
+    description = (
+        "Run one Linux MCP tool on many hosts at once. Returns one table with status, latency and "
+        "compact output per host. Use this instead of calling a tool once per host. "
+        "Args: tool, hosts (list) or group, arguments (optional, other tool arguments)."
+        + (f" Inventory groups: {', '.join(groups)}." if groups else "")
+    )
+
+    def prepare(tool: str, hosts, group: Optional[str]):
+        """(host list, error text) for a call."""
+        if tool not in tool_names:
+            return [], f"Error: unknown tool {tool!r}. Available: {', '.join(tool_names)}"
+        targets = _fleet_hosts(hosts, group)
+        if not targets:
+            return [], f"Error: no hosts given{f' (unknown group {group!r})' if group else ''}."
+        if len(targets) > FLEET_MAX_HOSTS:
+            return [], f"Error: {len(targets)} hosts exceed FLEET_MAX_HOSTS ({FLEET_MAX_HOSTS}); narrow the list."
+        return targets, None
+
+    def tracker(config: RunnableConfig, tool: str, targets: list):
+        """(on_result, finish) callbacks that show "done/total" in the live tool activity."""
+        activity = (config.get("configurable") or {}).get("activity")
+        if not activity:
+            return None, lambda results: None
+        call = activity.start(f"{name}:{tool}", {"host": f"{len(targets)} hosts"})
+        done = itertools.count(1)
+
+        def on_result(result: dict):
+            activity.update(call, {"type": "progress", "progress": next(done), "total": len(targets),
+                                   "message": f"{result['host']} {'ok' if result['ok'] else 'failed'}"})
+
+        return on_result, lambda results: activity.finish(call, all(r["ok"] for r in results))
+
+    def run(config: RunnableConfig, tool: str, hosts=None, group: Optional[str] = None,
+            arguments: Optional[dict] = None) -> str:
+        budget = _tool_budget(config)
+        if budget is not None and budget <= 0:
+            return _BUDGET_EXHAUSTED
+        targets, error = prepare(tool, hosts, group)
+        if error:
+            return error
+        on_result, finish = tracker(config, tool, targets)
+        bypass = bool((config.get("configurable") or {}).get("bypass_cache"))
+        results = run_fleet(mcp, tool, targets, _tool_args(arguments or {}), parallel=FLEET_PARALLEL,
+                            timeout=budget, cache=cache, snapshots=snapshots, bypass_cache=bypass,
+                            on_result=on_result)
+        finish(results)
+        return _truncate(format_fleet(tool, results, _SAFE_CHARS, FLEET_TOP_N))
+
+    async def arun(config: RunnableConfig, tool: str, hosts=None, group: Optional[str] = None,
+                   arguments: Optional[dict] = None) -> str:
+        budget = _tool_budget(config)
+        if budget is not None and budget <= 0:
+            return _BUDGET_EXHAUSTED
+        targets, error = prepare(tool, hosts, group)
+        if error:
+            return error
+        on_result, finish = tracker(config, tool, targets)
+        bypass = bool((config.get("configurable") or {}).get("bypass_cache"))
+        results = await arun_fleet(amcp, tool, targets, _tool_args(arguments or {}), parallel=FLEET_PARALLEL,
+                                   timeout=budget, cache=cache, snapshots=snapshots, bypass_cache=bypass,
+                                   on_result=on_result)
+        finish(results)
+        return _truncate(format_fleet(tool, results, _SAFE_CHARS, FLEET_TOP_N))
+
+    return StructuredTool.from_function(
+        name=name,
+        description=description,
+        func=run,
+        coroutine=arun if amcp is not None else None,
+        args_schema=_FleetArgs,
+    )
+
+
+class _MetricHistoryArgs(BaseModel):
+    """Schema for get_metric_history."""
+
+    host: Optional[str] = Field(None, description="Host name (omit for the local machine)")
+    metric: Optional[str] = Field(None, description="Only metrics whose name contains this, e.g. load, mem, disk")
+    minutes: int = Field(60, description="Window length in minutes")
+    points: int = Field(12, description="Number of averaged points in the trend")
+
+
+def _make_metrics_tool(store: MetricStore):
+    """Build get_metric_history: trends from the sampled ring buffers, without calling the host."""
+    description = (
+        f"History of sampled CPU load, memory and disk usage for a host (one sample every "
+        f"{METRICS_INTERVAL:.0f}s): min/max/mean/p95/last, slope per hour and a downsampled trend. "
+        "Use it for questions about trends or changes over time. Args: host, metric (optional filter), "
+        "minutes (window, default 60), points (default 12)."
+    )
+
+    def run(host: Optional[str] = None, metric: Optional[str] = None, minutes: int = 60, points: int = 12) -> str:
+        return _truncate(format_history(store, host, metric or "", max(1, minutes) * 60, max(1, min(points, 60))))
+
+    return StructuredTool.from_function(
+        name="get_metric_history",
+        description=description,
+        func=run,
+        args_schema=_MetricHistoryArgs,
+    )
+
+
+class _AnomalyArgs(BaseModel):
+    """Schema for find_anomalies."""
+
+    group: Optional[str] = Field(None, description="Only report hosts of this inventory group")
+    hosts: Optional[list[str] | str] = Field(None, description="Only report these hosts (list or comma-separated)")
+    metric: Optional[str] = Field(None, description="Only metrics whose name contains this, e.g. load, mem, disk")
+
+
+def _make_anomaly_tool(store: MetricStore):
+    """Build find_anomalies: fleet-wide outlier scores over the sampled metrics, without calling any host."""
+    description = (
+        "Find hosts that look abnormal right now, from the sampled CPU load, memory and disk metrics of "
+        "every host: compared with each host's own recent history and with its inventory group, plus "
+        "sudden jumps, disks about to fill up and hosts that stopped answering. Fast, no SSH. Use it for "
+        "'which hosts look abnormal?' before checking hosts one by one. Args: group or hosts (optional "
+        "filter), metric (optional filter)."
+    )
+
+    def run(group: Optional[str] = None, hosts=None, metric: Optional[str] = None) -> str:
+        targets = _fleet_hosts(hosts, group)
+        if (group or hosts) and not targets:
+            return f"Error: no hosts given{f' (unknown group {group!r})' if group else ''}."
+        groups = inventory_groups(MCP_INVENTORY) if MCP_INVENTORY else {}
+        report = detect(store, groups, targets or None, metric or "", ANOMALY_BASELINE, ANOMALY_THRESHOLD)
+        return _truncate(format_anomalies(report, ANOMALY_THRESHOLD))
+
+    return StructuredTool.from_function(
+        name="find_anomalies",
+        description=description,
+        func=run,
+        args_schema=_AnomalyArgs,
+    )
+
+
+def _revalidate_catalog(mcp: LinuxMCPClient, catalog: ToolCatalogCache, key: str, cached: list):
+    """Compare the catalog used at startup with the live tools/list; rebuild the agent if it changed."""
     try:
+        live = normalize_tools(mcp.list_tools())
+    except Exception as e:
+        print(f"[WARN] Could not check the cached tool catalog: {e}")
+        return
+    if live and live != cached:
+        print(f"[WARN] MCP tool catalog changed ({len(cached)} -> {len(live)} tools); rebuilding the agent")
+        catalog.save(key, live)
+        _get_graph.clear()  # Next script run builds the agent from the new catalog
+
+
+def _list_tools(mcp: LinuxMCPClient, catalog: Optional[ToolCatalogCache] = None) -> list:
+    """tools/list, or the catalog saved for this server build (then checked against the server in the background)."""
+    if catalog is None:
+        return mcp.list_tools()
+    mcp._initialize()
+    key = catalog_key(MCP_COMMAND.strip(), mcp.server_info)
+    cached = catalog.load(key)
+    if cached is None:
         raw = mcp.list_tools()
+        catalog.save(key, normalize_tools(raw))
+        return raw
+    print(f"[DEBUG] Using cached tool catalog ({len(cached)} tools); checking it in the background")
+    threading.Thread(target=_revalidate_catalog, args=(mcp, catalog, key, cached), daemon=True).start()
+    return cached
+
+
+def _build_tools(
+    mcp: LinuxMCPClient,
+    amcp: Optional[AsyncLinuxMCPClient] = None,
+    cache: Optional[ToolResultCache] = None,
+    catalog: Optional[ToolCatalogCache] = None,
+    snapshots: Optional[SnapshotStore] = None,
+    metrics: Optional[MetricStore] = None,
+) -> list:
+    try:
+        raw = _list_tools(mcp, catalog)
     except Exception:
         raw = []
     if not raw:
@@ -182,44 +677,257 @@ def _build_tools(mcp: LinuxMCPClient) -> list:
             ("list_files", "List files under path. Args: path, order_by, sort, top_n (optional)."),
             ("read_file", "Read a file. Args: path, lines (optional)."),
         ]
-        return [_make_tool(n, d, mcp) for n, d in fallback]
-    tools = []
-    for t in raw:
-        if isinstance(t, dict):
-            n, d = t.get("name"), t.get("description") or ""
-        else:
-            n, d = getattr(t, "name", None) or str(t), ""
-        if n:
-            tools.append(_make_tool(n, d, mcp))
+        tools = [_make_tool(n, d, mcp, amcp, cache, snapshots) for n, d in fallback]
+    else:
+        tools = []
+        for t in raw:
+            if isinstance(t, dict):
+                n, d = t.get("name"), t.get("description") or ""
+            else:
+                n, d = getattr(t, "name", None) or str(t), ""
+            if n:
+                tools.append(_make_tool(n, d, mcp, amcp, cache, snapshots))
+    if FLEET_TOOL and tools:
+        tools.append(_make_fleet_tool([t.name for t in tools], mcp, amcp, cache, snapshots))
+    if metrics is not None and tools:
+        tools.append(_make_metrics_tool(metrics))
+        if ANOMALY_TOOL:
+            tools.append(_make_anomaly_tool(metrics))
     return tools
 
 
-SYSTEM_PROMPT = """You are a Linux system diagnostics assistant. Use the provided tools to answer the user. For a REMOTE Linux host, always pass "host" in the tool arguments (e.g. {"host": "demo.example.local"}). For the local machine, you may omit host or use {}. Summarize results clearly."""
+SYSTEM_PROMPT = """You are a Linux system diagnostics assistant. Use the provided tools to answer the user. For a REMOTE Linux host, always pass "host" in the tool arguments (e.g. {"host": "demo.example.local"}). For the local machine, you may omit host or use {}. A result starting with "[snapshot, <age> old]" comes from stored data; say how old it is in your answer. Summarize results clearly."""
 
 
-@wrap_model_call
-def _tool_choice_middleware(request, handler):
+class _ToolChoiceMiddleware(AgentMiddleware):
     """Override tool_choice so vLLM (and similar) accept the request when they don't support "auto"."""
-    return handler(request.override(tool_choice=TOOL_CHOICE))
+
+    def wrap_model_call(self, request, handler):
+        return handler(request.override(tool_choice=TOOL_CHOICE))
+
+    async def awrap_model_call(self, request, handler):
+        # Needed for graph.ainvoke (MCP_ASYNC); sync-only middleware can't run there
+        return await handler(request.override(tool_choice=TOOL_CHOICE))
+
+
+class _DeadlineMiddleware(AgentMiddleware):
+    """Once the query's tool budget is spent, tell the model to stop calling tools and summarize."""
+
+    def _apply(self, request):
+        try:
+            budget = _tool_budget(get_config())
+        except RuntimeError:
+            return request
+        if budget is None or budget > 0:
+            return request
+        note = (
+            "The time budget for this question is used up. Do not call any more tools. "
+            "Answer now using only the tool results already gathered, and say what could not be checked."
+        )
+        return request.override(system_prompt=f"{request.system_prompt or SYSTEM_PROMPT}\n\n{note}")
+
+    def wrap_model_call(self, request, handler):
+        return handler(self._apply(request))
+
+    async def awrap_model_call(self, request, handler):
+        return await handler(self._apply(request))
 
 
 @st.cache_resource
-def _get_graph(_key: tuple):
-    """Build MCP client, tools, LLM, and LangChain agent (cached by config key)."""
-    # Extract model name from the key tuple (last element)
-    model_name = _key[3] if len(_key) > 3 else MODEL_NAME
+def _get_event_loop() -> EventLoopThread:
+    """Process-wide event loop that owns the async MCP client and runs graph.ainvoke."""
+    return EventLoopThread()
+
 
+def _create_mcp_clients(cmd: str, mcp_args: list, env: dict):
+    """Create the MCP client stack from config. Returns (sync client, async client or None)."""
+    if MCP_ASYNC:
+        print(f"[DEBUG] Creating async MCP client: {cmd}")
+        runner = _get_event_loop()
+        amcp = runner.run(
+            AsyncLinuxMCPClient.stdio(cmd, args=mcp_args or None, env=env or None, per_host=MCP_MAX_CALLS_PER_HOST)
+        )
+        return BlockingMCPClient(amcp, runner), amcp
+
+    base_cls = functools.partial(LinuxMCPClient, max_message_bytes=MCP_MAX_MESSAGE_BYTES or None)
+    if MCP_SUPERVISE:
+        client_cls = functools.partial(SupervisedMCPClient, standby=MCP_WARM_STANDBY, client_factory=base_cls)
+    else:
+        client_cls = base_cls
+    if MCP_POOL_SIZE > 1:
+        print(f"[DEBUG] Creating MCP client pool: {MCP_POOL_SIZE} x {cmd}")
+        mcp = LinuxMCPClientPool(cmd, args=mcp_args or None, env=env or None, size=MCP_POOL_SIZE, member_factory=client_cls)
+    else:
+        print(f"[DEBUG] Creating MCP client: {cmd} (supervised={MCP_SUPERVISE})")
+        mcp = client_cls(cmd, args=mcp_args or None, env=env or None)
+    if MCP_HOST_AFFINITY:
+        print(f"[DEBUG] Routing remote hosts to per-host MCP workers (max {MCP_MAX_HOST_WORKERS})")
+        mcp = HostShardedMCPClient(
+            cmd,
+            args=mcp_args or None,
+            env=env or None,
+            max_hosts=MCP_MAX_HOST_WORKERS,
+            idle_timeout=MCP_HOST_IDLE_TIMEOUT,
+            default=mcp,
+            client_factory=base_cls,
+        )
+    if MCP_BATCH_WINDOW_MS > 0:
+        mcp = ToolCallBatcher(mcp, window=MCP_BATCH_WINDOW_MS / 1000.0)
+    if MCP_MAX_CALLS_PER_HOST > 0:
+        # Above the batcher, so batches are formed from calls that already hold a host slot
+        mcp = HostLimitedMCPClient(mcp, per_host=MCP_MAX_CALLS_PER_HOST)
+    # Identical concurrent calls (same tool, host, args) share one request
+    return SingleFlightMCPClient(mcp), None
+
+
+@st.cache_resource
+def _get_mcp_clients():
+    """MCP server process(es), shared by every model/agent and the sidebar diagnostics."""
     parts = MCP_COMMAND.strip().split()
     cmd, mcp_args = (parts[0], parts[1:]) if parts else (MCP_COMMAND, [])
     env = {}
     if LINUX_MCP_USER:
         env["LINUX_MCP_USER"] = LINUX_MCP_USER
+    return _create_mcp_clients(cmd, mcp_args, env)
+
+
+@st.cache_resource
+def _get_tool_cache() -> Optional[ToolResultCache]:
+    """Process-wide tool result cache (shared by all sessions; None when TOOL_CACHE is off)."""
+    if not TOOL_CACHE:
+        return None
+    return ToolResultCache(TOOL_CACHE_TTLS, default_ttl=TOOL_CACHE_DEFAULT_TTL, max_bytes=TOOL_CACHE_MAX_BYTES)
+
+
+@st.cache_resource
+def _get_snapshot_store() -> Optional[SnapshotStore]:
+    """Process-wide snapshot store (None when SNAPSHOTS is off)."""
+    if not SNAPSHOTS:
+        return None
+    return SnapshotStore(SNAPSHOT_DB, SNAPSHOT_TOOLS)
+
+
+@st.cache_resource
+def _start_snapshot_collector() -> Optional[SnapshotCollector]:
+    """Background collector over the MCP_INVENTORY hosts (one per process)."""
+    store = _get_snapshot_store()
+    if store is None or not MCP_INVENTORY or SNAPSHOT_INTERVAL <= 0:
+        return None
+    print(f"[DEBUG] Collecting snapshots of {MCP_INVENTORY} hosts every {SNAPSHOT_INTERVAL:.0f}s")
+    return SnapshotCollector(
+        _get_mcp_clients()[0],
+        store,
+        lambda: inventory_hosts(MCP_INVENTORY),
+        interval=SNAPSHOT_INTERVAL,
+        parallel=SNAPSHOT_PARALLEL,
+        timeout=QUERY_TIMEOUT,
+    )
+
+
+@st.cache_resource
+def _get_metric_store() -> Optional[MetricStore]:
+    """Process-wide metric ring buffers (None when METRICS is off or numpy is missing)."""
+    if not METRICS:
+        return None
+    if not HAS_NUMPY:
+        print("[WARN] METRICS needs numpy (pip install numpy); metric sampling is off")
+        return None
+    return MetricStore(METRICS_CAPACITY, METRICS_MAX_HOSTS)
+
+
+@st.cache_resource
+def _start_metric_sampler() -> Optional[MetricSampler]:
+    """Background sampler over the MCP_INVENTORY hosts, or the local host without one (one per process)."""
+    store = _get_metric_store()
+    if store is None or METRICS_INTERVAL <= 0:
+        return None
+    print(f"[DEBUG] Sampling metrics every {METRICS_INTERVAL:.0f}s")
+    return MetricSampler(
+        _get_mcp_clients()[0],
+        store,
+        lambda: inventory_hosts(MCP_INVENTORY) if MCP_INVENTORY else [],
+        interval=METRICS_INTERVAL,
+        parallel=METRICS_PARALLEL,
+        timeout=min(QUERY_TIMEOUT, METRICS_INTERVAL),
+    )
+
+
+@st.cache_data(show_spinner=False, ttl=300)
+def _known_hosts() -> list:
+    """Hosts the prefetch stage recognizes in prompts (inventory + SSH config)."""
+    return load_hosts(MCP_INVENTORY, SSH_CONFIG_PATH)
+
+
+@st.cache_resource
+def _get_prefetch_executor() -> ThreadPoolExecutor:
+    """Background threads for speculative baseline tool calls (shared by all sessions)."""
+    return ThreadPoolExecutor(
+        max_workers=max(1, PREFETCH_MAX_HOSTS * len(PREFETCH_TOOLS)), thread_name_prefix="prefetch"
+    )
+
+
+def _prefetch_baseline(prompt: str, bypass_cache: bool) -> list:
+    """Start PREFETCH_TOOLS for the hosts named in the prompt; returns those hosts.
+
+    Results go into the tool cache. A tool call the agent makes while a prefetch is
+    still running joins it (single-flight) instead of starting a second one.
+    """
+    cache, snapshots = _get_tool_cache(), _get_snapshot_store()
+    hosts = mentioned_hosts(prompt, _known_hosts())[:PREFETCH_MAX_HOSTS] if cache is not None else []
+    if not hosts:
+        return []
+    mcp = _get_mcp_clients()[0]
 
-    print(f"[DEBUG] Creating MCP client: {cmd}")
-    mcp = LinuxMCPClient(cmd, args=mcp_args or None, env=env or None)
+    def fetch(name: str, args: dict):
+        try:
+            out = mcp.call_tool(name, args, timeout=QUERY_TIMEOUT)
+        except MCPClientError as e:
+            print(f"[DEBUG] Prefetch {name} on {args['host']} failed: {e}")
+            return
+        cache.put(name, args, out, min_ttl=PREFETCH_TTL)
+
+    executor = _get_prefetch_executor()
+    for host in hosts:
+        for name in PREFETCH_TOOLS:
+            args = {"host": host}
+            if cache.ttl(name) <= 0 or (not bypass_cache and cache.fresh(name, args)):
+                continue
+            if not bypass_cache and snapshots is not None and snapshots.fresh(name, args):
+                continue  # The tool will answer from the snapshot
+            executor.submit(fetch, name, args)
+    print(f"[DEBUG] Prefetching {', '.join(PREFETCH_TOOLS)} for {', '.join(hosts)}")
+    return hosts
+
+
+def _render_server_diagnostics(mcp):
+    """Sidebar: recent MCP server warnings/errors from its stderr, plus client counters."""
+    stats = mcp.stats()
+    # The async client doesn't capture stderr: the server's log goes straight to the console
+    entries = mcp.recent_stderr("WARNING", limit=MCP_STDERR_SHOW) if hasattr(mcp, "recent_stderr") else []
+    errors = sum(1 for e in entries if e["level"] in ("ERROR", "CRITICAL"))
+    label = f"MCP server log ({errors} errors)" if errors else "MCP server log"
+    with st.sidebar.expander(label, expanded=False):
+        if entries:
+            st.code(
+                "\n".join(f"{time.strftime('%H:%M:%S', time.localtime(e['time']))} {e['line']}" for e in entries),
+                language=None,
+            )
+        else:
+            st.caption("No warnings or errors from the MCP server.")
+        st.caption(" · ".join(f"{k}: {v}" for k, v in stats.items() if v))
+
+
+@st.cache_resource
+def _get_graph(_key: tuple):
+    """Build tools, LLM, and LangChain agent (cached by config key)."""
+    # Extract model name from the key tuple (last element)
+    model_name = _key[3] if len(_key) > 3 else MODEL_NAME
+
+    mcp, amcp = _get_mcp_clients()
 
     print(f"[DEBUG] Building tools...")
-    tools = _build_tools(mcp)
+    catalog = ToolCatalogCache(TOOL_CATALOG_DIR) if TOOL_CATALOG_CACHE else None
+    tools = _build_tools(mcp, amcp, _get_tool_cache(), catalog, _get_snapshot_store(), _get_metric_store())
     print(f"[DEBUG] Built {len(tools)} tools")
 
     if not tools:
@@ -286,14 +994,69 @@ def _get_graph(_key: tuple):
         llm,
         tools=tools,
         system_prompt=SYSTEM_PROMPT,
-        middleware=[_tool_choice_middleware],
+        middleware=[_ToolChoiceMiddleware(), _DeadlineMiddleware()],
     )
     print(f"[DEBUG] Agent created successfully")
     return graph
 
 
+class _WarmUp:
+    """Builds the MCP clients and the default agent graph on a background thread.
+
+    Both are st.cache_resource entries, so a query that needs them before warm-up
+    finishes just waits on the same cached computation instead of starting another.
+    """
+
+    def __init__(self, key: tuple):
+        self.ready = threading.Event()
+        self.error: Exception | None = None
+        self.seconds: float | None = None
+        thread = threading.Thread(target=self._run, args=(key,), daemon=True, name="warmup")
+        if add_script_run_ctx is not None:
+            add_script_run_ctx(thread)
+        thread.start()
+
+    def _run(self, key: tuple):
+        start = time.perf_counter()
+        try:
+            if key[3]:
+                _get_graph(key)
+            else:
+                _get_mcp_clients()  # Model picked in the UI (Ollama): only the MCP side can be built now
+        except Exception as e:
+            self.error = e
+            print(f"[WARN] Warm-up failed: {e}")
+        finally:
+            self.seconds = time.perf_counter() - start
+            print(f"[DEBUG] Warm-up finished in {self.seconds:.1f}s")
+            self.ready.set()  # First: a failing ready file must not leave the UI waiting forever
+            if WARMUP_READY_FILE and self.error is None:
+                try:
+                    with open(WARMUP_READY_FILE, "w") as f:
+                        f.write(f"{self.seconds:.3f}\n")
+                except OSError as e:
+                    print(f"[WARN] Could not write WARMUP_READY_FILE {WARMUP_READY_FILE}: {e}")
+
+
+@st.cache_resource
+def _start_warmup(key: tuple) -> _WarmUp:
+    """Start warm-up once per process (the first script run, before anything else renders)."""
+    return _WarmUp(key)
+
+
+def _load_graph(config_key: tuple):
+    try:
+        return _get_graph(config_key)
+    except Exception as e:
+        st.error(f"Startup failed: {e}. Check MCP_COMMAND and MODEL_ENDPOINT.")
+        st.stop()
+
+
 def main():
     st.set_page_config(page_title="Linux MCP Chatbot", page_icon="🐧", layout="centered")
+    warmup = None
+    if WARMUP:
+        warmup = _start_warmup((MODEL_ENDPOINT, OPENAI_API_PATH or "", OPENAI_API_HOST or "", MODEL_NAME))
     st.title("🐧 Linux MCP Server Chatbot")
     st.caption("Run Linux diagnostics on any host (local or remote) via the Linux MCP Server.")
 
@@ -338,14 +1101,54 @@ def main():
     )
 
     config_key = (MODEL_ENDPOINT, OPENAI_API_PATH or "", OPENAI_API_HOST or "", selected_model)
-    try:
-        graph = _get_graph(config_key)
-    except Exception as e:
-        st.error(f"Startup failed: {e}. Check MCP_COMMAND and MODEL_ENDPOINT.")
-        st.stop()
+    warming = warmup is not None and not warmup.ready.is_set()
+    if warming:
+        # Don't block the page on warm-up; the first query waits for it if needed
+        st.sidebar.info("⏳ Warming up MCP server and agent...")
+        graph = None
+    else:
+        if warmup is not None and warmup.seconds is not None and warmup.error is None:
+            st.sidebar.caption(f"✅ Ready (warm-up took {warmup.seconds:.1f}s)")
+        graph = _load_graph(config_key)
+
+    bypass_cache = False
+    if TOOL_CACHE:
+        if st.session_state.pop("bypass_cache_used", False):
+            st.session_state.bypass_cache = False  # One question only; must be reset before the widget is drawn
+        bypass_cache = st.sidebar.checkbox(
+            "Bypass result cache",
+            key="bypass_cache",
+            help="Fetch fresh data from the hosts for the next question only (unticks itself after that question).",
+        )
+        if not warming:
+            stats = _get_tool_cache().stats()
+            st.sidebar.caption(
+                f"Result cache: {stats['cache_hits']} hits / {stats['cache_misses']} misses, "
+                f"{stats['cache_entries']} entries ({stats['cache_bytes'] / 1024:.0f} KiB)"
+            )
+    if SNAPSHOTS and not warming:
+        _start_snapshot_collector()
+        stats = _get_snapshot_store().stats()
+        st.sidebar.caption(
+            f"Snapshots: {stats['snapshot_rows']} results for {stats['snapshot_hosts']} hosts, "
+            f"{stats['snapshot_hits']} answers"
+        )
+    if METRICS and not warming and _start_metric_sampler() is not None:
+        stats = _get_metric_store().stats()
+        st.sidebar.caption(
+            f"Metrics: {stats['metric_series']} series for {stats['metric_hosts']} hosts, "
+            f"{stats['metric_rounds']} rounds ({stats['metric_bytes'] / 1048576:.1f} MiB)"
+        )
 
     if "messages" not in st.session_state:
         st.session_state.messages = []
+    # Last output of each tool call in this chat, so repeated calls can show what changed
+    observations = st.session_state.setdefault("observations", ObservationLog(DELTA_TOOLS)) if DELTA_MODE else None
+    if observations is not None and (observations.summaries or observations.deltas):
+        st.sidebar.caption(
+            f"Delta mode: {observations.deltas} repeated results sent as changes only, "
+            f"{observations.summaries} with their changes"
+        )
 
     for msg in st.session_state.messages:
         st.chat_message(msg["role"]).markdown(msg["content"])
@@ -353,15 +1156,52 @@ def main():
     if prompt := st.chat_input("Ask about system info, services, logs, network, disk..."):
         st.session_state.messages.append({"role": "user", "content": prompt})
         st.chat_message("user").markdown(prompt)
+        if bypass_cache:
+            st.session_state.bypass_cache_used = True
 
         with st.chat_message("assistant"):
+            if PREFETCH:
+                # Speculative: the baseline calls run while the agent loads and the LLM picks its tools
+                _prefetch_baseline(prompt, bypass_cache)
+            if graph is None:
+                with st.spinner("Waiting for warm-up to finish..."):
+                    graph = _load_graph(config_key)
             with st.spinner("Running tools..."):
                 try:
                     print(f"[DEBUG] Invoking agent with prompt: {prompt[:50]}...")
-                    result = graph.invoke(
-                        {"messages": [HumanMessage(content=prompt)]},
-                        config={"configurable": {"thread_id": "default"}},
-                    )
+                    agent_input = {"messages": [HumanMessage(content=prompt)]}
+                    # Per-query deadline and live tool activity, passed through the agent to every tool call
+                    deadline = time.time() + QUERY_TIMEOUT
+                    activity = _ToolActivity()
+                    agent_config = {
+                        "configurable": {
+                            "thread_id": "default",
+                            "deadline": deadline,
+                            "activity": activity,
+                            "bypass_cache": bypass_cache,
+                            "observations": observations,
+                            # The agent keeps no chat history: only this query's tool outputs are in its context
+                            "run_id": next(_RUN_IDS),
+                        }
+                    }
+                    if MCP_ASYNC:
+                        invoke = lambda: _get_event_loop().run(graph.ainvoke(agent_input, config=agent_config))
+                    else:
+                        invoke = lambda: graph.invoke(agent_input, config=agent_config)
+                    # Run the agent off the script thread so this thread can redraw per-tool progress
+                    progress_box = st.empty()
+                    with ThreadPoolExecutor(max_workers=1) as executor:
+                        future = executor.submit(invoke)
+                        while True:
+                            try:
+                                result = future.result(timeout=0.25)
+                                break
+                            except FutureTimeoutError:
+                                progress_box.markdown(activity.render())
+                    progress_box.empty()
+                    if activity.render():
+                        with st.expander("Tool activity"):
+                            st.markdown(activity.render())
                     messages = result.get("messages") or []
                     print(f"[DEBUG] Got {len(messages)} messages in result")
 
@@ -400,8 +1240,13 @@ def main():
             st.markdown(out)
         st.session_state.messages.append({"role": "assistant", "content": out})
 
+    if not warming:
+        _render_server_diagnostics(_get_mcp_clients()[0])
+
     if st.sidebar.button("Clear chat"):
         st.session_state.messages = []
+        if observations is not None:
+            observations.clear()
         st.rerun()
 
 
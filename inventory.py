@@ -0,0 +1,140 @@
+"""
+Known hosts, from the SSH client config and an optional inventory file.
+
+Used to recognize host names in a question before the LLM has decided which
+tools to call. Sources:
+  - ~/.ssh/config (or SSH_CONFIG_PATH): every non-wildcard `Host` alias and its
+    `HostName`, following `Include`.
+  - An inventory file (MCP_INVENTORY): one host per line, `#` comments; Ansible
+    INI inventories work too (`[group]` sections become groups, `[group:children]`
+    nest them, `[group:vars]` are ignored, the first word of a line is the host).
+"""
+import glob
+import ipaddress
+import os
+import re
+
+DEFAULT_SSH_CONFIG = os.path.join(os.path.expanduser("~"), ".ssh", "config")
+
+# Host-like words in free text: letters, digits, dots, dashes, underscores
+_WORD_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9._-]*")
+_WILDCARD = set("*?!")
+
+
+def ssh_config_hosts(path: str = DEFAULT_SSH_CONFIG, _seen: set | None = None) -> list:
+    """Host aliases and HostNames from an OpenSSH client config (wildcard patterns skipped)."""
+    seen = _seen if _seen is not None else set()
+    path = os.path.expanduser(path)
+    if path in seen:
+        return []
+    seen.add(path)
+    hosts = []
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            lines = f.readlines()
+    except OSError:
+        return hosts
+    base = os.path.dirname(path)
+    for line in lines:
+        parts = line.split("#", 1)[0].replace("=", " ").split()
+        if len(parts) < 2:
+            continue
+        keyword, values = parts[0].lower(), parts[1:]
+        if keyword == "include":
+            for pattern in values:
+                pattern = os.path.expanduser(pattern)
+                if not os.path.isabs(pattern):
+                    pattern = os.path.join(base, pattern)
+                for included in sorted(glob.glob(pattern)):
+                    hosts += ssh_config_hosts(included, seen)
+        elif keyword in ("host", "hostname"):
+            hosts += [v for v in values if not _WILDCARD & set(v) and "%" not in v]
+    return hosts
+
+
+def inventory_groups(path: str) -> dict:
+    """{group: [hosts]} from a plain list or an Ansible INI inventory.
+
+    `[group:children]` sections are expanded, hosts before any section are
+    "ungrouped", and "all" holds every host.
+    """
+    groups = {"all": [], "ungrouped": []}
+    children = {}
+    section, kind = "ungrouped", ""
+    try:
+        with open(os.path.expanduser(path), encoding="utf-8", errors="replace") as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if not line or line.startswith(";"):
+                    continue
+                if line.startswith("["):
+                    section, _, kind = line.strip("[]").partition(":")
+                    if not kind:
+                        groups.setdefault(section, [])
+                    continue
+                name = line.split()[0]
+                if kind == "children":
+                    children.setdefault(section, []).append(name)
+                elif not kind:
+                    groups[section].append(name)
+                    groups["all"].append(name)
+    except OSError as e:
+        print(f"[WARN] Could not read inventory {path}: {e}")
+
+    def expand(group: str, seen: set) -> list:
+        hosts = list(groups.get(group, []))
+        for child in children.get(group, []):
+            if child not in seen:
+                hosts += expand(child, seen | {child})
+        return hosts
+
+    for group in children:
+        groups[group] = list(dict.fromkeys(expand(group, {group})))
+    groups["all"] = list(dict.fromkeys(groups["all"]))
+    return groups
+
+
+def inventory_hosts(path: str) -> list:
+    """Every host in an inventory file."""
+    return inventory_groups(path)["all"]
+
+
+def load_hosts(inventory: str = "", ssh_config: str = DEFAULT_SSH_CONFIG) -> list:
+    """Known host names, inventory first, without duplicates (case-insensitive)."""
+    hosts = []
+    seen = set()
+    for host in (inventory_hosts(inventory) if inventory else []) + ssh_config_hosts(ssh_config):
+        if host.lower() not in seen and host.lower() not in ("localhost", "127.0.0.1", "::1"):
+            seen.add(host.lower())
+            hosts.append(host)
+    return hosts
+
+
+def _short_name(host: str) -> str | None:
+    """web01 for web01.example.com; None for IP addresses and numeric first labels."""
+    try:
+        ipaddress.ip_address(host)
+        return None
+    except ValueError:
+        pass
+    label = host.split(".", 1)[0]
+    return label if label != host and not label.isdigit() else None
+
+
+def mentioned_hosts(text: str, hosts: list) -> list:
+    """Known hosts named in `text`, in order of mention, as written in `hosts`.
+
+    A host also matches by its short name (web01 for web01.example.com); full
+    names win over short ones, and IP addresses have none (10 is not 10.0.0.5).
+    """
+    aliases = {host.lower(): host for host in reversed(hosts)}
+    for host in hosts:
+        short = _short_name(host)
+        if short:
+            aliases.setdefault(short.lower(), host)
+    found = []
+    for match in _WORD_RE.finditer(text or ""):
+        host = aliases.get(match.group(0).rstrip(".-_").lower())
+        if host is not None and host not in found:
+            found.append(host)
+    return found
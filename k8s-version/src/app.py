@@ -4,6 +4,7 @@ Connects to MCP server via HTTP (streamable-http transport)
 """
 import os
 import sys
+import threading
 import streamlit as st
 from langchain.agents import AgentExecutor, create_tool_calling_agent
 from langchain_core.prompts import ChatPromptTemplate
@@ -36,6 +37,8 @@ TOOL_CHOICE = os.getenv("TOOL_CHOICE", "none")
 # Advanced configuration
 MODEL_CONTEXT_TOKENS = int(os.getenv("MODEL_CONTEXT_TOKENS", "200000"))
 MAX_TOOL_OUTPUT_CHARS = int(os.getenv("MAX_TOOL_OUTPUT_CHARS", "8000"))
+# Build MCP client, tools, LLM and agent in the background on the first page load
+WARMUP = os.getenv("WARMUP", "true").lower() in ("1", "true", "yes")
 
 
 # ==================== MCP Client Setup ====================
@@ -69,24 +72,20 @@ def get_mcp_client():
             print(f"[DEBUG] Creating MCP client with env: {env}")
             client = LinuxMCPClientStdio(command=MCP_COMMAND, args=args, env=env)
 
-            # Give subprocess time to start
-            import time
-            time.sleep(1)
-
-            # Check if process is alive
-            poll_result = client.proc.poll()
-            if poll_result is not None:
-                print(f"[ERROR] MCP subprocess exited with code {poll_result}")
-                # Try to read any stderr output
-                stderr_output = client.proc.stderr.read() if client.proc.stderr else ""
-                print(f"[ERROR] Subprocess stderr: {stderr_output}")
-                raise Exception(f"MCP subprocess exited immediately with code {poll_result}")
-
-            print(f"[DEBUG] MCP subprocess is running (PID: {client.proc.pid})")
-            print(f"[DEBUG] MCP client created, listing tools...")
-            # Test connection
-            tools = client.list_tools()
-            print(f"[DEBUG] Connected to MCP server via stdio. Available tools: {len(tools)}")
+            # The initialize handshake is the readiness check: it returns as soon as the
+            # server answers, and fails right away if the subprocess dies on startup
+            # (its stderr has already been logged as [MCP STDERR])
+            try:
+                client._initialize()
+            except Exception:
+                poll_result = client.proc.poll()
+                if poll_result is not None:
+                    print(f"[ERROR] MCP subprocess exited with code {poll_result}")
+                    raise Exception(f"MCP subprocess exited immediately with code {poll_result}")
+                raise
+
+            # get_langchain_tools() does the one tools/list call
+            print(f"[DEBUG] Connected to MCP server via stdio (PID: {client.proc.pid})")
             return client
         except Exception as e:
             import traceback
@@ -101,9 +100,9 @@ def get_mcp_client():
         print(f"[DEBUG] Connecting to MCP server at {MCP_SERVER_URL}")
         try:
             client = LinuxMCPClientHTTP(base_url=MCP_SERVER_URL, timeout=MCP_TIMEOUT)
-            # Test connection
-            tools = client.list_tools()
-            print(f"[DEBUG] Connected to MCP server via HTTP. Available tools: {len(tools)}")
+            # Test connection with the initialize handshake; get_langchain_tools() does the one tools/list call
+            client._initialize()
+            print(f"[DEBUG] Connected to MCP server via HTTP")
             return client
         except Exception as e:
             print(f"[ERROR] Failed to connect to MCP server: {e}")
@@ -293,6 +292,29 @@ IMPORTANT:
     return agent_executor
 
 
+@st.cache_resource
+def start_warmup():
+    """Build the agent (and everything it needs) on a background thread, once per process."""
+    ready = threading.Event()
+
+    def run():
+        try:
+            get_agent()
+        except BaseException as e:  # get_mcp_client() calls sys.exit on failure
+            print(f"[WARN] Warm-up failed: {e}")
+        finally:
+            ready.set()
+
+    thread = threading.Thread(target=run, daemon=True, name="warmup")
+    try:
+        from streamlit.runtime.scriptrunner import add_script_run_ctx
+        add_script_run_ctx(thread)
+    except ImportError:
+        pass
+    thread.start()
+    return ready
+
+
 # ==================== Streamlit UI ====================
 
 def main():
@@ -315,15 +337,18 @@ def main():
         st.text(f"Model: {MODEL_NAME}")
         st.text(f"Endpoint: {MODEL_ENDPOINT}")
 
-        # Display connected tools
-        try:
-            tools = get_langchain_tools()
-            st.success(f"✅ Connected ({len(tools)} tools)")
-            with st.expander("Available Tools"):
-                for tool in tools:
-                    st.text(f"• {tool.name}")
-        except Exception as e:
-            st.error(f"❌ MCP connection error: {e}")
+        # Display connected tools (without blocking the page while warm-up runs)
+        if WARMUP and not start_warmup().is_set():
+            st.info("⏳ Warming up MCP server and agent...")
+        else:
+            try:
+                tools = get_langchain_tools()
+                st.success(f"✅ Connected ({len(tools)} tools)")
+                with st.expander("Available Tools"):
+                    for tool in tools:
+                        st.text(f"• {tool.name}")
+            except Exception as e:
+                st.error(f"❌ MCP connection error: {e}")
 
     # Initialize chat history
     if "messages" not in st.session_state:
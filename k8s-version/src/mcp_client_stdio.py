@@ -8,6 +8,7 @@ import subprocess
 import threading
 import queue
 import itertools
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from threading import Lock
 
 
@@ -28,8 +29,9 @@ class LinuxMCPClient:
         self._id_counter = itertools.count(1)
         self._initialized = False
         self._write_lock = Lock()  # Thread safety for stdin writes
-        self._responses = {}  # Dict of {req_id: response} for parallel requests
-        self._responses_lock = Lock()
+        self._pending = {}  # Dict of {req_id: Future} for in-flight requests
+        self._pending_lock = Lock()
+        self._exited = False  # Set by _reader when the server's stdout closes
 
         print(f"[DEBUG] Starting subprocess: {' '.join(self.command)}")
         print(f"[DEBUG] Environment additions: {env}")
@@ -54,7 +56,7 @@ class LinuxMCPClient:
                 print(f"[MCP STDERR] {line}")
 
     def _reader(self):
-        """Read responses from stdout and store them by request ID."""
+        """Read responses from stdout and hand each one to the caller waiting on its ID."""
         for line in self.proc.stdout:
             line = line.strip()
             if not line:
@@ -62,12 +64,22 @@ class LinuxMCPClient:
             print(f"[MCP STDOUT] {line}")
             try:
                 response = json.loads(line)
-                if "id" in response:
-                    with self._responses_lock:
-                        self._responses[response["id"]] = response
-                        print(f"[DEBUG] Stored response for request ID {response['id']}")
             except json.JSONDecodeError:
                 print(f"[DEBUG] Non-JSON output from MCP server: {line}")
+                continue
+            if "id" in response:
+                with self._pending_lock:
+                    future = self._pending.pop(response["id"], None)
+                if future is not None:
+                    future.set_result(response)
+                    print(f"[DEBUG] Delivered response for request ID {response['id']}")
+
+        # stdout closed: the server is gone, so fail in-flight calls now instead of at their timeout
+        with self._pending_lock:
+            self._exited = True
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(MCPClientError("MCP server exited"))
 
     def _initialize(self):
         """Send initialize then notifications/initialized (MCP spec)."""
@@ -89,7 +101,7 @@ class LinuxMCPClient:
             self.proc.stdin.flush()
         self._initialized = True
 
-    def _rpc(self, method: str, params: dict):
+    def _rpc(self, method: str, params: dict, timeout: float = 120):
         req_id = next(self._id_counter)
         request = {
             "jsonrpc": "2.0",
@@ -97,25 +109,30 @@ class LinuxMCPClient:
             "method": method,
             "params": params,
         }
-        # Thread-safe write to stdin
-        with self._write_lock:
-            self.proc.stdin.write(json.dumps(request) + "\n")
-            self.proc.stdin.flush()
+        # Register the future before writing so a fast response can't be missed
+        future = Future()
+        with self._pending_lock:
+            if self._exited:
+                raise MCPClientError("MCP server exited")
+            self._pending[req_id] = future
+        try:
+            # Thread-safe write to stdin
+            with self._write_lock:
+                self.proc.stdin.write(json.dumps(request) + "\n")
+                self.proc.stdin.flush()
 
-        # Wait for response (poll the dict)
-        import time
-        timeout = 120
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            with self._responses_lock:
-                if req_id in self._responses:
-                    response = self._responses.pop(req_id)
-                    if "error" in response:
-                        raise MCPClientError(response["error"])
-                    return response.get("result")
-            time.sleep(0.01)  # Poll every 10ms
-
-        raise MCPClientError("Timeout waiting for MCP response")
+            # Block until _reader delivers the response (no polling)
+            try:
+                response = future.result(timeout=timeout)
+            except FutureTimeoutError:
+                raise MCPClientError("Timeout waiting for MCP response")
+        finally:
+            with self._pending_lock:
+                self._pending.pop(req_id, None)
+
+        if "error" in response:
+            raise MCPClientError(response["error"])
+        return response.get("result")
 
     def list_tools(self) -> list:
         """Return list of tools (each with name, description, etc.)."""
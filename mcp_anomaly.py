@@ -0,0 +1,212 @@
+"""
+Fleet anomaly detection over the sampled metric ring buffers (needs numpy).
+
+"Which hosts look abnormal?" is answered from the MetricStore alone, with no
+calls to the hosts. Each metric is scored as one hosts x samples matrix:
+  - self: the current value (mean of the last few samples) as a z-score
+    against the host's own earlier samples in the baseline window
+  - peers: the current value as a robust z-score (median/MAD) against the
+    other hosts of its inventory group (or the whole fleet)
+  - jump: the latest sample-to-sample change against the host's usual changes
+  - disk fill: for disk use, hours until 100% at the recent growth rate
+"""
+import time
+
+from mcp_metrics import HAS_NUMPY, window_stats
+from mcp_snapshots import format_age
+
+if HAS_NUMPY:
+    import numpy as np
+
+DEFAULT_THRESHOLD = 3.5
+DEFAULT_BASELINE = 6 * 3600
+# "Now" is the mean of this many latest samples, so one noisy sample doesn't count
+DEFAULT_RECENT = 3
+# Disks that fill up sooner than this (hours) are reported
+DEFAULT_ETA_HOURS = 48
+# Growth rate for the fill ETA is fitted over this window (seconds)
+ETA_WINDOW = 3 * 3600
+# Self scores need this many baseline samples; peer scores this many hosts in a group
+MIN_HISTORY = 10
+MIN_PEERS = 4
+# A jump rests on one sample, and hundreds of hosts x metrics are tested: it needs a higher bar
+JUMP_FACTOR = 1.5
+# Smallest spread a score divides by, per metric prefix (in the metric's unit):
+# a near-constant series would otherwise turn any wobble into a huge z-score
+_MIN_SPREAD = {
+    "load_per_core": 0.1,
+    "load_": 0.25,
+    "cpu_busy_pct": 5.0,
+    "mem_used_pct": 2.0,
+    "swap_used_pct": 2.0,
+    "disk_used_pct": 1.0,
+}
+_MAD_SCALE = 1.4826  # MAD -> standard deviation for normal data
+
+
+def _min_spread(metric: str) -> float:
+    return next((s for prefix, s in _MIN_SPREAD.items() if metric.startswith(prefix)), 0.5)
+
+
+def peer_groups(hosts: list, groups: dict | None) -> list:
+    """Peer group name per host: its first inventory group with at least MIN_PEERS hosts, else "fleet"."""
+    first = {}
+    for group, members in (groups or {}).items():
+        if group in ("all", "ungrouped") or len(members) < MIN_PEERS:
+            continue
+        for host in members:
+            first.setdefault(host.lower(), group)
+    return [first.get(host, "fleet") for host in hosts]
+
+
+def _masked_mean_std(values, mask):
+    n = mask.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(mask, values, 0.0).sum(axis=1) / n
+        spread = np.where(mask, values - mean[:, None], 0.0)
+        std = np.sqrt((spread * spread).sum(axis=1) / np.maximum(n - 1, 1))
+    return n, mean, std
+
+
+def score_metric(metric: str, values, times, groups: list, recent: int = DEFAULT_RECENT) -> dict:
+    """Scores for every host (rows of `values`, oldest sample first) at once; NaN where not computable.
+
+    Returns arrays: now, self_z, usual, usual_std, peer_z, peer_median, jump, jump_z, eta_hours, slope.
+    """
+    rows, columns = values.shape
+    nan = np.full(rows, np.nan)
+    spread_floor = _min_spread(metric)
+    present = ~np.isnan(values)
+    recent = max(1, min(recent, columns))
+    _, now, _ = _masked_mean_std(values[:, -recent:], present[:, -recent:])
+
+    # Self: current vs the host's own earlier samples
+    n, usual, usual_std = _masked_mean_std(values[:, :-recent], present[:, :-recent])
+    with np.errstate(invalid="ignore"):
+        self_z = np.where(n >= MIN_HISTORY, (now - usual) / np.maximum(usual_std, spread_floor), np.nan)
+
+    # Peers: current vs the group's median, scaled by the group's MAD
+    peer_z, peer_median = nan.copy(), nan.copy()
+    labels = np.asarray(groups)
+    for group in set(groups):
+        members = (labels == group) & ~np.isnan(now)
+        if members.sum() < MIN_PEERS:
+            continue
+        median = np.median(now[members])
+        mad = np.median(np.abs(now[members] - median)) * _MAD_SCALE
+        peer_median[members] = median
+        peer_z[members] = (now[members] - median) / max(mad, spread_floor)
+
+    # Jump: the latest step vs the host's usual steps
+    jump, jump_z = nan.copy(), nan.copy()
+    if columns >= 3:
+        steps = np.diff(values, axis=1)
+        jump = steps[:, -1]
+        n, step_mean, step_std = _masked_mean_std(steps[:, :-1], ~np.isnan(steps[:, :-1]))
+        with np.errstate(invalid="ignore"):
+            jump_z = np.where(n >= MIN_HISTORY, (jump - step_mean) / np.maximum(step_std, spread_floor), np.nan)
+
+    # Disk fill: hours to 100% at the slope of the last ETA_WINDOW
+    eta, slope = nan.copy(), nan.copy()
+    if metric.startswith("disk_used_pct"):
+        window = times >= times[-1] - ETA_WINDOW
+        stats = window_stats(values[:, window], times[window])
+        slope = stats["slope"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            eta = np.where(slope > 0.01, (100.0 - stats["last"]) / slope, np.nan)
+
+    return {"now": now, "self_z": self_z, "usual": usual, "usual_std": usual_std, "peer_z": peer_z,
+            "peer_median": peer_median, "jump": jump, "jump_z": jump_z, "eta_hours": eta, "slope": slope}
+
+
+def detect(store, groups: dict | None = None, hosts: list | None = None, metric: str = "",
+           baseline: float = DEFAULT_BASELINE, threshold: float = DEFAULT_THRESHOLD,
+           eta_hours: float = DEFAULT_ETA_HOURS, recent: int = DEFAULT_RECENT) -> dict:
+    """Score every sampled host on every metric (or those containing `metric`).
+
+    `groups` ({group: [hosts]}, e.g. from the inventory) defines peers; `hosts` limits what is
+    reported (all hosts are still scored, so peers stay complete). Returns findings, disks
+    filling up, stale hosts (no recent samples) and what was scored.
+    """
+    started = time.perf_counter()
+    wanted = {h.lower() for h in hosts} if hosts else None
+    findings, filling = [], []
+    # Rows are only ever appended: hosts the sampler adds meanwhile are left for the next call
+    names = store.hosts
+    labels, fresh, metrics = peer_groups(names, groups), None, 0
+    for name in store.metrics:
+        if metric and metric.lower() not in name.lower():
+            continue
+        _, times, values = store.matrix(name, baseline)
+        values = values[: len(names)]
+        if values.shape[1] == 0 or not names:
+            continue
+        metrics += 1
+        scores = score_metric(name, values, times, labels, recent)
+        has_now = ~np.isnan(scores["now"])
+        fresh = has_now if fresh is None else fresh | has_now
+        with np.errstate(invalid="ignore"):
+            jump = np.abs(scores["jump_z"]) / JUMP_FACTOR
+            score = np.fmax(np.fmax(np.abs(scores["self_z"]), np.abs(scores["peer_z"])), jump)
+            flagged = np.flatnonzero(score >= threshold)
+            full = np.flatnonzero(scores["eta_hours"] <= eta_hours)
+        for row in flagged:
+            if wanted is None or names[row] in wanted:
+                findings.append({"host": names[row], "metric": name, "score": float(score[row]),
+                                 **{k: float(v[row]) for k, v in scores.items()}})
+        for row in full:
+            if wanted is None or names[row] in wanted:
+                filling.append({"host": names[row], "metric": name, "now": float(scores["now"][row]),
+                                "eta_hours": float(scores["eta_hours"][row]), "slope": float(scores["slope"][row])})
+    stale = []
+    if fresh is not None:
+        stale = [h for h, ok in zip(names, fresh) if not ok and (wanted is None or h in wanted)]
+    findings.sort(key=lambda f: -f["score"])
+    filling.sort(key=lambda f: f["eta_hours"])
+    return {"findings": findings, "filling": filling, "stale": stale, "hosts": len(names), "metrics": metrics,
+            "seconds": time.perf_counter() - started, "baseline": baseline, "recent": recent}
+
+
+def _num(value: float) -> str:
+    return f"{value:.3g}"
+
+
+def _reasons(f: dict, threshold: float) -> str:
+    reasons = []
+    if abs(f["self_z"]) >= threshold:
+        reasons.append(f"self z {f['self_z']:+.1f} (usual {_num(f['usual'])}±{_num(f['usual_std'])})")
+    if abs(f["peer_z"]) >= threshold:
+        reasons.append(f"peers z {f['peer_z']:+.1f} (median {_num(f['peer_median'])})")
+    if abs(f["jump_z"]) >= threshold * JUMP_FACTOR:
+        reasons.append(f"jump {f['jump']:+.3g} (z {f['jump_z']:+.1f})")
+    return "; ".join(reasons)
+
+
+def format_anomalies(report: dict, threshold: float = DEFAULT_THRESHOLD, limit: int = 30) -> str:
+    """Findings for the LLM, strongest first."""
+    findings, filling, stale = report["findings"], report["filling"], report["stale"]
+    if not report["metrics"]:
+        return "No metric samples yet; nothing to score."
+    lines = [
+        f"Scored {report['hosts']} hosts x {report['metrics']} metrics in {report['seconds'] * 1000:.0f}ms "
+        f"(baseline {format_age(report['baseline'])}, now = mean of last {report['recent']} samples, "
+        f"|z| >= {threshold:g}, jumps >= {threshold * JUMP_FACTOR:g}): {len(findings)} anomalies, {len(filling)} disks filling, "
+        f"{len(stale)} hosts without recent samples"
+    ]
+    if findings:
+        lines.append("host metric now | why")
+        lines += [f"{f['host']} {f['metric']} {_num(f['now'])} | {_reasons(f, threshold)}" for f in findings[:limit]]
+        if len(findings) > limit:
+            lines.append(f"... {len(findings) - limit} weaker anomalies omitted")
+    if filling:
+        lines.append("Disks filling up (host mount used% | time to full at the recent rate):")
+        lines += [
+            f"{f['host']} {f['metric'].split(':', 1)[-1]} {_num(f['now'])}% | ~{f['eta_hours']:.1f}h ({f['slope']:+.2g}%/h)"
+            for f in filling[:limit]
+        ]
+    if stale:
+        lines.append(f"No recent samples (down or unreachable?): {', '.join(stale[:limit])}"
+                     + (f" and {len(stale) - limit} more" if len(stale) > limit else ""))
+    if len(lines) == 1:
+        lines.append("No host looks abnormal.")
+    return "\n".join(lines)
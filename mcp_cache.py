@@ -0,0 +1,141 @@
+"""
+TTL cache for read-only Linux MCP tool results.
+
+Every diagnostic tool of the Linux MCP Server only reads state, so a result
+fetched a few seconds (or, for hardware facts, an hour) ago is as good as a new
+SSH round-trip. Entries are keyed by tool, host and arguments, expire after a
+per-tool TTL and are evicted least-recently-used once the total size passes
+max_bytes.
+"""
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from mcp_client import call_key
+
+# Seconds a result stays valid, per tool. 0 = never cached (logs and files change under us)
+DEFAULT_TOOL_TTLS = {
+    # Static facts
+    "get_hardware_information": 3600,
+    "list_block_devices": 600,
+    "get_system_information": 300,
+    "get_network_interfaces": 300,
+    # Slowly changing
+    "get_disk_usage": 60,
+    "list_services": 30,
+    "get_listening_ports": 30,
+    "get_cpu_information": 15,
+    "get_memory_information": 10,
+    "get_service_status": 10,
+    # Fast moving
+    "list_processes": 5,
+    "get_process_info": 5,
+    "get_network_connections": 5,
+    # Never cached
+    "get_journal_logs": 0,
+    "get_service_logs": 0,
+    "get_audit_logs": 0,
+    "read_log_file": 0,
+    "read_file": 0,
+    "list_files": 0,
+    "list_directories": 0,
+}
+
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+
+def parse_ttls(spec: str) -> dict:
+    """Parse "tool=seconds,tool=seconds" (e.g. from TOOL_CACHE_TTLS) into {tool: seconds}."""
+    ttls = {}
+    for item in (spec or "").split(","):
+        name, sep, seconds = item.partition("=")
+        if not sep or not name.strip():
+            continue
+        try:
+            ttls[name.strip()] = float(seconds)
+        except ValueError:
+            print(f"[WARN] Ignoring bad cache TTL: {item.strip()}")
+    return ttls
+
+
+class ToolResultCache:
+    """Thread-safe TTL + byte-bounded LRU cache of tool output text."""
+
+    def __init__(self, ttls: dict | None = None, default_ttl: float = 0, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.ttls = dict(DEFAULT_TOOL_TTLS)
+        self.ttls.update(ttls or {})
+        self.default_ttl = default_ttl  # For tools not in ttls (0 = not cached)
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires, size, text)
+        self._bytes = 0
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def ttl(self, name: str) -> float:
+        return self.ttls.get(name, self.default_ttl)
+
+    def get(self, name: str, arguments: dict | None) -> str | None:
+        """Cached text for this call, or None (expired, missing or tool not cacheable)."""
+        if self.ttl(name) <= 0:
+            return None
+        key = call_key(name, arguments)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            if entry is not None:
+                self._drop_locked(key)
+            self.misses += 1
+            return None
+
+    def fresh(self, name: str, arguments: dict | None) -> bool:
+        """Whether a valid entry exists (not counted as a hit or miss)."""
+        if self.ttl(name) <= 0:
+            return False
+        with self._lock:
+            entry = self._entries.get(call_key(name, arguments))
+            return entry is not None and entry[0] > time.monotonic()
+
+    def put(self, name: str, arguments: dict | None, text: str, min_ttl: float = 0):
+        """Store a result; min_ttl extends short TTLs (prefetched results must outlive the LLM call).
+
+        Only successful output belongs here: clients raise tool failures (isError) as MCPToolError.
+        """
+        ttl = self.ttl(name)
+        if ttl <= 0 or text is None:
+            return
+        size = len(text.encode("utf-8"))
+        if size > self.max_bytes:
+            return  # Would evict everything else for one entry
+        key = call_key(name, arguments)
+        with self._lock:
+            if key in self._entries:
+                self._drop_locked(key)
+            self._entries[key] = (time.monotonic() + max(ttl, min_ttl), size, text)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop_locked(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop_locked(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "cache_hits": self.hits,
+                "cache_misses": self.misses,
+                "cache_entries": len(self._entries),
+                "cache_bytes": self._bytes,
+                "cache_evictions": self.evictions,
+            }
@@ -0,0 +1,67 @@
+"""
+On-disk cache of the MCP server's tool catalog (names, descriptions, input schemas).
+
+The catalog only changes when the server changes, so it is keyed by the server
+command and the serverInfo/protocolVersion from the initialize response. A cold
+start can then build tools from disk without waiting for tools/list, and check
+the live catalog in the background.
+"""
+import hashlib
+import json
+import os
+import time
+
+DEFAULT_CATALOG_DIR = os.path.join(os.path.expanduser("~"), ".cache", "linux-mcp-chatbot")
+
+
+def catalog_key(command: str, server_info: dict | None) -> str:
+    """Key for one server build: its command line plus name/version/protocol from initialize."""
+    info = server_info or {}
+    server = info.get("serverInfo") or {}
+    ident = [command, server.get("name"), server.get("version"), info.get("protocolVersion")]
+    return hashlib.sha256(json.dumps(ident).encode("utf-8")).hexdigest()[:16]
+
+
+def normalize_tools(raw: list) -> list:
+    """Keep what tool building needs (name, description, inputSchema), sorted by name."""
+    tools = []
+    for t in raw or []:
+        if isinstance(t, dict) and t.get("name"):
+            tools.append({
+                "name": t["name"],
+                "description": t.get("description") or "",
+                "inputSchema": t.get("inputSchema") or {},
+            })
+    return sorted(tools, key=lambda t: t["name"])
+
+
+class ToolCatalogCache:
+    """One JSON file per catalog key under `directory`."""
+
+    def __init__(self, directory: str = DEFAULT_CATALOG_DIR):
+        self.directory = directory
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"tools-{key}.json")
+
+    def load(self, key: str) -> list | None:
+        """Cached tools for this key, or None if missing or unreadable."""
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        tools = data.get("tools") if isinstance(data, dict) else None
+        return tools if isinstance(tools, list) and tools else None
+
+    def save(self, key: str, tools: list):
+        """Write atomically (temp file + rename) so a crash never leaves half a catalog."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(key)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"saved": time.time(), "tools": tools}, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"[WARN] Could not save tool catalog: {e}")
@@ -4,151 +4,923 @@ See: https://rhel-lightspeed.github.io/linux-mcp-server/clients/
 """
 import json
 import os
+import re
 import subprocess
 import threading
-import queue
+import time
 import itertools
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from threading import Lock
 
+try:
+    import orjson  # Faster JSON; parses bytes directly
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    _json_loads = json.loads  # Also accepts bytes
+
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+# Largest JSON-RPC message kept whole; bigger tool results are truncated while being read
+DEFAULT_MAX_MESSAGE_BYTES = 8 * 1024 * 1024
+# MCP protocol versions with JSON-RPC batches (added in 2025-03-26, removed again in 2025-06-18).
+# Other servers may silently drop an array (the MCP Python SDK's stdio transport does), so
+# batching is decided from the negotiated version, never probed on a live call
+BATCH_PROTOCOL_VERSIONS = {"2025-03-26"}
+# Server stderr lines kept for diagnostics (ring buffer) and the longest line kept whole
+DEFAULT_STDERR_LINES = 200
+MAX_STDERR_LINE_BYTES = 4096
+LOG_LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+_LEVEL_RE = re.compile(r"\b(DEBUG|INFO|WARNING|WARN|ERROR|CRITICAL|FATAL)\b")
+_ID_RE = re.compile(rb'"id"\s*:\s*(\d+)')
+_TEXT_RE = re.compile(r'"text"\s*:\s*"')
+
 
 class MCPClientError(Exception):
     """Raised when the MCP server returns an error or times out."""
     pass
 
 
+class MCPServerExitedError(MCPClientError):
+    """Raised when the MCP server process has exited (in-flight and later calls fail fast)."""
+    pass
+
+
+class MCPRequestNotSentError(MCPServerExitedError):
+    """Raised when the server was already gone before the request was written: it never ran."""
+    pass
+
+
+class MCPToolError(MCPClientError):
+    """Raised when the tool ran but reported failure (isError result); the message is its text."""
+    pass
+
+
+def result_text(result) -> str:
+    """Combine the text items of a tools/call result into one string."""
+    if not result:
+        return ""
+    if isinstance(result, dict):
+        content = result.get("content") or []
+        texts = [
+            c.get("text", "")
+            for c in content
+            if isinstance(c, dict) and c.get("type") == "text"
+        ]
+        return "\n".join(texts) if texts else str(result)
+    return str(result)
+
+
+def tool_result_text(result) -> str:
+    """result_text of a tools/call result, raising MCPToolError if the tool reported failure.
+
+    Failures must not look like output: callers cache and snapshot what this returns.
+    """
+    if isinstance(result, dict) and result.get("isError"):
+        raise MCPToolError(result_text(result) or "Tool reported an error")
+    return result_text(result)
+
+
+# JSON-RPC method names per dialect: current MCP spec vs. early/legacy servers
+DIALECT_METHODS = {
+    "standard": {"list": "tools/list", "call": "tools/call"},
+    "legacy": {"list": "listTools", "call": "callTool"},
+}
+
+
+def is_method_not_found(error: MCPClientError) -> bool:
+    """True if the server rejected the JSON-RPC method itself (not a tool failure)."""
+    detail = error.args[0] if error.args else ""
+    if isinstance(detail, dict):
+        if detail.get("code") == -32601:
+            return True
+        detail = detail.get("message", "")
+    detail = str(detail).lower()
+    return "method" in detail or "not found" in detail
+
+
+def notification_event(message: dict) -> dict | None:
+    """Turn a notifications/progress or notifications/message into a UI event, else None."""
+    method = message.get("method")
+    params = message.get("params") or {}
+    if method == "notifications/progress":
+        return {
+            "type": "progress",
+            "token": params.get("progressToken"),
+            "progress": params.get("progress"),
+            "total": params.get("total"),
+            "message": params.get("message"),
+        }
+    if method == "notifications/message":
+        data = params.get("data")
+        return {
+            "type": "log",
+            "level": params.get("level", "info"),
+            "message": data if isinstance(data, str) else json.dumps(data),
+        }
+    return None
+
+
+def call_key(name: str, arguments: dict | None) -> str:
+    """Stable key for one tool call: host is case-insensitive, argument order doesn't matter."""
+    args = dict(arguments or {})
+    host = (args.pop("host", None) or "").strip().lower()
+    return json.dumps([name, host, args], sort_keys=True, default=str)
+
+
+class _Flight:
+    """One in-flight tool call that identical concurrent callers share."""
+
+    def __init__(self, future):
+        self.future = future
+        self.listeners = []  # on_progress callbacks of every caller sharing the call
+
+    def progress(self, event: dict):
+        for callback in list(self.listeners):
+            callback(event)
+
+
+def parse_log_level(line: str, previous: str = "INFO") -> str:
+    """Log level of one stderr line; indented lines (traceback frames) continue the previous record."""
+    match = _LEVEL_RE.search(line)
+    if match:
+        level = match.group(1)
+        return {"WARN": "WARNING", "FATAL": "CRITICAL"}.get(level, level)
+    if line.startswith("Traceback"):
+        return "ERROR"
+    if line[:1].isspace():
+        return previous
+    return "INFO"
+
+
+def filter_log(entries, min_level: str = "WARNING", limit: int | None = 20) -> list:
+    """Entries at or above min_level, oldest first, at most the last `limit`."""
+    threshold = LOG_LEVELS.get(min_level, 0)
+    selected = [e for e in entries if LOG_LEVELS.get(e["level"], 0) >= threshold]
+    return selected[-limit:] if limit else selected
+
+
+def _salvage_text(head: bytes) -> str:
+    """Best-effort decode of the first "text" string in a truncated JSON message."""
+    raw = head.decode("utf-8", errors="ignore")
+    match = _TEXT_RE.search(raw)
+    if not match:
+        return ""
+    body = raw[match.end():]
+    i = 0
+    while i < len(body):
+        if body[i] == "\\":
+            i += 2
+        elif body[i] == '"':
+            body = body[:i]  # The string ended inside the kept head
+            break
+        else:
+            i += 1
+    # Drop a trailing partial escape sequence (at most "\uXXX") until it decodes
+    for cut in range(0, 7):
+        try:
+            return json.loads('"' + body[: len(body) - cut] + '"')
+        except json.JSONDecodeError:
+            continue
+    return ""
+
+
 class LinuxMCPClient:
     """Client for the Linux MCP Server over stdio (same pattern as Claude Code / Cursor)."""
 
-    def __init__(self, command: str, args: list | None = None, env: dict | None = None):
+    def __init__(
+        self,
+        command: str,
+        args: list | None = None,
+        env: dict | None = None,
+        max_message_bytes: int | None = DEFAULT_MAX_MESSAGE_BYTES,
+        timeout: float = 120,
+        stderr_lines: int = DEFAULT_STDERR_LINES,
+    ):
         self.command = [command] + (args or [])
+        self.timeout = timeout  # Default per-request timeout; call_tool can pass a shorter one
+        self.max_message_bytes = max_message_bytes
+        self.truncated_responses = 0  # Oversized responses cut at max_message_bytes
+        self.cancelled_requests = 0  # Timed-out/abandoned requests we sent notifications/cancelled for
+        self.dropped_responses = 0  # Late responses for unknown, cancelled or expired IDs
         self.env = os.environ.copy()
         if env:
             self.env.update(env)
 
         self._id_counter = itertools.count(1)
         self._initialized = False
+        self._init_lock = Lock()
+        self.server_info = {}  # initialize result (protocolVersion, capabilities, serverInfo)
+        self.dialect = None  # "standard" or "legacy", decided once then reused
+        self._dialect_calls = {"standard": 0, "legacy": 0}
+        self.supports_batch = False  # JSON-RPC batch support, from the protocol version at initialize
+        self.batch_rounds = 0  # Rounds sent as one JSON-RPC batch
+        self.pipelined_rounds = 0  # Rounds sent as back-to-back requests in one write
         self._write_lock = Lock()  # Thread safety for stdin writes
-        self._responses = {}  # Dict of {req_id: response} for parallel requests
-        self._responses_lock = Lock()
+        self._pending = {}  # Dict of {req_id: Future} for in-flight requests
+        self._pending_lock = Lock()
+        self._progress_callbacks = {}  # Dict of {progressToken: callback(event)} for in-flight requests
+        self._exit_error = None  # Set once the server process is gone
+        self._closing = False
+        self.on_exit = None  # Optional callback(client) when the server exits unexpectedly
+        self._stderr = deque(maxlen=max(1, stderr_lines))  # Last server stderr lines: {time, level, line}
+        self.stderr_lines = 0  # Total stderr lines read
+        self.stderr_errors = 0  # ... of which ERROR or CRITICAL
 
         self.proc = subprocess.Popen(
             self.command,
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            text=True,
-            bufsize=1,
             env=self.env,
         )
         threading.Thread(target=self._reader, daemon=True).start()
+        # Always drain stderr: a full pipe would block the server's logging and stall every call
+        threading.Thread(target=self._stderr_reader, daemon=True).start()
+
+    def _stderr_reader(self):
+        """Keep the last server log lines in a ring buffer (over-long lines are cut, never buffered whole)."""
+        stderr = self.proc.stderr
+        level = "INFO"
+        try:
+            while True:
+                line = stderr.readline(MAX_STDERR_LINE_BYTES)
+                if not line:
+                    break
+                if not line.endswith(b"\n"):
+                    while True:  # Skip the rest of an over-long line
+                        rest = stderr.readline(MAX_STDERR_LINE_BYTES)
+                        if not rest or rest.endswith(b"\n"):
+                            break
+                text = line.decode("utf-8", "replace").rstrip()
+                if not text:
+                    continue
+                level = parse_log_level(text, level)
+                self._stderr.append({"time": time.time(), "level": level, "line": text})
+                self.stderr_lines += 1
+                if LOG_LEVELS[level] >= LOG_LEVELS["ERROR"]:
+                    self.stderr_errors += 1
+        except (OSError, ValueError):
+            pass  # stderr closed under us
+
+    def recent_stderr(self, min_level: str = "WARNING", limit: int | None = 20) -> list:
+        """Recent server stderr lines at or above min_level, oldest first."""
+        return filter_log(list(self._stderr), min_level, limit)
 
     def _reader(self):
-        """Read responses from stdout and store them by request ID."""
-        for line in self.proc.stdout:
-            line = line.strip()
-            if not line:
+        """Read newline-framed messages from stdout (bytes, no decode/strip copies) and dispatch them."""
+        stdout = self.proc.stdout
+        limit = self.max_message_bytes
+        try:
+            while True:
+                line = stdout.readline(limit + 1) if limit else stdout.readline()
+                if not line:
+                    break
+                if limit and len(line) > limit and not line.endswith(b"\n"):
+                    message = self._read_oversized(line, stdout)
+                elif line.isspace():
+                    continue
+                else:
+                    try:
+                        message = _json_loads(line)
+                    except ValueError:
+                        continue  # Ignore non-JSON lines (like debug output)
+                if isinstance(message, dict):
+                    self._dispatch(message)
+                elif isinstance(message, list):  # Batch response
+                    for item in message:
+                        if isinstance(item, dict):
+                            self._dispatch(item)
+        except (OSError, ValueError):
+            pass  # stdout closed under us
+        finally:
+            self._handle_exit()
+
+    def _dispatch(self, message: dict):
+        """Hand a response to the caller waiting on its ID; drop responses nobody is waiting for."""
+        if "id" not in message:
+            self._dispatch_notification(message)
+            return
+        with self._pending_lock:
+            future = self._pending.pop(message["id"], None)
+            if future is None:
+                self.dropped_responses += 1
+        if future is not None:
+            future.set_result(message)
+
+    def _dispatch_notification(self, message: dict):
+        """Route progress to the request that owns the token; log messages to every in-flight request.
+
+        Log notifications carry no request ID on stdio, so each caller with a callback sees them.
+        """
+        event = notification_event(message)
+        if event is None:
+            return
+        with self._pending_lock:
+            if event["type"] == "progress":
+                callbacks = [self._progress_callbacks.get(event["token"])]
+            else:
+                callbacks = list(self._progress_callbacks.values())
+        for callback in callbacks:
+            if callback is None:
                 continue
             try:
-                response = json.loads(line)
-                if "id" in response:
-                    with self._responses_lock:
-                        self._responses[response["id"]] = response
-            except json.JSONDecodeError:
-                pass  # Ignore non-JSON lines (like debug output)
+                callback(event)
+            except Exception as e:
+                print(f"[WARN] MCP progress callback failed: {e}")
+
+    def _read_oversized(self, head: bytes, stdout) -> dict | None:
+        """Keep the head of a message larger than max_message_bytes, stream past the rest.
+
+        Returns a response carrying the salvaged start of the tool's text output, so a
+        huge log or process list never sits in memory whole.
+        """
+        total = len(head)
+        tail = b""
+        while True:
+            chunk = stdout.readline(64 * 1024)
+            total += len(chunk)
+            tail = (tail + chunk)[-256:]
+            if not chunk or chunk.endswith(b"\n"):
+                break
+        self.truncated_responses += 1
+        match = _ID_RE.search(head[:256]) or _ID_RE.search(tail)
+        if not match:
+            return None
+        note = f"\n\n... (truncated: response was {total} bytes, limit {self.max_message_bytes})"
+        return {
+            "jsonrpc": "2.0",
+            "id": int(match.group(1)),
+            "result": {"content": [{"type": "text", "text": _salvage_text(head) + note}]},
+        }
+
+    def _handle_exit(self):
+        """EOF on stdout: the server is gone. Fail every in-flight request right away."""
+        try:
+            code = self.proc.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            code = self.proc.poll()
+        error = MCPServerExitedError(f"MCP server exited (code {code})")
+        with self._pending_lock:
+            self._exit_error = error
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for future in pending:
+            if not future.done():
+                future.set_exception(error)
+        if self.on_exit and not self._closing:
+            self.on_exit(self)
+
+    @property
+    def alive(self) -> bool:
+        """True while the server process is running and its stdout is open."""
+        return self._exit_error is None and self.proc.poll() is None
+
+    def _write(self, data: bytes):
+        """Thread-safe write (one flush) of already-framed bytes to stdin."""
+        try:
+            with self._write_lock:
+                self.proc.stdin.write(data)
+                self.proc.stdin.flush()
+        except (OSError, ValueError) as e:
+            raise MCPRequestNotSentError(f"MCP server is not accepting requests: {e}")
+
+    def _send(self, message: dict):
+        """Thread-safe write of one JSON-RPC message to stdin."""
+        self._write(_json_dumps(message) + b"\n")
 
     def _initialize(self):
-        """Send initialize then notifications/initialized (MCP spec)."""
+        """Send initialize then notifications/initialized (MCP spec), once."""
         if self._initialized:
             return
-        self._rpc(
-            method="initialize",
-            params={
-                "protocolVersion": "2024-11-05",
-                "capabilities": {"roots": {"listChanged": True}, "sampling": {}},
-                "clientInfo": {"name": "linux-mcp-chatbot", "version": "1.0.0"},
-            },
-        )
-        # Thread-safe write for notification
-        with self._write_lock:
-            self.proc.stdin.write(
-                json.dumps({"jsonrpc": "2.0", "method": "notifications/initialized"}) + "\n"
+        with self._init_lock:
+            if self._initialized:
+                return
+            result = self._rpc(
+                method="initialize",
+                params={
+                    "protocolVersion": "2024-11-05",
+                    "capabilities": {"roots": {"listChanged": True}, "sampling": {}},
+                    "clientInfo": {"name": "linux-mcp-chatbot", "version": "1.0.0"},
+                },
+            )
+            self.server_info = result if isinstance(result, dict) else {}
+            self.supports_batch = self.server_info.get("protocolVersion") in BATCH_PROTOCOL_VERSIONS
+            # A server that advertises the tools capability speaks the spec's tools/* methods
+            if "tools" in (self.server_info.get("capabilities") or {}):
+                self.dialect = "standard"
+            self._send({"jsonrpc": "2.0", "method": "notifications/initialized"})
+            self._initialized = True
+
+    def _dialect_rpc(self, kind: str, params: dict, legacy_params: dict, timeout: float | None = None, on_progress=None):
+        """Call tools/list or tools/call in the server's dialect.
+
+        Until the dialect is known, try the standard method and fall back to the legacy
+        one on "method not found"; the outcome is cached so later calls take one round-trip.
+        """
+        dialect = self.dialect or "standard"
+        method = DIALECT_METHODS[dialect][kind]
+        try:
+            result = self._rpc(
+                method=method,
+                params=params if dialect == "standard" else legacy_params,
+                timeout=timeout,
+                on_progress=on_progress,
+            )
+        except MCPClientError as e:
+            if self.dialect is not None or not is_method_not_found(e):
+                raise
+            dialect = "legacy"
+            result = self._rpc(
+                method=DIALECT_METHODS["legacy"][kind], params=legacy_params, timeout=timeout, on_progress=on_progress
             )
-            self.proc.stdin.flush()
-        self._initialized = True
+        with self._pending_lock:
+            if self.dialect is None:
+                self.dialect = dialect
+            self._dialect_calls[dialect] += 1
+        return result
 
-    def _rpc(self, method: str, params: dict):
+    def _register(self, method: str, params: dict, on_progress=None) -> tuple:
+        """Allocate an ID and register its future before anything is written, so a fast response can't be missed."""
         req_id = next(self._id_counter)
+        if on_progress is not None:
+            # Ask the server for notifications/progress tagged with this request's ID
+            params = dict(params, _meta={"progressToken": req_id})
         request = {
             "jsonrpc": "2.0",
             "id": req_id,
             "method": method,
             "params": params,
         }
-        # Thread-safe write to stdin
-        with self._write_lock:
-            self.proc.stdin.write(json.dumps(request) + "\n")
-            self.proc.stdin.flush()
-
-        # Wait for response (poll the dict)
-        import time
-        timeout = 120
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            with self._responses_lock:
-                if req_id in self._responses:
-                    response = self._responses.pop(req_id)
-                    if "error" in response:
-                        raise MCPClientError(response["error"])
-                    return response.get("result")
-            time.sleep(0.01)  # Poll every 10ms
-
-        raise MCPClientError("Timeout waiting for MCP response")
+        future = Future()
+        with self._pending_lock:
+            if self._exit_error is not None:
+                raise MCPRequestNotSentError(str(self._exit_error))
+            self._pending[req_id] = future
+            if on_progress is not None:
+                self._progress_callbacks[req_id] = on_progress
+        return req_id, request, future
+
+    def _forget(self, req_id: int) -> bool:
+        """Unregister a request; True if it was still waiting for its response."""
+        with self._pending_lock:
+            self._progress_callbacks.pop(req_id, None)
+            return self._pending.pop(req_id, None) is not None
+
+    def _await_response(self, req_id: int, method: str, future: Future, timeout: float):
+        """Block until _reader delivers the response (no polling); cancel on timeout or abandon."""
+        response = None
+        reason = "abandoned"
+        try:
+            try:
+                response = future.result(timeout=timeout)
+            except FutureTimeoutError:
+                reason = "timeout"
+                raise MCPClientError("Timeout waiting for MCP response")
+        finally:
+            abandoned = self._forget(req_id) and response is None
+            if abandoned and method != "initialize":
+                # Timed out or the caller bailed: tell the server to stop working on it
+                self._cancel(req_id, reason)
+
+        if "error" in response:
+            raise MCPClientError(response["error"])
+        return response.get("result")
+
+    def _rpc(self, method: str, params: dict, timeout: float | None = None, on_progress=None):
+        if timeout is None:
+            timeout = self.timeout
+        req_id, request, future = self._register(method, params, on_progress)
+        try:
+            self._send(request)
+        except MCPClientError:
+            self._forget(req_id)
+            raise
+        return self._await_response(req_id, method, future, timeout)
+
+    def _cancel(self, req_id: int, reason: str):
+        """Send notifications/cancelled for a request; its late response will be dropped."""
+        if self._exit_error is not None:
+            return
+        try:
+            self._send({
+                "jsonrpc": "2.0",
+                "method": "notifications/cancelled",
+                "params": {"requestId": req_id, "reason": reason},
+            })
+        except MCPClientError:
+            return
+        with self._pending_lock:
+            self.cancelled_requests += 1
+
+    def stats(self) -> dict:
+        """Counters for diagnostics (sidebar, logs)."""
+        with self._pending_lock:
+            return {
+                "pending": len(self._pending),
+                "stderr_lines": self.stderr_lines,
+                "stderr_errors": self.stderr_errors,
+                "cancelled_requests": self.cancelled_requests,
+                "dropped_responses": self.dropped_responses,
+                "truncated_responses": self.truncated_responses,
+                "calls_standard_dialect": self._dialect_calls["standard"],
+                "calls_legacy_dialect": self._dialect_calls["legacy"],
+                "batch_rounds": self.batch_rounds,
+                "pipelined_rounds": self.pipelined_rounds,
+            }
 
     def list_tools(self) -> list:
         """Return list of tools (each with name, description, etc.)."""
         self._initialize()
-        try:
-            result = self._rpc(method="tools/list", params={})
-        except MCPClientError as e:
-            if "method" in str(e).lower() or "not found" in str(e).lower():
-                result = self._rpc(method="listTools", params={})
-            else:
-                raise
+        result = self._dialect_rpc("list", {}, {})
         if not result:
             return []
         tools = result.get("tools") if isinstance(result, dict) else result
         return tools if isinstance(tools, list) else []
 
-    def call_tool(self, name: str, arguments: dict) -> str:
-        """Call tool by name with arguments. Returns combined text from result content."""
+    def call_tool(self, name: str, arguments: dict, timeout: float | None = None, on_progress=None) -> str:
+        """Call tool by name with arguments. Returns combined text from result content.
+
+        timeout overrides the client default, e.g. with what is left of a query's time budget.
+        on_progress(event) receives {"type": "progress"|"log", ...} while the call runs.
+        """
         self._initialize()
+        result = self._dialect_rpc(
+            "call",
+            {"name": name, "arguments": arguments or {}},
+            {"tool": name, "args": arguments or {}},
+            timeout=timeout,
+            on_progress=on_progress,
+        )
+        return tool_result_text(result)
+
+    def _call_or_error(self, call: tuple, timeout: float | None):
         try:
-            result = self._rpc(
-                method="tools/call",
-                params={"name": name, "arguments": arguments or {}},
-            )
+            return self.call_tool(call[0], call[1], timeout=_call_timeout(call, timeout),
+                                  on_progress=call[2] if len(call) > 2 else None)
         except MCPClientError as e:
-            if "method" in str(e).lower() or "not found" in str(e).lower():
-                result = self._rpc(
-                    method="callTool",
-                    params={"tool": name, "args": arguments or {}},
-                )
+            return e
+
+    def call_tools_batch(self, calls: list, timeout: float | None = None) -> list:
+        """Send a round of independent tool calls with one write and one flush.
+
+        calls: [(name, arguments), (name, arguments, on_progress) or (name, arguments, on_progress,
+        timeout), ...]; a call's own timeout overrides `timeout`. The round goes out as a single
+        JSON-RPC batch if the negotiated protocol version has batches, else as pipelined requests.
+        Results come back in input order; a failed call's slot holds its MCPClientError instead of text.
+        """
+        self._initialize()
+        if not calls:
+            return []
+        if self.dialect is None:
+            # Let the first call settle the dialect so the rest can be written directly
+            return [self._call_or_error(calls[0], timeout)] + self.call_tools_batch(calls[1:], timeout)
+
+        dialect = self.dialect
+        method = DIALECT_METHODS[dialect]["call"]
+        registered = []
+        try:
+            for call in calls:
+                name, arguments = call[0], call[1] or {}
+                if dialect == "standard":
+                    params = {"name": name, "arguments": arguments}
+                else:
+                    params = {"tool": name, "args": arguments}
+                registered.append(self._register(method, params, call[2] if len(call) > 2 else None))
+            requests = [request for _, request, _ in registered]
+            if self.supports_batch:
+                self._write(_json_dumps(requests) + b"\n")
             else:
-                raise
-        if not result:
-            return ""
-        if isinstance(result, dict):
-            content = result.get("content") or []
-            texts = [
-                c.get("text", "")
-                for c in content
-                if isinstance(c, dict) and c.get("type") == "text"
-            ]
-            return "\n".join(texts) if texts else str(result)
-        return str(result)
+                self._write(b"".join(_json_dumps(request) + b"\n" for request in requests))
+        except MCPClientError:
+            for req_id, _, _ in registered:
+                self._forget(req_id)
+            raise
+        with self._pending_lock:
+            if self.supports_batch:
+                self.batch_rounds += 1
+            else:
+                self.pipelined_rounds += 1
+            self._dialect_calls[dialect] += len(calls)
+
+        # Demultiplex: every call waits on its own future until its own deadline, earliest deadline
+        # first, so a short timeout is enforced (and the request cancelled) on time
+        sent = time.monotonic()
+        deadlines = [sent + _call_timeout(call, timeout if timeout is not None else self.timeout) for call in calls]
+        results = [None] * len(calls)
+        for pos in sorted(range(len(calls)), key=deadlines.__getitem__):
+            req_id, _, future = registered[pos]
+            try:
+                result = self._await_response(req_id, method, future, max(0.0, deadlines[pos] - time.monotonic()))
+                results[pos] = tool_result_text(result)
+            except MCPClientError as e:
+                results[pos] = e
+        return results
 
     def close(self):
+        self._closing = True
         try:
             self.proc.terminate()
         except Exception:
             pass
+
+
+def _call_timeout(call: tuple, timeout: float | None) -> float | None:
+    """A batched call's own timeout (4th element) if it has one, else the round's."""
+    return call[3] if len(call) > 3 and call[3] is not None else timeout
+
+
+class ToolCallBatcher:
+    """Coalesce call_tool calls from concurrent threads into call_tools_batch rounds.
+
+    A call made while no other call is queued or in flight is sent right away. Otherwise
+    it opens (or joins) a `window`-second collection window; every call arriving before
+    it closes (up to max_batch) is sent with it, keeps its own timeout and gets its own
+    result back. Wraps any client with call_tools_batch (LinuxMCPClient or the mcp_pool
+    wrappers).
+    """
+
+    def __init__(self, client, window: float = 0.005, max_batch: int = 16):
+        self.client = client
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self._queue = []  # [(call, future), ...] waiting for the window to close
+        self._timer: threading.Timer | None = None
+        self._in_flight = 0  # Calls sent and not answered yet
+        self._lock = Lock()
+
+    def call_tool(self, name: str, arguments: dict, timeout: float | None = None, on_progress=None) -> str:
+        with self._lock:
+            direct = not self._queue and self._in_flight == 0
+            if direct:
+                self._in_flight += 1
+        if direct:
+            # Nothing to batch with: don't make a lone call wait for the window
+            try:
+                return self.client.call_tool(name, arguments, timeout=timeout, on_progress=on_progress)
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+        future = Future()
+        with self._lock:
+            self._queue.append(((name, arguments, on_progress, timeout), future))
+            batch = self._take_locked() if len(self._queue) >= self.max_batch else None
+            if batch is None and self._timer is None:
+                self._timer = threading.Timer(self.window, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if batch:
+            self._send(batch)
+        try:
+            # The round's results arrive together; a short deadline must not wait for slower calls
+            result = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            raise MCPClientError("Timeout waiting for MCP response")
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def _take_locked(self) -> list:
+        batch, self._queue = self._queue, []
+        self._in_flight += len(batch)
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _flush(self):
+        with self._lock:
+            batch = self._take_locked()
+        if batch:
+            self._send(batch)
+
+    def _send(self, batch: list):
+        try:
+            if len(batch) == 1:
+                (name, arguments, on_progress, timeout), _ = batch[0]
+                try:
+                    results = [self.client.call_tool(name, arguments, timeout=timeout, on_progress=on_progress)]
+                except MCPClientError as e:
+                    results = [e]
+            else:
+                # Each call carries its own timeout (the caller's remaining query budget)
+                results = self.client.call_tools_batch([call for call, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        with self._lock:
+            self._in_flight -= len(batch)
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def call_tools_batch(self, calls: list, timeout: float | None = None) -> list:
+        return self.client.call_tools_batch(calls, timeout=timeout)
+
+    def list_tools(self) -> list:
+        return self.client.list_tools()
+
+    def stats(self) -> dict:
+        return self.client.stats()
+
+    def recent_stderr(self, min_level: str = "WARNING", limit: int | None = 20) -> list:
+        return self.client.recent_stderr(min_level, limit)
+
+    def _initialize(self):
+        self.client._initialize()
+
+    @property
+    def server_info(self) -> dict:
+        return self.client.server_info
+
+    def close(self):
+        self._flush()
+        self.client.close()
+
+
+class SingleFlightMCPClient:
+    """Share one RPC between identical concurrent call_tool calls (same tool, host and arguments).
+
+    The first caller sends the request; callers arriving while it is in flight wait
+    for the same result (or error) and get its progress events too. Only calls that
+    overlap are merged; nothing is kept once the call returns.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.coalesced_calls = 0  # Calls answered by another caller's in-flight request
+        self._flights = {}  # {call_key: _Flight}
+        self._lock = Lock()
+
+    def call_tool(self, name: str, arguments: dict, timeout: float | None = None, on_progress=None) -> str:
+        key = call_key(name, arguments)
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight(Future())
+            else:
+                self.coalesced_calls += 1
+            if on_progress is not None:
+                flight.listeners.append(on_progress)
+
+        if not leader:
+            try:
+                return flight.future.result(timeout=timeout)
+            except FutureTimeoutError:
+                raise MCPClientError(f"Timeout waiting for MCP response to tools/call ({name}, shared)")
+
+        try:
+            result = self.client.call_tool(name, arguments, timeout=timeout, on_progress=flight.progress)
+        except BaseException as e:
+            with self._lock:
+                del self._flights[key]
+            flight.future.set_exception(e)
+            raise
+        with self._lock:
+            del self._flights[key]
+        flight.future.set_result(result)
+        return result
+
+    def call_tools_batch(self, calls: list, timeout: float | None = None) -> list:
+        return self.client.call_tools_batch(calls, timeout=timeout)
+
+    def list_tools(self) -> list:
+        return self.client.list_tools()
+
+    def stats(self) -> dict:
+        return dict(self.client.stats(), coalesced_calls=self.coalesced_calls)
+
+    def recent_stderr(self, min_level: str = "WARNING", limit: int | None = 20) -> list:
+        return self.client.recent_stderr(min_level, limit)
+
+    def _initialize(self):
+        self.client._initialize()
+
+    @property
+    def server_info(self) -> dict:
+        return self.client.server_info
+
+    def close(self):
+        self.client.close()
+
+
+class _FairSemaphore:
+    """Counting semaphore that grants slots strictly in arrival order (FIFO)."""
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.active = 0
+        self._waiters = deque()  # Events of queued callers, oldest first
+        self._lock = Lock()
+
+    def acquire(self, timeout: float | None = None) -> bool:
+        with self._lock:
+            if self.active < self.limit and not self._waiters:
+                self.active += 1
+                return True
+            waiter = threading.Event()
+            self._waiters.append(waiter)
+        if waiter.wait(timeout):
+            return True
+        with self._lock:
+            if waiter.is_set():
+                return True  # Granted between the timeout and taking the lock
+            self._waiters.remove(waiter)
+            return False
+
+    def release(self):
+        with self._lock:
+            if self._waiters:
+                self._waiters.popleft().set()  # Hand the slot straight to the oldest waiter
+            else:
+                self.active -= 1
+
+    def queued(self) -> int:
+        with self._lock:
+            return len(self._waiters)
+
+
+class HostLimitedMCPClient:
+    """Allow at most `per_host` concurrent call_tool calls per remote host.
+
+    The server opens one SSH channel per call, so bursts against one host can exceed
+    sshd's MaxSessions/MaxStartups. Extra calls queue in FIFO order (across all
+    sessions); time spent queued is counted separately from time spent executing.
+    Calls without a host (local) are not limited.
+    """
+
+    def __init__(self, client, per_host: int = 4):
+        self.client = client
+        self.per_host = max(1, per_host)
+        self._hosts = {}  # {host: _FairSemaphore}
+        self._lock = Lock()
+        self.queued_calls = 0  # Calls that had to wait for a slot
+        self.queue_wait_seconds = 0.0
+        self.exec_seconds = 0.0
+
+    def _semaphore(self, host: str) -> _FairSemaphore:
+        with self._lock:
+            semaphore = self._hosts.get(host)
+            if semaphore is None:
+                semaphore = self._hosts[host] = _FairSemaphore(self.per_host)
+            return semaphore
+
+    def call_tool(self, name: str, arguments: dict, timeout: float | None = None, on_progress=None) -> str:
+        host = ((arguments or {}).get("host") or "").strip().lower()
+        if not host:
+            return self.client.call_tool(name, arguments, timeout=timeout, on_progress=on_progress)
+        semaphore = self._semaphore(host)
+        queued_at = time.monotonic()
+        if not semaphore.acquire(timeout=0):
+            if on_progress is not None:
+                on_progress({"type": "log", "level": "info", "message": f"waiting for a free slot on {host}"})
+            if not semaphore.acquire(timeout=timeout):
+                with self._lock:
+                    self.queued_calls += 1
+                    self.queue_wait_seconds += time.monotonic() - queued_at
+                raise MCPClientError(f"Timeout waiting for a free slot on {host} ({self.per_host} calls already running)")
+            waited = time.monotonic() - queued_at
+            with self._lock:
+                self.queued_calls += 1
+                self.queue_wait_seconds += waited
+            if timeout is not None:
+                timeout = max(0.0, timeout - waited)
+        started = time.monotonic()
+        try:
+            return self.client.call_tool(name, arguments, timeout=timeout, on_progress=on_progress)
+        finally:
+            semaphore.release()
+            with self._lock:
+                self.exec_seconds += time.monotonic() - started
+
+    def call_tools_batch(self, calls: list, timeout: float | None = None) -> list:
+        # Not limited: a batch is one caller's round (use ToolCallBatcher below this wrapper to batch limited calls)
+        return self.client.call_tools_batch(calls, timeout=timeout)
+
+    def list_tools(self) -> list:
+        return self.client.list_tools()
+
+    def stats(self) -> dict:
+        with self._lock:
+            queued_now = sum(s.queued() for s in self._hosts.values())
+            return dict(
+                self.client.stats(),
+                host_queued_calls=self.queued_calls,
+                host_queued_now=queued_now,
+                host_queue_wait_ms=int(self.queue_wait_seconds * 1000),
+                host_exec_ms=int(self.exec_seconds * 1000),
+            )
+
+    def recent_stderr(self, min_level: str = "WARNING", limit: int | None = 20) -> list:
+        return self.client.recent_stderr(min_level, limit)
+
+    def _initialize(self):
+        self.client._initialize()
+
+    @property
+    def server_info(self) -> dict:
+        return self.client.server_info
+
+    def close(self):
+        self.client.close()
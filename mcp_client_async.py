@@ -0,0 +1,515 @@
+"""
+Async MCP client for Linux MCP Server (stdio and streamable-http transports).
+
+Lets the agent run a whole round of tool calls concurrently on one event loop
+(`graph.ainvoke`) instead of one OS thread per tool call.
+"""
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from mcp_client import (
+    DIALECT_METHODS,
+    MCPClientError,
+    MCPServerExitedError,
+    _Flight,
+    call_key,
+    is_method_not_found,
+    notification_event,
+    tool_result_text,
+)
+
+try:
+    import httpx
+    HAS_HTTPX = True
+except ImportError:
+    HAS_HTTPX = False
+
+# asyncio's default StreamReader limit (64 KiB) is too small for large tool outputs
+_STDIO_LINE_LIMIT = 64 * 1024 * 1024
+
+_INITIALIZE_PARAMS = {
+    "protocolVersion": "2024-11-05",
+    "capabilities": {"roots": {"listChanged": True}, "sampling": {}},
+    "clientInfo": {"name": "linux-mcp-chatbot", "version": "1.0.0"},
+}
+
+
+class _StdioTransport:
+    """JSON-RPC over a subprocess' stdin/stdout, one message per line."""
+
+    def __init__(self, proc: asyncio.subprocess.Process):
+        self.proc = proc
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._progress: Dict[int, Any] = {}  # {request id: on_progress callback}
+        self._exit_error: Optional[MCPClientError] = None  # Set once stdout is gone; later requests fail fast
+        self._reader_task = asyncio.get_running_loop().create_task(self._reader())
+
+    @classmethod
+    async def start(cls, command: List[str], env: dict) -> "_StdioTransport":
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *command,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=None,  # Inherit, so server logs can never fill a pipe and block it
+                env=env,
+                limit=_STDIO_LINE_LIMIT,
+            )
+        except OSError as e:  # A bad MCP_COMMAND: FileNotFoundError, PermissionError
+            raise MCPClientError(f"Could not start MCP server {command[0]!r}: {e}") from e
+        return cls(proc)
+
+    async def _reader(self):
+        """Resolve the pending future for each response; fail the rest (and later requests) on EOF."""
+        reason = "closed stdout"
+        try:
+            while True:
+                line = await self.proc.stdout.readline()
+                if not line:
+                    break
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Ignore non-JSON lines (like debug output)
+                if not isinstance(message, dict):
+                    continue  # Valid JSON but not a message (a bare number or string)
+                if "id" in message:
+                    future = self._pending.pop(message["id"], None)
+                    if future is not None and not future.done():
+                        future.set_result(message)
+                else:
+                    _route_notification(message, self._progress)
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self.proc.wait(), 1)  # For the exit code in the error
+        except (OSError, ValueError, asyncio.LimitOverrunError, asyncio.IncompleteReadError) as e:
+            # ValueError: readline's "chunk is longer than limit" for a line over _STDIO_LINE_LIMIT
+            reason = f"stdout failed: {e}"
+        finally:
+            error = MCPServerExitedError(f"MCP server {reason} (code {self.proc.returncode})")
+            self._exit_error = error
+            pending = list(self._pending.values())
+            self._pending.clear()
+            for future in pending:
+                if not future.done():
+                    future.set_exception(error)
+
+    async def _send(self, message: dict):
+        if self._exit_error is not None:
+            raise self._exit_error
+        try:
+            self.proc.stdin.write((json.dumps(message) + "\n").encode())
+            await self.proc.stdin.drain()
+        except (OSError, RuntimeError) as e:
+            # BrokenPipeError / ConnectionResetError("Connection lost") once the server is gone
+            raise MCPServerExitedError(f"MCP server is gone: {e}") from e
+
+    async def request(self, message: dict, timeout: float, on_progress=None) -> dict:
+        if self._exit_error is not None:
+            raise self._exit_error
+        future = asyncio.get_running_loop().create_future()
+        self._pending[message["id"]] = future
+        if on_progress is not None:
+            self._progress[message["id"]] = on_progress
+        try:
+            await self._send(message)
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise MCPClientError("Timeout waiting for MCP response")
+        finally:
+            self._pending.pop(message["id"], None)
+            self._progress.pop(message["id"], None)
+
+    async def notify(self, message: dict, timeout: float):
+        await self._send(message)
+
+    async def close(self):
+        self._reader_task.cancel()
+        try:
+            self.proc.terminate()
+        except ProcessLookupError:
+            pass
+        # Reap it, so its pipes are closed while the loop is still running
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self.proc.wait(), 5)
+
+
+def _route_notification(message: dict, callbacks: Dict[int, Any]):
+    """Progress goes to the request owning the token; log messages to every in-flight request."""
+    event = notification_event(message)
+    if event is None:
+        return
+    if event["type"] == "progress":
+        targets = [callbacks.get(event["token"])]
+    else:
+        targets = list(callbacks.values())
+    for callback in targets:
+        if callback is None:
+            continue
+        try:
+            callback(event)
+        except Exception as e:
+            print(f"[WARN] MCP progress callback failed: {e}")
+
+
+def _iter_http_messages(body: str):
+    """Yield JSON-RPC messages from a plain JSON or SSE (text/event-stream) body."""
+    stripped = body.lstrip()
+    if stripped.startswith("{") or stripped.startswith("["):
+        data = json.loads(stripped)
+        yield from (data if isinstance(data, list) else [data])
+        return
+    event_data = []
+    for line in body.splitlines() + [""]:
+        if line.startswith("data:"):
+            event_data.append(line[5:].lstrip())
+        elif not line.strip() and event_data:
+            try:
+                yield json.loads("\n".join(event_data))
+            except json.JSONDecodeError:
+                pass
+            event_data = []
+
+
+class _HTTPTransport:
+    """JSON-RPC over the MCP streamable-http transport."""
+
+    def __init__(self, base_url: str, timeout: float):
+        if not HAS_HTTPX:
+            raise MCPClientError("httpx is required for the async HTTP transport (pip install httpx)")
+        self.base_url = base_url
+        self._client = httpx.AsyncClient(timeout=timeout)
+        self._session_id: Optional[str] = None
+
+    def _headers(self) -> dict:
+        headers = {
+            "Content-Type": "application/json",
+            "Accept": "application/json, text/event-stream",
+        }
+        if self._session_id:
+            headers["Mcp-Session-Id"] = self._session_id
+        return headers
+
+    def _remember_session(self, response: "httpx.Response"):
+        session_id = response.headers.get("mcp-session-id")
+        if session_id:
+            self._session_id = session_id
+
+    async def request(self, message: dict, timeout: float, on_progress=None) -> dict:
+        """POST one request; read the SSE stream as it arrives so progress shows up live."""
+        callbacks = {message["id"]: on_progress} if on_progress is not None else {}
+
+        async def _exchange() -> list:
+            async with self._client.stream(
+                "POST", self.base_url, json=message, headers=self._headers(), timeout=timeout
+            ) as response:
+                response.raise_for_status()
+                self._remember_session(response)
+                if "text/event-stream" not in response.headers.get("content-type", ""):
+                    body = (await response.aread()).decode("utf-8", errors="replace")
+                    return list(_iter_http_messages(body))
+                event_data = []
+                async for line in response.aiter_lines():
+                    if line.startswith("data:"):
+                        event_data.append(line[5:].lstrip())
+                        continue
+                    if line.strip() or not event_data:
+                        continue
+                    reply = json.loads("\n".join(event_data))
+                    event_data = []
+                    if isinstance(reply, dict) and reply.get("id") == message["id"]:
+                        return [reply]
+                    if isinstance(reply, dict):
+                        _route_notification(reply, callbacks)
+                return []
+
+        try:
+            replies = await asyncio.wait_for(_exchange(), timeout)
+        except (asyncio.TimeoutError, httpx.TimeoutException):
+            raise MCPClientError(f"Request timed out after {timeout}s")
+        except httpx.HTTPError as e:
+            raise MCPClientError(f"HTTP error: {e}")
+        except json.JSONDecodeError as e:
+            raise MCPClientError(f"Invalid response format: {e}")
+        for reply in replies:
+            if isinstance(reply, dict) and reply.get("id") == message["id"]:
+                return reply
+        raise MCPClientError(f"No response for request {message['id']} ({message['method']})")
+
+    async def notify(self, message: dict, timeout: float):
+        try:
+            response = await self._client.post(self.base_url, json=message, headers=self._headers(), timeout=timeout)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            raise MCPClientError(f"HTTP error: {e}")
+        self._remember_session(response)
+
+    async def close(self):
+        await self._client.aclose()
+
+
+class AsyncLinuxMCPClient:
+    """Asyncio client for the Linux MCP Server. Create with `await stdio(...)` or `http(...)`."""
+
+    def __init__(self, transport, timeout: float = 120, per_host: int = 0):
+        self._transport = transport
+        self.timeout = timeout
+        self.per_host = per_host  # Max concurrent calls per remote host (0 = unlimited)
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}  # FIFO: waiters are woken in order
+        self.queued_calls = 0
+        self.queue_wait_seconds = 0.0
+        self.exec_seconds = 0.0
+        self._id_counter = itertools.count(1)
+        self._initialized = False
+        self._init_lock = asyncio.Lock()
+        self.server_info: dict = {}
+        self.dialect: Optional[str] = None  # "standard" or "legacy", decided once then reused
+        self._flights: Dict[str, _Flight] = {}  # Identical in-flight tool calls share one request
+        self.coalesced_calls = 0
+
+    @classmethod
+    async def stdio(
+        cls,
+        command: str,
+        args: list | None = None,
+        env: dict | None = None,
+        timeout: float = 120,
+        per_host: int = 0,
+    ) -> "AsyncLinuxMCPClient":
+        """Start the MCP server as a subprocess (must be awaited on the loop that will use it)."""
+        full_env = os.environ.copy()
+        if env:
+            full_env.update(env)
+        transport = await _StdioTransport.start([command] + (args or []), full_env)
+        return cls(transport, timeout=timeout, per_host=per_host)
+
+    @classmethod
+    def http(cls, base_url: str, timeout: float = 120, per_host: int = 0) -> "AsyncLinuxMCPClient":
+        """Connect to an MCP server running with LINUX_MCP_TRANSPORT=streamable-http."""
+        return cls(_HTTPTransport(base_url, timeout), timeout=timeout, per_host=per_host)
+
+    @contextlib.asynccontextmanager
+    async def _host_slot(self, arguments: dict, timeout: Optional[float], on_progress):
+        """Hold one of the host's per_host slots; yields the timeout left after queueing."""
+        host = ((arguments or {}).get("host") or "").strip().lower()
+        if not host or self.per_host <= 0:
+            yield timeout
+            return
+        semaphore = self._host_semaphores.setdefault(host, asyncio.Semaphore(self.per_host))
+        loop = asyncio.get_running_loop()
+        if semaphore.locked():
+            on_progress({"type": "log", "level": "info", "message": f"waiting for a free slot on {host}"})
+            queued_at = loop.time()
+            try:
+                await asyncio.wait_for(semaphore.acquire(), self.timeout if timeout is None else timeout)
+            except asyncio.TimeoutError:
+                raise MCPClientError(f"Timeout waiting for a free slot on {host} ({self.per_host} calls already running)")
+            finally:
+                self.queued_calls += 1
+                self.queue_wait_seconds += loop.time() - queued_at
+            if timeout is not None:
+                timeout = max(0.0, timeout - (loop.time() - queued_at))
+        else:
+            await semaphore.acquire()
+        started = loop.time()
+        try:
+            yield timeout
+        finally:
+            semaphore.release()
+            self.exec_seconds += loop.time() - started
+
+    async def _rpc(self, method: str, params: dict, timeout: Optional[float] = None, on_progress=None):
+        req_id = next(self._id_counter)
+        if on_progress is not None:
+            params = dict(params, _meta={"progressToken": req_id})
+        request = {
+            "jsonrpc": "2.0",
+            "id": req_id,
+            "method": method,
+            "params": params,
+        }
+        response = await self._transport.request(
+            request, self.timeout if timeout is None else timeout, on_progress=on_progress
+        )
+        if "error" in response:
+            raise MCPClientError(response["error"])
+        return response.get("result")
+
+    async def _initialize(self):
+        """Send initialize then notifications/initialized (MCP spec), once."""
+        if self._initialized:
+            return
+        async with self._init_lock:
+            if self._initialized:
+                return
+            result = await self._rpc(method="initialize", params=_INITIALIZE_PARAMS)
+            self.server_info = result if isinstance(result, dict) else {}
+            if "tools" in (self.server_info.get("capabilities") or {}):
+                self.dialect = "standard"
+            await self._transport.notify(
+                {"jsonrpc": "2.0", "method": "notifications/initialized"}, self.timeout
+            )
+            self._initialized = True
+
+    async def _dialect_rpc(
+        self, kind: str, params: dict, legacy_params: dict, timeout: Optional[float] = None, on_progress=None
+    ):
+        """Same dialect handling as LinuxMCPClient._dialect_rpc: detect once, then call directly."""
+        dialect = self.dialect or "standard"
+        try:
+            result = await self._rpc(
+                DIALECT_METHODS[dialect][kind],
+                params if dialect == "standard" else legacy_params,
+                timeout,
+                on_progress,
+            )
+        except MCPClientError as e:
+            if self.dialect is not None or not is_method_not_found(e):
+                raise
+            dialect = "legacy"
+            result = await self._rpc(DIALECT_METHODS["legacy"][kind], legacy_params, timeout, on_progress)
+        if self.dialect is None:
+            self.dialect = dialect
+        return result
+
+    async def list_tools(self) -> list:
+        """Return list of tools (each with name, description, etc.)."""
+        await self._initialize()
+        result = await self._dialect_rpc("list", {}, {})
+        if not result:
+            return []
+        tools = result.get("tools") if isinstance(result, dict) else result
+        return tools if isinstance(tools, list) else []
+
+    async def call_tool(
+        self, name: str, arguments: dict, timeout: Optional[float] = None, on_progress=None
+    ) -> str:
+        """Call tool by name with arguments. Returns combined text from result content.
+
+        on_progress(event) receives progress and log events while the call runs (see LinuxMCPClient).
+        A call identical to one already in flight (same tool, host and arguments) waits for that
+        request's result instead of sending its own.
+        """
+        key = call_key(name, arguments)
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.coalesced_calls += 1
+            if on_progress is not None:
+                flight.listeners.append(on_progress)
+            try:
+                text, error = await asyncio.wait_for(
+                    asyncio.shield(flight.future), self.timeout if timeout is None else timeout
+                )
+            except asyncio.TimeoutError:
+                raise MCPClientError(f"Timeout waiting for MCP response to tools/call ({name}, shared)")
+            if error is not None:
+                raise error
+            return text
+
+        # The shared future holds (text, error) so a failure nobody else awaited isn't logged as unretrieved
+        flight = self._flights[key] = _Flight(asyncio.get_running_loop().create_future())
+        if on_progress is not None:
+            flight.listeners.append(on_progress)
+        text, error = None, None
+        try:
+            await self._initialize()
+            async with self._host_slot(arguments, timeout, flight.progress) as remaining:
+                result = await self._dialect_rpc(
+                    "call",
+                    {"name": name, "arguments": arguments or {}},
+                    {"tool": name, "args": arguments or {}},
+                    timeout=remaining,
+                    on_progress=flight.progress,
+                )
+            text = tool_result_text(result)
+            return text
+        except asyncio.CancelledError:
+            error = MCPClientError(f"tools/call ({name}) was cancelled")
+            raise
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            del self._flights[key]
+            flight.future.set_result((text, error))
+
+    async def call_many(
+        self,
+        calls: Sequence[Tuple[str, dict]],
+        max_concurrency: int = 8,
+        return_exceptions: bool = False,
+    ) -> list:
+        """Run [(name, args), ...] concurrently, at most max_concurrency at a time. Results keep input order."""
+        await self._initialize()
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def _one(name: str, arguments: dict):
+            async with semaphore:
+                return await self.call_tool(name, arguments)
+
+        return await asyncio.gather(
+            *(_one(name, arguments) for name, arguments in calls),
+            return_exceptions=return_exceptions,
+        )
+
+    def stats(self) -> dict:
+        return {
+            "coalesced_calls": self.coalesced_calls,
+            "host_queued_calls": self.queued_calls,
+            "host_queue_wait_ms": int(self.queue_wait_seconds * 1000),
+            "host_exec_ms": int(self.exec_seconds * 1000),
+        }
+
+    async def close(self):
+        await self._transport.close()
+
+
+class EventLoopThread:
+    """An asyncio loop running forever in a daemon thread (same approach as LinuxMCPClientSDK)."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """Run a coroutine on the loop from any other thread and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+
+
+class BlockingMCPClient:
+    """Sync facade over an AsyncLinuxMCPClient, for code paths that still call tools synchronously."""
+
+    def __init__(self, client: AsyncLinuxMCPClient, runner: EventLoopThread):
+        self.client = client
+        self.runner = runner
+
+    def list_tools(self) -> List[Dict[str, Any]]:
+        return self.runner.run(self.client.list_tools())
+
+    def call_tool(self, name: str, arguments: dict, timeout: Optional[float] = None, on_progress=None) -> str:
+        return self.runner.run(self.client.call_tool(name, arguments, timeout=timeout, on_progress=on_progress))
+
+    def stats(self) -> dict:
+        return self.client.stats()
+
+    def _initialize(self):
+        self.runner.run(self.client._initialize())
+
+    @property
+    def server_info(self) -> dict:
+        return self.client.server_info
+
+    def close(self):
+        self.runner.run(self.client.close())
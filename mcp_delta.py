@@ -0,0 +1,223 @@
+"""
+Delta mode: tell the LLM what changed since the last time it saw a tool's output.
+
+Iterative troubleshooting ("is it still high?") re-runs the same tool on the
+same host, and the answer is in how the numbers moved. An ObservationLog (one
+per chat session) remembers the last output per (tool, host, arguments) and
+what it was shown in (the agent run, or the kept chat history). A repeat whose
+previous output is still in the model's context is sent as the change summary
+only: changed rows with their numbers as old->new, new and gone rows, and a
+count of unchanged ones. Otherwise the model no longer has the old output, so
+the full current output follows the summary; nothing is left out either way.
+"""
+import json
+import re
+import time
+from collections import Counter, OrderedDict
+from threading import Lock
+
+from mcp_client import call_key
+from mcp_snapshots import format_age
+
+# Tools whose output is state worth diffing (logs already keep the newest lines)
+DEFAULT_DELTA_TOOLS = {
+    "list_processes",
+    "get_process_info",
+    "get_memory_information",
+    "get_cpu_information",
+    "get_disk_usage",
+    "list_services",
+    "get_service_status",
+    "get_network_connections",
+    "get_listening_ports",
+}
+# Room for the change summary above the output; changes beyond it are only counted
+DEFAULT_SUMMARY_CHARS = 400
+
+_NUMBER_RE = re.compile(r"^[-+]?\d+(?:\.\d+)?(?:%|[KMGTP]i?B?|[kKMGT]|ms|s)?$")
+# "failed: kdump, dnf-makecache": a labelled list, diffed item by item
+_LIST_RE = re.compile(r"^([\w -]+): ([^;]+, [^;]+)$")
+
+
+def _is_number(token: str) -> bool:
+    return bool(_NUMBER_RE.match(token.strip("(),;:")))
+
+
+def _json_fields(text: str) -> dict | None:
+    """{"ram.used": 8123, ...} for a JSON object result, None for other text."""
+    if not text.lstrip().startswith("{"):
+        return None
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    fields = {}
+
+    def walk(value, path: str):
+        if isinstance(value, dict):
+            for key, item in value.items():
+                walk(item, f"{path}.{key}" if path else str(key))
+        elif isinstance(value, list):
+            for i, item in enumerate(value):
+                walk(item, f"{path}[{i}]")
+        else:
+            fields[path] = value
+
+    walk(data, "")
+    return fields
+
+
+def _rows(text: str) -> "OrderedDict[str, str]":
+    """Lines keyed by their non-numeric tokens (plus the first token, e.g. a PID)."""
+    rows = OrderedDict()
+    seen = Counter()
+    for line in text.splitlines():
+        tokens = line.split()
+        if not tokens:
+            continue
+        match = _LIST_RE.match(line)
+        if match:
+            key = f"{match.group(1)}:"
+        else:
+            key = " ".join([tokens[0]] + [t for t in tokens[1:] if not _is_number(t)])
+        seen[key] += 1
+        rows[f"{key}#{seen[key]}" if seen[key] > 1 else key] = line
+    return rows
+
+
+def _changed_line(old: str, new: str) -> str:
+    """`new` with each changed number written as old->new (or both lines if they don't align).
+
+    Labelled lists show the items added (+) and removed (-) instead.
+    """
+    old_list, new_list = _LIST_RE.match(old), _LIST_RE.match(new)
+    if old_list and new_list:
+        before, after = old_list.group(2).split(", "), new_list.group(2).split(", ")
+        gone, kept = set(before) - set(after), set(before)
+        items = [f"+{item}" for item in after if item not in kept] + [f"-{item}" for item in before if item in gone]
+        return f"{new_list.group(1)}: {', '.join(items)} (now {len(after)})"
+    old_tokens, new_tokens = old.split(), new.split()
+    if len(old_tokens) != len(new_tokens):
+        return f"{new}   (was: {old})"
+    return " ".join(
+        f"{a}->{b}" if a != b and _is_number(a) and _is_number(b) else b for a, b in zip(old_tokens, new_tokens)
+    )
+
+
+def _fields_delta(old: dict, new: dict) -> tuple:
+    lines, unchanged = [], 0
+    for path, value in new.items():
+        if path not in old:
+            lines.append(f"+ {path}: {value}")
+        elif old[path] == value:
+            unchanged += 1
+        elif isinstance(value, (int, float)) and isinstance(old[path], (int, float)):
+            lines.append(f"~ {path}: {old[path]}->{value} ({value - old[path]:+g})")
+        else:
+            lines.append(f"~ {path}: {old[path]}->{value}")
+    lines += [f"- {path}: {value}" for path, value in old.items() if path not in new]
+    return lines, unchanged
+
+
+def _rows_delta(old: str, new: str) -> tuple:
+    old_rows, new_rows = _rows(old), _rows(new)
+    lines, unchanged = [], 0
+    for key, line in new_rows.items():
+        if key not in old_rows:
+            lines.append(f"+ {line}")
+        elif old_rows[key] == line:
+            unchanged += 1
+        else:
+            lines.append(f"~ {_changed_line(old_rows[key], line)}")
+    lines += [f"- {line}" for key, line in old_rows.items() if key not in new_rows]
+    return lines, unchanged
+
+
+def _summary(old: str, new: str, age: float, max_chars: int, below: bool) -> tuple:
+    """(change summary, whether every change fit in max_chars); see change_summary."""
+    old_fields, new_fields = _json_fields(old), _json_fields(new)
+    if old_fields is not None and new_fields is not None:
+        lines, unchanged = _fields_delta(old_fields, new_fields)
+        what = "fields"
+    else:
+        lines, unchanged = _rows_delta(old, new)
+        what = "rows"
+    when = format_age(age)
+    if not lines:
+        return f"[no change since the last check {when} ago; {'current output below' if below else 'same output'}]", True
+    rest = "current output below" if below else "the rest as in the earlier output"
+    out = [f"[{len(lines)} {what} changed/new/gone since the last check {when} ago, {unchanged} unchanged; {rest}]"]
+    size = len(out[0])
+    for i, line in enumerate(lines):
+        left = len(lines) - i - 1  # Room must remain for the "more" line after this one
+        if size + 1 + len(line) + (len(f"\n  ... {left} more changes") if left else 0) > max_chars:
+            out.append(f"  ... {len(lines) - i} more changes")
+            return "\n".join(out), False
+        out.append(line)
+        size += 1 + len(line)
+    return "\n".join(out), True
+
+
+def change_summary(old: str, new: str, age: float, max_chars: int = DEFAULT_SUMMARY_CHARS,
+                   below: bool = True) -> str:
+    """How `new` differs from `old` (seen `age` seconds ago), in about max_chars.
+
+    A header with the counts, then the changed (~), new (+) and gone (-) rows or
+    fields, as many as fit; `new` itself is not repeated. `below` says whether the
+    header announces the current output below it.
+    """
+    return _summary(old, new, age, max_chars, below)[0]
+
+
+class ObservationLog:
+    """Last output per (tool, host, arguments) for one chat session; thread-safe."""
+
+    def __init__(self, tools: set | None = None, max_entries: int = 64,
+                 summary_chars: int = DEFAULT_SUMMARY_CHARS):
+        self.tools = set(DEFAULT_DELTA_TOOLS if tools is None else tools)
+        self.max_entries = max_entries
+        self.summary_chars = summary_chars
+        self._seen: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (time, text, context)
+        self._lock = Lock()
+        self.summaries = 0  # Repeats sent as summary + output
+        self.deltas = 0  # Repeats sent as the summary only
+
+    def seen(self, name: str, arguments: dict | None) -> bool:
+        """Whether observe() would find an earlier output of this call to compare with."""
+        if name not in self.tools:
+            return False
+        with self._lock:
+            return call_key(name, arguments) in self._seen
+
+    def observe(self, name: str, arguments: dict | None, text: str, context=None) -> str:
+        """Remember `text` and return what to show the model.
+
+        `context` names what the model still has in its context (e.g. the agent run; the chat
+        when history is kept); None means nothing. A repeat within the same context is only its
+        change summary, if every change fits in summary_chars; other repeats get `text` below it.
+        """
+        if name not in self.tools or not text:
+            return text
+        key = call_key(name, arguments)
+        now = time.time()
+        with self._lock:
+            previous = self._seen.pop(key, None)
+            self._seen[key] = (now, text, context)
+            while len(self._seen) > self.max_entries:
+                self._seen.popitem(last=False)
+        if previous is None:
+            return text
+        if context is not None and previous[2] == context:
+            summary, complete = _summary(previous[1], text, now - previous[0], self.summary_chars, below=False)
+            if complete:
+                with self._lock:
+                    self.deltas += 1
+                return summary
+        summary = change_summary(previous[1], text, now - previous[0], self.summary_chars)
+        with self._lock:
+            self.summaries += 1
+        return f"{summary}\n{text}"
+
+    def clear(self):
+        with self._lock:
+            self._seen.clear()
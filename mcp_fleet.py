@@ -0,0 +1,171 @@
+"""
+Fleet fan-out: run one Linux MCP tool on many hosts and return one table.
+
+Answering "check disk usage on all web servers" one tool call per host costs
+an LLM round-trip per host. Here the calls run concurrently (at most
+`parallel` at a time, per-host limits still apply in the client stack) and
+the results come back as one compact text: a status/latency line per host
+with its reduced output, hosts with identical output folded together.
+"""
+import asyncio
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from mcp_client import MCPClientError
+from mcp_reducers import reduce_output
+from mcp_snapshots import format_age
+
+DEFAULT_PARALLEL = 16
+# Fewest characters of output kept per host, however many hosts there are
+MIN_HOST_CHARS = 80
+_LEGEND_RE = re.compile(r"^(.*?)\s*(\([^()]*\))$")
+
+
+def _result(host: str, started: float, text: str = "", error: str = "", cached: bool = False,
+            age: float | None = None) -> dict:
+    return {
+        "host": host,
+        "ok": not error,
+        "seconds": time.perf_counter() - started,
+        "text": text,
+        "error": error,
+        "cached": cached,
+        "age": age,  # Snapshot age when answered from the snapshot store
+    }
+
+
+def _stored(host: str, tool: str, args: dict, started: float, cache, snapshots) -> dict | None:
+    """A result from the cache or a young enough snapshot, else None."""
+    hit = cache.get(tool, args) if cache is not None else None
+    if hit is not None:
+        return _result(host, started, hit, cached=True)
+    snapshot = snapshots.get(tool, args) if snapshots is not None else None
+    if snapshot is not None:
+        return _result(host, started, snapshot[0], cached=True, age=snapshot[1])
+    return None
+
+
+def _remember(tool: str, args: dict, text: str, cache, snapshots):
+    if cache is not None:
+        cache.put(tool, args, text)
+    if snapshots is not None:
+        snapshots.put(tool, args, text)
+
+
+def run_fleet(mcp, tool: str, hosts: list, arguments: dict | None = None, parallel: int = DEFAULT_PARALLEL,
+              timeout: float | None = None, cache=None, snapshots=None, bypass_cache: bool = False,
+              on_result=None) -> list:
+    """Call `tool` on every host with a thread pool; results in host order.
+
+    `cache` (a ToolResultCache) and `snapshots` (a SnapshotStore) are read unless bypass_cache,
+    and refreshed with live results. `on_result(result)` is called as each host finishes.
+    """
+
+    def one(host: str) -> dict:
+        args = dict(arguments or {}, host=host)
+        started = time.perf_counter()
+        result = None if bypass_cache else _stored(host, tool, args, started, cache, snapshots)
+        if result is None:
+            try:
+                text = mcp.call_tool(tool, args, timeout=timeout)
+                _remember(tool, args, text, cache, snapshots)
+                result = _result(host, started, text)
+            except MCPClientError as e:
+                result = _result(host, started, error=str(e))
+        if on_result:
+            on_result(result)
+        return result
+
+    if not hosts:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(parallel, len(hosts)))) as executor:
+        return list(executor.map(one, hosts))
+
+
+async def arun_fleet(amcp, tool: str, hosts: list, arguments: dict | None = None, parallel: int = DEFAULT_PARALLEL,
+                     timeout: float | None = None, cache=None, snapshots=None, bypass_cache: bool = False,
+                     on_result=None) -> list:
+    """run_fleet for an AsyncLinuxMCPClient: one task per host, at most `parallel` in flight."""
+    slots = asyncio.Semaphore(max(1, parallel))
+
+    async def one(host: str) -> dict:
+        args = dict(arguments or {}, host=host)
+        async with slots:
+            started = time.perf_counter()
+            result = None if bypass_cache else _stored(host, tool, args, started, cache, snapshots)
+            if result is None:
+                try:
+                    text = await amcp.call_tool(tool, args, timeout=timeout)
+                    _remember(tool, args, text, cache, snapshots)
+                    result = _result(host, started, text)
+                except MCPClientError as e:
+                    result = _result(host, started, error=str(e))
+        if on_result:
+            on_result(result)
+        return result
+
+    return list(await asyncio.gather(*(one(host) for host in hosts)))
+
+
+def _percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def _latency(result: dict) -> str:
+    if result["age"] is not None:
+        return f"snapshot:{format_age(result['age'])}"
+    return "cached" if result["cached"] else f"{result['seconds'] * 1000:.0f}"
+
+
+def _flatten(text: str) -> str:
+    return " ; ".join(line.strip() for line in text.splitlines() if line.strip())
+
+
+def format_fleet(tool: str, results: list, max_chars: int = 0, top_n: int = 5) -> str:
+    """One line per host (status, latency, reduced output), failures first.
+
+    Output is reduced with the tool's reducer (top_n rows) and flattened. A host whose
+    output equals an earlier host's says "same as <host>"; the distinct outputs share
+    what is left of max_chars equally (at least MIN_HOST_CHARS each).
+    """
+    failed = [r for r in results if not r["ok"]]
+    ordered = failed + [r for r in results if r["ok"]]
+    seconds = [r["seconds"] for r in results if not r["cached"]]
+    legend = ""
+    bodies, first_with = [], {}
+    # Log reducers keep both ends within this; the final per-host cut happens below
+    host_chars = max(MIN_HOST_CHARS, max_chars // max(1, len(results))) if max_chars else 0
+    for r in ordered:
+        if not r["ok"]:
+            bodies.append((r["error"], False))
+            continue
+        lines = reduce_output(tool, r["text"] or "", top_n, host_chars).splitlines()
+        # Reducer summaries end with a column legend, e.g. "(mount type size ...)": say it once
+        match = _LEGEND_RE.match(lines[0]) if lines else None
+        if match and legend in ("", match.group(2)):
+            legend, lines[0] = match.group(2), match.group(1)
+        body = _flatten("\n".join(lines)) or "(No output)"
+        if body in first_with:
+            bodies.append((f"same as {first_with[body]}", False))
+        else:
+            first_with[body] = r["host"]
+            bodies.append((body, True))
+
+    header = (
+        f"{tool} on {len(results)} hosts: {len(results) - len(failed)} ok, {len(failed)} failed"
+        + (f"; latency p50 {_percentile(seconds, 50) * 1000:.0f}ms, max {max(seconds) * 1000:.0f}ms" if seconds else "")
+        + f"\n(host status ms | output{' ' + legend if legend else ''})"
+    )
+    prefixes = [f"{r['host']} {'ok' if r['ok'] else 'FAILED'} {_latency(r)} | " for r in ordered]
+    share = 0
+    if max_chars:
+        fixed = len(header) + sum(len(p) + 1 for p in prefixes) + sum(len(b) for b, own in bodies if not own)
+        share = max(MIN_HOST_CHARS, (max_chars - fixed) // max(1, sum(1 for _, own in bodies if own)))
+    lines = [header]
+    for prefix, (body, own) in zip(prefixes, bodies):
+        if own and share and len(body) > share:
+            body = body[: max(0, share - 3)] + "..."
+        lines.append(prefix + body)
+    return "\n".join(lines)
@@ -0,0 +1,333 @@
+"""
+Sampled host metrics in fixed-size ring buffers (needs numpy).
+
+Tools only give point-in-time values, so "has load been rising?" needs a
+history. A MetricSampler polls the CPU, memory and disk tools on every host
+at a fixed interval and parses the numbers into a MetricStore: one
+hosts x capacity float32 matrix per metric, written one column per round,
+so memory is fixed up front and every metric lines up in time across hosts.
+Window statistics (min/max/mean/p95/last/slope) and downsampling are
+computed over whole matrices at once.
+"""
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+from mcp_snapshots import format_age
+
+DEFAULT_METRIC_TOOLS = ("get_cpu_information", "get_memory_information", "get_disk_usage")
+# One day at one sample per minute
+DEFAULT_CAPACITY = 1440
+DEFAULT_MAX_HOSTS = 256
+# Every metric (each mount is one) costs max_hosts x capacity x 4 bytes
+DEFAULT_MAX_METRICS = 64
+# Host name used for the machine the MCP server runs on (calls without "host")
+LOCAL_HOST = "local"
+
+_IDLE_RE = re.compile(r"([\d.]+)\s*id\b")
+# Pseudo and in-memory filesystems: their use% says nothing about disk space
+_SKIP_FSTYPES = {
+    "tmpfs", "devtmpfs", "overlay", "squashfs", "proc", "sysfs", "cgroup", "cgroup2",
+    "efivarfs", "devpts", "nsfs", "ramfs", "iso9660", "fuse.portal",
+}
+
+
+def host_label(host: str | None) -> str:
+    """Store row name for a host argument ("" / None / localhost -> "local")."""
+    host = (host or "").strip().lower()
+    return LOCAL_HOST if host in ("", LOCAL_HOST, "localhost", "127.0.0.1", "::1") else host
+
+
+def _host_args(host: str) -> dict:
+    return {} if host == LOCAL_HOST else {"host": host}
+
+
+def _percent(value) -> float | None:
+    try:
+        return float(str(value).strip().rstrip("%"))
+    except ValueError:
+        return None
+
+
+def parse_metrics(tool: str, text: str) -> dict:
+    """{metric: value} from a CPU, memory or disk tool result ({} if it isn't one)."""
+    try:
+        data = json.loads(text)
+    except (TypeError, ValueError):
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    metrics = {}
+    if tool == "get_cpu_information":
+        for window in ("1m", "5m", "15m"):
+            if isinstance(data.get(f"load_avg_{window}"), (int, float)):
+                metrics[f"load_{window}"] = float(data[f"load_avg_{window}"])
+        if data.get("logical_cores") and "load_1m" in metrics:
+            metrics["load_per_core"] = metrics["load_1m"] / data["logical_cores"]
+        idle = _IDLE_RE.search(data.get("cpu_line") or "")
+        if idle:
+            metrics["cpu_busy_pct"] = 100.0 - float(idle.group(1))
+    elif tool == "get_memory_information":
+        ram, swap = data.get("ram") or {}, data.get("swap") or {}
+        if ram.get("total"):
+            metrics["mem_used_pct"] = 100.0 * (ram["total"] - ram.get("available", ram.get("free", 0))) / ram["total"]
+        if swap.get("total"):
+            metrics["swap_used_pct"] = 100.0 * swap.get("used", 0) / swap["total"]
+    elif tool == "get_disk_usage":
+        for fs in data.get("filesystems") or []:
+            used = _percent(fs.get("use%", fs.get("use_percent", "")))
+            if used is not None and fs.get("target") and fs.get("fstype") not in _SKIP_FSTYPES:
+                metrics[f"disk_used_pct:{fs['target']}"] = used
+    return metrics
+
+
+def window_stats(values, times) -> dict:
+    """Per-row statistics of a hosts x samples matrix (NaN = no sample), all rows at once.
+
+    Returns arrays of length hosts: count, min, max, mean, p95, last, and slope (units per
+    hour, least squares over the sampled points). Rows without samples are NaN.
+    """
+    rows = values.shape[0]
+    present = ~np.isnan(values)
+    count = present.sum(axis=1)
+    stats = {"count": count}
+    for key in ("min", "max", "mean", "p95", "last", "slope"):
+        stats[key] = np.full(rows, np.nan)
+    some = count > 0
+    if not some.any():
+        return stats
+    v, mask, n = values[some], present[some], count[some]
+    index = np.arange(v.shape[0])
+    # One sort gives min, max and p95 (NaNs sort last); much faster than the nan* reductions
+    ordered = np.sort(v, axis=1)
+    position = (n - 1) * 0.95
+    below = np.floor(position).astype(int)
+    above = np.minimum(below + 1, n - 1)
+    stats["min"][some] = ordered[:, 0]
+    stats["max"][some] = ordered[index, n - 1]
+    stats["p95"][some] = ordered[index, below] + (ordered[index, above] - ordered[index, below]) * (position - below)
+    last = v.shape[1] - 1 - np.argmax(mask[:, ::-1], axis=1)
+    stats["last"][some] = v[index, last]
+    hours = (np.asarray(times, dtype=np.float64) - times[0]) / 3600.0
+    t = np.where(mask, hours, 0.0)
+    t_mean = t.sum(axis=1) / n
+    y_mean = np.where(mask, v, 0.0).sum(axis=1) / n
+    stats["mean"][some] = y_mean
+    dt = np.where(mask, hours - t_mean[:, None], 0.0)
+    dy = np.where(mask, v - y_mean[:, None], 0.0)
+    spread = (dt * dt).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        stats["slope"][some] = np.where((n > 1) & (spread > 0), (dt * dy).sum(axis=1) / spread, np.nan)
+    return stats
+
+
+def downsample(values, points: int):
+    """Mean of `points` consecutive column buckets of a hosts x samples matrix (NaN-aware)."""
+    columns = values.shape[1]
+    if columns <= points:
+        return values
+    starts = np.unique(np.linspace(0, columns, points + 1).astype(int)[:-1])
+    present = ~np.isnan(values)
+    sums = np.add.reduceat(np.where(present, values, 0.0), starts, axis=1)
+    counts = np.add.reduceat(present, starts, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+class MetricStore:
+    """Ring buffers of metric samples: per metric one max_hosts x capacity float32 matrix.
+
+    Each round (begin_round) takes the next column for every host and metric; NaN means no
+    sample. Column timestamps are in a parallel ring, so all matrices share one time axis.
+    Thread-safe; readers get copies in time order.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, max_hosts: int = DEFAULT_MAX_HOSTS,
+                 max_metrics: int = DEFAULT_MAX_METRICS):
+        if not HAS_NUMPY:
+            raise RuntimeError("numpy is required for metric sampling (pip install numpy)")
+        self.capacity = max(2, capacity)
+        self.max_hosts = max_hosts
+        self.max_metrics = max_metrics
+        self.times = np.full(self.capacity, np.nan)
+        self.rounds = 0  # Columns written so far
+        self.dropped = 0  # Samples with no room (too many hosts or metrics)
+        self._values = {}  # metric -> ndarray (max_hosts, capacity)
+        self._rows = {}  # host label -> row
+        self._lock = threading.Lock()
+
+    @property
+    def hosts(self) -> list:
+        with self._lock:
+            return list(self._rows)
+
+    @property
+    def metrics(self) -> list:
+        with self._lock:
+            return sorted(self._values)
+
+    def begin_round(self, when: float | None = None) -> int:
+        """Start a sampling round; returns the column to record() into."""
+        with self._lock:
+            column = self.rounds % self.capacity
+            self.rounds += 1
+            self.times[column] = when or time.time()
+            for values in self._values.values():
+                values[:, column] = np.nan
+        return column
+
+    def record(self, column: int, host: str, metrics: dict):
+        """Store one host's parsed metrics in a round's column."""
+        host = host_label(host)
+        with self._lock:
+            row = self._rows.get(host)
+            if row is None:
+                if len(self._rows) >= self.max_hosts:
+                    self.dropped += len(metrics)
+                    return
+                row = self._rows[host] = len(self._rows)
+            for metric, value in metrics.items():
+                values = self._values.get(metric)
+                if values is None:
+                    if len(self._values) >= self.max_metrics:
+                        self.dropped += 1
+                        continue
+                    values = self._values[metric] = np.full((self.max_hosts, self.capacity), np.nan, np.float32)
+                values[row, column] = value
+
+    def _columns(self, seconds: float | None):
+        """Written column indexes in time order, limited to the last `seconds`."""
+        filled = min(self.rounds, self.capacity)
+        order = (np.arange(filled) + (self.rounds - filled)) % self.capacity
+        if seconds:
+            order = order[self.times[order] >= time.time() - seconds]
+        return order
+
+    def matrix(self, metric: str, seconds: float | None = None, hosts: list | None = None) -> tuple:
+        """(host labels, times, hosts x samples float64 array) for a metric, oldest sample first."""
+        with self._lock:
+            order = self._columns(seconds)
+            names = list(self._rows) if hosts is None else [h for h in map(host_label, hosts) if h in self._rows]
+            rows = [self._rows[h] for h in names]
+            values = self._values.get(metric)
+            if values is None:
+                data = np.full((len(rows), len(order)), np.nan)
+            elif hosts is None:
+                data = values[: len(rows)].take(order, axis=1).astype(np.float64)  # Rows are in insertion order
+            else:
+                data = values[np.ix_(rows, order)].astype(np.float64)
+            return names, self.times[order].copy(), data
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "metric_hosts": len(self._rows),
+                "metric_series": len(self._values),
+                "metric_rounds": self.rounds,
+                "metric_bytes": sum(v.nbytes for v in self._values.values()) + self.times.nbytes,
+                "metric_dropped": self.dropped,
+            }
+
+
+def _num(value: float) -> str:
+    return "-" if np.isnan(value) else f"{value:.3g}"
+
+
+def format_history(store: MetricStore, host: str | None, metric: str = "", seconds: float = 3600,
+                   points: int = 12) -> str:
+    """Window summary of a host's metrics (all, or those whose name contains `metric`) for the LLM."""
+    host = host_label(host)
+    if host not in store.hosts:
+        known = ", ".join(store.hosts[:20]) or "none yet"
+        return f"Error: no samples for host {host!r} (sampled hosts: {known})."
+    names = [m for m in store.metrics if metric.lower() in m.lower()] if metric else store.metrics
+    if not names:
+        return f"Error: no metric matches {metric!r} (metrics: {', '.join(store.metrics)})."
+    lines = []
+    for name in names:
+        _, times, values = store.matrix(name, seconds, [host])
+        if not len(times):
+            break
+        stats = window_stats(values, times)
+        if not stats["count"][0]:
+            continue
+        trend = downsample(values, points)[0]
+        slope = stats["slope"][0]
+        lines.append(
+            f"{name}: {'/'.join(_num(stats[k][0]) for k in ('min', 'max', 'mean', 'p95', 'last'))} "
+            f"{'-' if np.isnan(slope) else f'{slope:+.3g}/h'} | {' '.join(_num(v) for v in trend)}"
+        )
+    if not lines:
+        return f"No samples for {host} in the last {format_age(seconds)}."
+    span = times[-1] - times[0]
+    header = (
+        f"Metrics for {host}, last {format_age(span)} ({len(times)} rounds; "
+        f"min/max/mean/p95/last, slope per hour | up to {points} averages, oldest first)"
+    )
+    return "\n".join([header] + lines)
+
+
+class MetricSampler:
+    """Daemon thread that samples the metric tools on `hosts()` every `interval` seconds into a MetricStore.
+
+    Calls go through `mcp` (the app's client stack, so per-host limits apply), at most
+    `parallel` at a time; a failed call leaves that round's samples empty (NaN).
+    """
+
+    def __init__(self, mcp, store: MetricStore, hosts, tools=DEFAULT_METRIC_TOOLS, interval: float = 60,
+                 parallel: int = 8, timeout: float = 30):
+        self.mcp = mcp
+        self.store = store
+        self.hosts = hosts  # Callable returning the host list (re-read every round)
+        self.tools = tuple(tools)
+        self.interval = interval
+        self.parallel = parallel
+        self.timeout = timeout
+        self.calls = 0
+        self.errors = 0
+        self.last_round = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="metric-sampler", daemon=True)
+        self._thread.start()
+
+    def _sample(self, column: int, host: str, tool: str):
+        try:
+            text = self.mcp.call_tool(tool, _host_args(host), timeout=self.timeout)
+            self.calls += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"[DEBUG] Metric sample {tool} on {host} failed: {e}")
+            return
+        self.store.record(column, host, parse_metrics(tool, text))
+
+    def sample_once(self):
+        """One round: every tool on every host, recorded into a new column."""
+        hosts = [host_label(h) for h in self.hosts()] or [LOCAL_HOST]
+        column = self.store.begin_round()
+        calls = [(column, host, tool) for host in dict.fromkeys(hosts) for tool in self.tools]
+        with ThreadPoolExecutor(max_workers=max(1, self.parallel), thread_name_prefix="metrics") as executor:
+            list(executor.map(lambda call: self._sample(*call), calls))
+        self.last_round = time.time()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            started = time.time()
+            try:
+                self.sample_once()
+            except Exception as e:
+                print(f"[WARN] Metric sampling failed: {e}")
+            self._stop.wait(max(1.0, self.interval - (time.time() - started)))
+
+    def stats(self) -> dict:
+        return {"metric_calls": self.calls, "metric_errors": self.errors}
+
+    def close(self):
+        self._stop.set()
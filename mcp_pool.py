@@ -0,0 +1,471 @@
+"""
+Multi-process dispatch for the Linux MCP Server (stdio transport).
+
+Both classes are drop-in replacements for LinuxMCPClient:
+- LinuxMCPClientPool: N identical subprocesses, each call goes to the member
+  with the fewest in-flight requests (multi-user load).
+- HostShardedMCPClient: one subprocess per remote host, so a host with slow SSH
+  can't stall calls to healthy hosts.
+- SupervisedMCPClient: replaces a server process that exits with a warm,
+  already-initialized standby.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from mcp_client import LinuxMCPClient, MCPClientError, MCPRequestNotSentError
+
+
+def _start_client(client_factory, command: str, args: list | None, env: dict | None,
+                  list_tools: bool = False) -> LinuxMCPClient:
+    """Spawn a server and run the handshake; any failure is raised as MCPClientError.
+
+    A bad MCP_COMMAND raises OSError (FileNotFoundError, PermissionError) from the spawn,
+    which the tool wrappers would not catch.
+    """
+    client = None
+    try:
+        client = client_factory(command, args=args, env=env)
+        client._initialize()
+        if list_tools:
+            client.list_tools()
+        return client
+    except Exception as e:
+        if client is not None:
+            client.close()
+        if isinstance(e, MCPClientError):
+            raise
+        raise MCPClientError(f"Could not start MCP server {command!r}: {e}") from e
+
+
+def _sum_stats(clients) -> dict:
+    """Add up the stats() counters of several clients."""
+    total = {}
+    for client in clients:
+        for key, value in client.stats().items():
+            total[key] = total.get(key, 0) + value
+    return total
+
+
+def _merge_stderr(clients, min_level: str, limit: int | None) -> list:
+    """Interleave several clients' recent_stderr() entries by time."""
+    entries = []
+    for client in clients:
+        entries.extend(client.recent_stderr(min_level, limit))
+    entries.sort(key=lambda e: e["time"])
+    return entries[-limit:] if limit else entries
+
+
+class LinuxMCPClientPool:
+    """N LinuxMCPClient subprocesses behind the LinuxMCPClient interface."""
+
+    def __init__(
+        self,
+        command: str,
+        args: list | None = None,
+        env: dict | None = None,
+        size: int = 2,
+        member_factory=LinuxMCPClient,
+    ):
+        self.size = max(1, size)
+        self._in_flight = [0] * self.size
+        self._lock = Lock()
+
+        # Start and initialize all members concurrently so startup costs one handshake, not N
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            futures = [executor.submit(_start_client, member_factory, command, args, env) for _ in range(self.size)]
+        started = [f.result() for f in futures if f.exception() is None]
+        failed = [f.exception() for f in futures if f.exception() is not None]
+        if failed:
+            for member in started:
+                member.close()
+            raise failed[0]
+        self.members = started
+
+    def _acquire(self, weight: int = 1) -> int:
+        """Pick the least-loaded member and count `weight` requests against it."""
+        with self._lock:
+            idx = min(range(self.size), key=self._in_flight.__getitem__)
+            self._in_flight[idx] += weight
+            return idx
+
+    def _release(self, idx: int, weight: int = 1):
+        with self._lock:
+            self._in_flight[idx] -= weight
+
+    def _initialize(self):
+        for member in self.members:
+            member._initialize()
+
+    @property
+    def server_info(self) -> dict:
+        return self.members[0].server_info
+
+    def in_flight(self) -> list:
+        """Current in-flight request count per member."""
+        with self._lock:
+            return list(self._in_flight)
+
+    def stats(self) -> dict:
+        return _sum_stats(self.members)
+
+    def recent_stderr(self, min_level: str = "WARNING", limit: int | None = 20) -> list:
+        return _merge_stderr(self.members, min_level, limit)
+
+    def list_tools(self) -> list:
+        """Return list of tools (all members run the same server, so ask the least-loaded one)."""
+        idx = self._acquire()
+        try:
+            return self.members[idx].list_tools()
+        finally:
+            self._release(idx)
+
+    def call_tool(self, name: str, arguments: dict, timeout: float | None = None, on_progress=None) -> str:
+        """Call tool on the member with the fewest in-flight requests."""
+        idx = self._acquire()
+        try:
+            return self.members[idx].call_tool(name, arguments, timeout=timeout, on_progress=on_progress)
+        finally:
+            self._release(idx)
+
+    def call_tools_batch(self, calls: list, timeout: float | None = None) -> list:
+        """Send the whole round to the least-loaded member (one write on one pipe)."""
+        idx = self._acquire(len(calls))
+        try:
+            return self.members[idx].call_tools_batch(calls, timeout=timeout)
+        finally:
+            self._release(idx, len(calls))
+
+    def close(self):
+        for member in self.members:
+            member.close()
+
+
+class _HostWorker:
+    """One host's subprocess plus the bookkeeping the LRU and idle reaper need."""
+
+    def __init__(self, host: str):
+        self.host = host
+        self.client: LinuxMCPClient | None = None
+        self.in_flight = 0
+        self.last_used = time.monotonic()
+        self._start_lock = Lock()
+
+    def ensure_started(self, client_factory, command: str, args: list | None, env: dict | None) -> LinuxMCPClient:
+        """Start and initialize the subprocess on first use (only one caller does the work)."""
+        with self._start_lock:
+            if self.client is not None and not self.client.alive:
+                self.client.close()
+                self.client = None  # Server died: start a fresh one for this host
+            if self.client is None:
+                self.client = _start_client(client_factory, command, args, env)
+            return self.client
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+
+
+class HostShardedMCPClient:
+    """Route each call by its "host" argument to that host's own subprocess.
+
+    Host workers are created lazily, at most max_hosts stay alive (least recently
+    used idle workers are closed first) and workers idle for idle_timeout seconds
+    are closed. Calls without a host go to the `default` client.
+    """
+
+    def __init__(
+        self,
+        command: str,
+        args: list | None = None,
+        env: dict | None = None,
+        max_hosts: int = 16,
+        idle_timeout: float = 600,
+        default=None,
+        client_factory=LinuxMCPClient,
+    ):
+        self.command = command
+        self.client_factory = client_factory
+        self.args = args
+        self.env = env
+        self.max_hosts = max(1, max_hosts)
+        self.idle_timeout = idle_timeout
+        self.default = default or client_factory(command, args=args, env=env)
+        self._workers: "OrderedDict[str, _HostWorker]" = OrderedDict()
+        self._lock = Lock()
+        self._closed = threading.Event()
+        if idle_timeout and idle_timeout > 0:
+            threading.Thread(target=self._reaper, daemon=True).start()
+
+    def _acquire(self, host: str) -> _HostWorker:
+        with self._lock:
+            worker = self._workers.get(host)
+            if worker is None:
+                worker = _HostWorker(host)
+                self._workers[host] = worker
+            self._workers.move_to_end(host)
+            worker.in_flight += 1
+            worker.last_used = time.monotonic()
+            evicted = self._evict_locked(self.max_hosts)
+        for idle in evicted:
+            idle.close()
+        return worker
+
+    def _release(self, worker: _HostWorker):
+        with self._lock:
+            worker.in_flight -= 1
+            worker.last_used = time.monotonic()
+
+    def _evict_locked(self, limit: int, idle_before: float | None = None) -> list:
+        """Drop idle workers, oldest first, until at most `limit` remain (or all stale ones if idle_before)."""
+        evicted = []
+        for host, worker in list(self._workers.items()):
+            if worker.in_flight:
+                continue
+            stale = idle_before is not None and worker.last_used < idle_before
+            if len(self._workers) > limit or stale:
+                del self._workers[host]
+                evicted.append(worker)
+        return evicted
+
+    def _reaper(self):
+        interval = max(1.0, min(self.idle_timeout / 2, 30.0))
+        while not self._closed.wait(interval):
+            with self._lock:
+                evicted = self._evict_locked(self.max_hosts, time.monotonic() - self.idle_timeout)
+            for idle in evicted:
+                idle.close()
+
+    def _initialize(self):
+        self.default._initialize()
+
+    @property
+    def server_info(self) -> dict:
+        return self.default.server_info
+
+    def hosts(self) -> list:
+        """Hosts with a live worker, least recently used first."""
+        with self._lock:
+            return list(self._workers)
+
+    def stats(self) -> dict:
+        with self._lock:
+            clients = [w.client for w in self._workers.values() if w.client is not None]
+        total = _sum_stats([self.default] + clients)
+        total["host_workers"] = len(clients)
+        return total
+
+    def recent_stderr(self, min_level: str = "WARNING", limit: int | None = 20) -> list:
+        with self._lock:
+            clients = [w.client for w in self._workers.values() if w.client is not None]
+        return _merge_stderr([self.default] + clients, min_level, limit)
+
+    def list_tools(self) -> list:
+        return self.default.list_tools()
+
+    def call_tool(self, name: str, arguments: dict, timeout: float | None = None, on_progress=None) -> str:
+        host = ((arguments or {}).get("host") or "").strip().lower()
+        if not host:
+            return self.default.call_tool(name, arguments, timeout=timeout, on_progress=on_progress)
+        worker = self._acquire(host)
+        try:
+            client = worker.ensure_started(self.client_factory, self.command, self.args, self.env)
+            return client.call_tool(name, arguments, timeout=timeout, on_progress=on_progress)
+        finally:
+            self._release(worker)
+
+    def _host_batch(self, host: str, calls: list, timeout: float | None) -> list:
+        if not host:
+            return self.default.call_tools_batch(calls, timeout=timeout)
+        worker = self._acquire(host)
+        try:
+            client = worker.ensure_started(self.client_factory, self.command, self.args, self.env)
+            return client.call_tools_batch(calls, timeout=timeout)
+        finally:
+            self._release(worker)
+
+    def call_tools_batch(self, calls: list, timeout: float | None = None) -> list:
+        """Split the round by host; each host's share goes out as one batch, hosts in parallel."""
+        groups = OrderedDict()
+        for pos, call in enumerate(calls):
+            host = ((call[1] or {}).get("host") or "").strip().lower()
+            groups.setdefault(host, []).append(pos)
+        results = [None] * len(calls)
+
+        def run(host):
+            positions = groups[host]
+            try:
+                outputs = self._host_batch(host, [calls[pos] for pos in positions], timeout)
+            except MCPClientError as e:
+                outputs = [e] * len(positions)
+            for pos, output in zip(positions, outputs):
+                results[pos] = output
+
+        if len(groups) == 1:
+            run(next(iter(groups)))
+        else:
+            with ThreadPoolExecutor(max_workers=len(groups)) as executor:
+                list(executor.map(run, groups))
+        return results
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            workers = list(self._workers.values())
+            self._workers.clear()
+        for worker in workers:
+            worker.close()
+        self.default.close()
+
+
+class SupervisedMCPClient:
+    """LinuxMCPClient that survives server exits.
+
+    When the active process exits, its in-flight calls fail immediately
+    (MCPServerExitedError) and a standby that already ran initialize and
+    tools/list takes over, so recovery costs milliseconds instead of a cold
+    start. A new standby is then started in the background. A call that finds
+    the server gone before its request was written (the exit not noticed yet)
+    is retried once on the replacement.
+    """
+
+    def __init__(
+        self,
+        command: str,
+        args: list | None = None,
+        env: dict | None = None,
+        standby: bool = True,
+        client_factory=LinuxMCPClient,
+    ):
+        self.command = command
+        self.client_factory = client_factory
+        self.args = args
+        self.env = env
+        self.use_standby = standby
+        self.restarts = 0
+        self._lock = Lock()
+        self._cold_start_lock = Lock()
+        self._standby: LinuxMCPClient | None = None
+        self._standby_starting = False
+        self._closed = False
+        self._exited: LinuxMCPClient | None = None  # Last process that exited; its stderr says why
+        self.active = self._spawn(list_tools=False)  # The app's own tools/list warms it up
+        if standby:
+            self._start_standby()
+
+    def _spawn(self, list_tools: bool = True) -> LinuxMCPClient:
+        """Start a server and run the full handshake so it is ready to serve calls."""
+        client = _start_client(self.client_factory, self.command, self.args, self.env, list_tools)
+        client.on_exit = self._on_exit
+        return client
+
+    def _start_standby(self):
+        with self._lock:
+            if self._closed or self._standby_starting or (self._standby is not None and self._standby.alive):
+                return
+            self._standby_starting = True
+        threading.Thread(target=self._standby_worker, daemon=True).start()
+
+    def _standby_worker(self):
+        try:
+            standby = self._spawn()
+        except Exception as e:
+            print(f"[WARN] Could not start standby MCP server: {e}")
+            standby = None
+        with self._lock:
+            self._standby_starting = False
+            if self._closed:
+                discard = standby
+            else:
+                discard, self._standby = self._standby, standby
+        if discard is not None:
+            discard.close()
+
+    def _on_exit(self, client: LinuxMCPClient):
+        """Called from the client's reader thread when its process exits."""
+        print(f"[WARN] MCP server exited (pid {client.proc.pid})")
+        with self._lock:
+            self._exited = client
+            if client is self.active and self._standby is not None and self._standby.alive:
+                self.active, self._standby = self._standby, None
+                self.restarts += 1
+        if self.use_standby:
+            self._start_standby()
+
+    def _client(self, dead: LinuxMCPClient | None = None) -> LinuxMCPClient:
+        """The live client, failing over (or cold-starting if no standby is ready).
+
+        `dead` is a client a call just found gone, even if its `alive` still says otherwise.
+        """
+        with self._lock:
+            if self.active.alive and self.active is not dead:
+                return self.active
+            if self._standby is not None and self._standby.alive:
+                self.active, self._standby = self._standby, None
+                self.restarts += 1
+                promoted = True
+            else:
+                promoted = False
+        if promoted:
+            if self.use_standby:
+                self._start_standby()
+            return self.active
+        with self._cold_start_lock:
+            if self.active.alive and self.active is not dead:
+                return self.active  # Another caller already restarted it
+            client = self._spawn()
+            with self._lock:
+                old, self.active = self.active, client
+                self.restarts += 1
+            old.close()
+            return client
+
+    def _call(self, method: str, *args, **kwargs):
+        """Run a client method; retry once on the replacement if the request was never written."""
+        client = self._client()
+        try:
+            return getattr(client, method)(*args, **kwargs)
+        except MCPRequestNotSentError:
+            return getattr(self._client(dead=client), method)(*args, **kwargs)
+
+    @property
+    def alive(self) -> bool:
+        return not self._closed
+
+    def _initialize(self):
+        self._client()._initialize()
+
+    @property
+    def server_info(self) -> dict:
+        return self.active.server_info
+
+    def stats(self) -> dict:
+        """Counters of the active process, plus how many times it was replaced."""
+        return dict(self.active.stats(), restarts=self.restarts)
+
+    def recent_stderr(self, min_level: str = "WARNING", limit: int | None = 20) -> list:
+        """Stderr of the active process and of the last one that exited."""
+        with self._lock:
+            clients = [c for c in (self._exited, self.active) if c is not None]
+        return _merge_stderr(clients, min_level, limit)
+
+    def list_tools(self) -> list:
+        return self._call("list_tools")
+
+    def call_tool(self, name: str, arguments: dict, timeout: float | None = None, on_progress=None) -> str:
+        return self._call("call_tool", name, arguments, timeout=timeout, on_progress=on_progress)
+
+    def call_tools_batch(self, calls: list, timeout: float | None = None) -> list:
+        return self._call("call_tools_batch", calls, timeout=timeout)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            clients = [self.active, self._standby]
+            self._standby = None
+        for client in clients:
+            if client is not None:
+                client.close()
@@ -0,0 +1,442 @@
+"""
+Per-tool reducers that compact Linux MCP tool output before it reaches the LLM.
+
+The server formats tables for humans: padded columns, separator lines, the
+command printed twice, every inactive unit listed. A reducer parses that text
+into records and writes back only what answers questions, densely: at most
+top-N rows by the relevant metric plus per-state counts for everything, fewer
+rows if the character budget is smaller (never more to fill it). Log tools get
+repeated lines collapsed and both ends kept within the budget. Output a reducer
+can't parse (errors, other server versions) is passed through unchanged.
+"""
+import json
+import re
+from collections import Counter, OrderedDict, deque
+
+DEFAULT_TOP_N = 25
+
+# {tool name: reducer(text, top_n, max_chars) -> compact text or None}
+REDUCERS = {}
+
+# Filesystems that never answer "is the disk full" questions
+_PSEUDO_FS = {"tmpfs", "devtmpfs", "squashfs", "efivarfs", "overlay", "proc", "sysfs", "cgroup2", "ramfs"}
+_SS_PROCESS_RE = re.compile(r'\("([^"]+)",pid=(\d+)')
+
+
+def reducer(*names):
+    """Register a reducer for one or more tool names."""
+
+    def register(func):
+        for name in names:
+            REDUCERS[name] = func
+        return func
+
+    return register
+
+
+def reduce_output(name: str, text: str, top_n: int = DEFAULT_TOP_N, max_chars: int = 0) -> str:
+    """Compact `text` with the tool's reducer; unchanged if there is none or it can't help.
+
+    max_chars is the most room the result may take (0 = unlimited); tables stop at top_n
+    rows and leave out more whole rows to stay within it, saying how many they left out.
+    """
+    func = REDUCERS.get(name)
+    if func is None or not text:
+        return text
+    try:
+        reduced = func(text, top_n, max_chars)
+    except Exception as e:
+        print(f"[WARN] Output reducer for {name} failed, passing output through: {e}")
+        return text
+    return reduced if reduced and len(reduced) < len(text) else text
+
+
+def _float(value: str) -> float:
+    try:
+        return float(value.rstrip("%"))
+    except ValueError:
+        return 0.0
+
+
+def _more(total: int, shown: int, what: str) -> str:
+    return f"(+{total - shown} more {what})" if total > shown else ""
+
+
+def _fit(build, count: int, max_chars: int) -> str:
+    """build(k) for the most rows k <= count that fits in max_chars (build(0) if none does).
+
+    A cap, not a target: callers pass count <= top_n, so short output stays short.
+
+    build(k) renders the first k rows and must count the ones it leaves out.
+    """
+    text = build(count)
+    if not max_chars or len(text) <= max_chars:
+        return text
+    low, high = 0, count - 1  # Largest k that fits, by bisection: lengths grow with k
+    while low < high:
+        middle = (low + high + 1) // 2
+        if len(build(middle)) <= max_chars:
+            low = middle
+        else:
+            high = middle - 1
+    return build(low)
+
+
+@reducer("list_processes")
+def reduce_processes(text: str, top_n: int, max_chars: int) -> str | None:
+    """Top processes by CPU (the last third of the rows by memory) as `pid user cpu mem stat command`."""
+    rows = []
+    lines = text.splitlines()
+    ps_aux = any(line.split()[:2] == ["USER", "PID"] for line in lines if line.strip())
+    for line in lines:
+        if ps_aux:
+            # Raw `ps aux`: USER PID %CPU %MEM VSZ RSS TTY STAT START TIME COMMAND
+            parts = line.split(None, 10)
+            if len(parts) < 11 or not parts[1].isdigit():
+                continue
+            user, pid, cpu, mem, stat, command = parts[0], parts[1], parts[2], parts[3], parts[7], parts[10]
+        else:
+            # Server table: PID User CPU% Memory% Status Name(command[:30], padded) Command
+            parts = line.split(None, 5)
+            if len(parts) < 6 or not parts[0].isdigit():
+                continue
+            pid, user, cpu, mem, stat, rest = parts
+            command = rest[31:].strip() if len(rest) > 31 else rest.strip()
+        rows.append((pid, user, _float(cpu), _float(mem), stat, command))
+    if not rows:
+        return None
+
+    top_n = max(1, top_n)
+    ranked = sorted(rows, key=lambda r: -r[2])[: top_n - top_n // 3]
+    picked = {r[0] for r in ranked}
+    ranked += [r for r in sorted(rows, key=lambda r: -r[3]) if r[0] not in picked][: top_n - len(ranked)]
+    states = Counter(r[4][:1] for r in rows)
+    counts = ", ".join(f"{n} {state}" for state, n in states.most_common())
+
+    def build(k):
+        shown = ranked[:k]
+        picked = {r[0] for r in shown}
+        rest = [r for r in rows if r[0] not in picked]
+        out = [f"processes: {len(rows)} ({counts}); top {len(shown)} by CPU/memory (pid user cpu% mem% stat command)"]
+        out += [f"{pid} {user} {cpu:g} {mem:g} {stat} {command}" for pid, user, cpu, mem, stat, command in shown]
+        if rest:
+            out.append(
+                f"other {len(rest)} processes: {sum(r[2] for r in rest):.1f}% CPU, {sum(r[3] for r in rest):.1f}% MEM total"
+            )
+        return "\n".join(out)
+
+    return _fit(build, len(ranked), max_chars)
+
+
+@reducer("list_services")
+def reduce_services(text: str, top_n: int, max_chars: int) -> str | None:
+    """Unit counts by state; only failed units (with their description) and odd states by name."""
+    units = []
+    for line in text.splitlines():
+        parts = line.lstrip(" ●*×").split(None, 4)
+        if len(parts) < 4 or not parts[0].endswith(".service"):
+            continue
+        unit, load, active, sub = parts[:4]
+        units.append((unit[: -len(".service")], load, active, sub, parts[4] if len(parts) > 4 else ""))
+    if not units:
+        return None
+
+    states = Counter()
+    named = []  # Failed units first, then units in other states (activating, reloading, ...)
+    for unit, load, active, sub, description in units:
+        if load == "not-found":
+            states["not-found"] += 1
+        elif active == "failed" or sub == "failed":
+            states["failed"] += 1
+            named.insert(states["failed"] - 1, f"{unit} ({description})" if description else unit)
+        elif sub in ("running", "exited"):
+            states[sub] += 1
+        elif active == "inactive":
+            states["inactive"] += 1
+        else:
+            states["other"] += 1
+            named.append(f"{unit}={active}/{sub}")
+    named = named[: max(1, top_n)]
+
+    order = ("failed", "running", "exited", "inactive", "other", "not-found")
+    head = [
+        f"services: {len(units)} units; " + ", ".join(f"{states[s]} {s}" for s in order if states[s]),
+        "(running/exited/inactive units are only counted; get_service_status shows one unit)",
+    ]
+    summary = re.search(r"Summary: .*", text)
+    failed = states["failed"]
+
+    def build(k):
+        out = list(head)
+        if k and failed:
+            out.append(f"failed: {', '.join(named[:min(k, failed)])}")
+        if k > failed:
+            out.append(f"other: {', '.join(named[failed:k])}")
+        more = _more(failed + states["other"], k, "failed/other units not listed")
+        if more:
+            out.append(more)
+        if summary:
+            out.append(summary.group(0))
+        return "\n".join(out)
+
+    return _fit(build, len(named), max_chars)
+
+
+def _program(process: str, pid: bool = True) -> str:
+    """`users:(("sshd",pid=812,fd=3))` -> `sshd/812` (`sshd` without pid)."""
+    match = _SS_PROCESS_RE.search(process or "")
+    if match:
+        return f"{match.group(1)}/{match.group(2)}" if pid else match.group(1)
+    return (process or "").strip() or "-"
+
+
+def _split_addr(addr: str) -> tuple:
+    host, _, port = addr.rpartition(":")
+    return (host, port) if host else (addr, "")
+
+
+@reducer("get_network_connections")
+def reduce_connections(text: str, top_n: int, max_chars: int) -> str | None:
+    """State counts, then connections grouped by service side (ephemeral ports and worker pids dropped)."""
+    rows = []
+    for line in text.splitlines():
+        parts = line.split(None, 4)
+        if len(parts) < 4 or parts[0].lower() not in ("tcp", "udp", "tcp6", "udp6"):
+            continue
+        proto, local, remote, state = parts[:4]
+        rows.append((proto, local, remote, state, _program(parts[4] if len(parts) > 4 else "", pid=False)))
+    if not rows:
+        return None
+
+    groups = Counter()
+    peers = {}
+    for proto, local, remote, state, program in rows:
+        local_host, local_port = _split_addr(local)
+        remote_host, _ = _split_addr(remote)
+        if local_port.isdigit() and int(local_port) < 32768:
+            key = (proto, local, "<-", "*", state, program)  # We serve: keep our port, count clients
+            peer = remote_host if state not in ("LISTEN", "UNCONN") else None
+        else:
+            key = (proto, local_host, "->", remote, state, program)  # We are the client: keep theirs
+            peer = None
+        groups[key] += 1
+        if peer:
+            peers.setdefault(key, set()).add(peer)
+
+    states = Counter(row[3] for row in rows)
+    head = [
+        f"connections: {len(rows)}; " + ", ".join(f"{state} {n}" for state, n in states.most_common()),
+        "(proto local dir remote state program xcount)",
+    ]
+    ranked = sorted(groups.items(), key=lambda item: (item[0][4] not in ("ESTAB", "ESTABLISHED"), -item[1]))
+    lines = []
+    for key, n in ranked[:top_n]:
+        proto, local, direction, remote, state, program = key
+        hosts = sorted(peers.get(key, ()))
+        if len(hosts) == 1:
+            remote = hosts[0]
+        elif hosts:
+            remote = f"{len(hosts)} peers"
+        lines.append(f"{proto} {local} {direction} {remote} {state} {program}" + (f" x{n}" if n > 1 else ""))
+
+    def build(k):
+        more = _more(len(ranked), k, "connection groups")
+        return "\n".join(head + lines[:k] + ([more] if more else []))
+
+    return _fit(build, len(lines), max_chars)
+
+
+@reducer("get_listening_ports")
+def reduce_listening_ports(text: str, top_n: int, max_chars: int) -> str | None:
+    """One line per (proto, port, program) with the addresses it binds."""
+    ports = OrderedDict()
+    for line in text.splitlines():
+        parts = line.split(None, 3)
+        if len(parts) < 3 or parts[0].lower() not in ("tcp", "udp", "tcp6", "udp6"):
+            continue
+        proto, local = parts[0], parts[1]
+        process = parts[3] if len(parts) > 3 and parts[2] in ("LISTEN", "UNCONN") else " ".join(parts[2:])
+        host, port = _split_addr(local)
+        ports.setdefault((proto, port, _program(process)), []).append(host)
+    if not ports:
+        return None
+    lines = [f"{proto} {port} {program} {','.join(hosts)}" for (proto, port, program), hosts in ports.items()]
+    lines = lines[:top_n]
+
+    def build(k):
+        more = _more(len(ports), k, "ports")
+        return "\n".join([f"listening: {len(ports)} (proto port program addresses)"] + lines[:k] + ([more] if more else []))
+
+    return _fit(build, len(lines), max_chars)
+
+
+def _filesystems_from_json(text: str) -> list | None:
+    start = text.find("{")
+    if start < 0:
+        return None
+    try:
+        data = json.loads(text[start:])
+    except ValueError:
+        return None
+    entries = data.get("filesystems") if isinstance(data, dict) else None
+    if not isinstance(entries, list):
+        return None
+    return [
+        (e.get("target"), e.get("fstype"), e.get("size"), e.get("used"), e.get("avail"),
+         e.get("use%") or e.get("use_percent") or "", e.get("source"))
+        for e in entries if isinstance(e, dict)
+    ]
+
+
+def _filesystems_from_df(text: str) -> list:
+    # df -h / df -hT: Filesystem [Type] Size Used Avail Use% Mounted on
+    rows = []
+    typed = False
+    for line in text.splitlines():
+        parts = line.split()
+        if parts[:1] == ["Filesystem"]:
+            typed = len(parts) > 1 and parts[1] == "Type"
+            continue
+        if len(parts) < (7 if typed else 6) or not parts[(5 if typed else 4)].endswith("%"):
+            continue
+        if typed:
+            source, fstype, size, used, avail, use, target = parts[:6] + [" ".join(parts[6:])]
+        else:
+            source, size, used, avail, use, target = parts[:5] + [" ".join(parts[5:])]
+            fstype = "tmpfs" if source in ("tmpfs", "devtmpfs") else ""
+        rows.append((target, fstype or source, size, used, avail, use, source))
+    return rows
+
+
+@reducer("get_disk_usage")
+def reduce_disk_usage(text: str, top_n: int, max_chars: int) -> str | None:
+    """Real filesystems sorted by use% (pseudo filesystems only counted)."""
+    rows = _filesystems_from_json(text)
+    if rows is None:
+        rows = _filesystems_from_df(text)
+    if not rows:
+        return None
+    real = [r for r in rows if (r[1] or "") not in _PSEUDO_FS]
+    real.sort(key=lambda r: -_float(r[5] or "0"))
+    head = f"filesystems: {len(real)} real, {len(rows) - len(real)} pseudo (mount type size used avail use% device)"
+    lines = [" ".join(str(v or "-") for v in r) for r in real[:top_n]]
+
+    def build(k):
+        more = _more(len(real), k, "filesystems")
+        return "\n".join([head] + lines[:k] + ([more] if more else []))
+
+    return _fit(build, len(lines), max_chars)
+
+
+# Variable parts of log lines, replaced so that otherwise equal lines group together
+_LOG_VARIABLE_RE = re.compile(
+    r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"  # ISO 8601
+    r"|\b[A-Z][a-z]{2} [ \d]\d \d{2}:\d{2}:\d{2}(?:\.\d+)?"  # syslog: Oct 17 10:00:01
+    r"|\(\d+\.\d+:\d+\)"  # audit: msg=audit(1697536801.123:4567)
+    r"|\[\d+\]"  # sshd[1234]
+    r"|\b(?:pid|ppid|ses|port)[= ]\d+"  # pid=1234, port 52144
+    r"|\b[0-9a-fA-F]{8}(?:-[0-9a-fA-F]{4}){3}-[0-9a-fA-F]{12}\b"  # UUID
+    r"|\b0x[0-9a-fA-F]+\b|\b(?=[0-9a-fA-F]*\d)[0-9a-fA-F]{8,}\b"  # hex ids, long numbers
+)
+_JSON_OBJECT_RE = re.compile(r"\s*\{")
+_LOG_TIME_RE = re.compile(
+    r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}|\b[A-Z][a-z]{2} [ \d]\d \d{2}:\d{2}:\d{2}|\(\d+\.\d+:\d+\)"
+)
+# Open runs a new line may join, so interleaved repeats (A B A B) collapse too
+_LOG_WINDOW = 16
+# Share of the character budget kept from the start of the log; the rest is the newest lines
+_LOG_HEAD_SHARE = 0.4
+# Room left for the summary and omission lines
+_LOG_RESERVE = 160
+
+
+def _lines(text: str):
+    """Lines of `text` one at a time, without splitting the whole log into a list."""
+    start = 0
+    while start < len(text):
+        end = text.find("\n", start)
+        if end < 0:
+            end = len(text)
+        line = text[start:end].rstrip()
+        if line:
+            yield line
+        start = end + 1
+
+
+def _log_lines(text: str):
+    """Lines of plain log text, or the `entries` of a JSON LogEntries result."""
+    if _JSON_OBJECT_RE.match(text):
+        try:
+            data = json.loads(text)
+        except ValueError:
+            data = None
+        if isinstance(data, dict) and isinstance(data.get("entries"), list):
+            for entry in data["entries"]:
+                if entry:
+                    yield str(entry).rstrip()
+            return
+    yield from _lines(text)
+
+
+def _log_entry(first: str, last: str, count: int) -> str:
+    if count == 1:
+        return first
+    match = _LOG_TIME_RE.search(last)
+    return f"{first} (x{count}, last {match.group(0)})" if match else f"{first} (x{count})"
+
+
+@reducer("get_journal_logs", "get_service_logs", "get_audit_logs", "read_log_file")
+def reduce_logs(text: str, top_n: int, max_chars: int) -> str | None:
+    """Repeated lines collapsed to "(xN)"; the oldest and newest entries kept within max_chars.
+
+    One pass over the lines: each collapsed entry goes to the head until its share of the
+    budget is used, then through a tail queue that drops its oldest entries as newer arrive.
+    """
+    budget = max(0, max_chars - _LOG_RESERVE) if max_chars else 0
+    head_budget = int(budget * _LOG_HEAD_SHARE)
+    head, tail = [], deque()
+    head_chars = tail_chars = 0
+    head_full = False
+    dropped_lines = dropped_entries = 0
+    total_lines = total_entries = 0
+    window = OrderedDict()  # Open runs, oldest first: key -> [key, first line, last line, count]
+
+    def emit(run):
+        nonlocal head_chars, tail_chars, head_full, dropped_lines, dropped_entries, total_entries
+        total_entries += 1
+        entry = _log_entry(run[1], run[2], run[3])
+        if not budget or (not head_full and head_chars + len(entry) + 1 <= head_budget):
+            head.append(entry)
+            head_chars += len(entry) + 1
+            return
+        head_full = True
+        tail.append((entry, run[3]))
+        tail_chars += len(entry) + 1
+        while tail_chars > budget - head_chars and len(tail) > 1:
+            old, count = tail.popleft()
+            tail_chars -= len(old) + 1
+            dropped_lines += count
+            dropped_entries += 1
+
+    for line in _log_lines(text):
+        total_lines += 1
+        key = _LOG_VARIABLE_RE.sub("#", line)
+        run = window.get(key)
+        if run is not None:
+            run[2] = line
+            run[3] += 1
+            continue
+        window[key] = [key, line, line, 1]
+        if len(window) > _LOG_WINDOW:
+            emit(window.popitem(last=False)[1])
+    for run in window.values():
+        emit(run)
+    if not total_lines:
+        return None
+
+    out = [f"log: {total_lines} lines, {total_entries} after collapsing repeats (xN = similar lines)"]
+    out += head
+    if dropped_entries:
+        out.append(f"... ({dropped_lines} lines / {dropped_entries} entries omitted) ...")
+    out += [entry for entry, _ in tail]
+    return "\n".join(out)
@@ -0,0 +1,186 @@
+"""
+SQLite store of host fact snapshots, filled by a background collector.
+
+Slow-changing facts (OS, kernel, hardware, block devices, installed services)
+don't need an SSH round-trip per question. The collector runs a set of tools
+on the inventory hosts every `interval` seconds and keeps the latest result
+of each (host, tool, arguments) with its timestamp; tools answer from a
+snapshot while it is younger than the tool's max age. Live results of those
+tools are stored too, so the store also fills without a collector.
+"""
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from mcp_client import call_key
+
+# Oldest snapshot (seconds) a tool may answer from
+DEFAULT_SNAPSHOT_TOOLS = {
+    "get_system_information": 3600,
+    "get_hardware_information": 86400,
+    "list_block_devices": 3600,
+    "get_network_interfaces": 3600,
+    "list_services": 900,
+}
+
+# Tool failures come back as text ("Error executing tool ..."); never keep those for hours
+_ERROR_PREFIXES = ("Error", "error:")
+
+DEFAULT_SNAPSHOT_DB = os.path.join(os.path.expanduser("~"), ".cache", "linux-mcp-chatbot", "snapshots.db")
+
+
+def format_age(seconds: float) -> str:
+    """45s, 12m, 3h, 2d."""
+    seconds = max(0, int(seconds))
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= size:
+            return f"{seconds // size}{unit}"
+    return f"{seconds}s"
+
+
+class SnapshotStore:
+    """Latest result per (tool, host, arguments) in one SQLite file; safe to share between threads."""
+
+    def __init__(self, path: str = DEFAULT_SNAPSHOT_DB, max_ages: dict | None = None):
+        self.path = path
+        self.max_ages = dict(DEFAULT_SNAPSHOT_TOOLS)
+        self.max_ages.update(max_ages or {})
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots ("
+                " key TEXT PRIMARY KEY, tool TEXT NOT NULL, host TEXT NOT NULL,"
+                " taken REAL NOT NULL, text TEXT NOT NULL)"
+            )
+
+    def max_age(self, tool: str) -> float:
+        return self.max_ages.get(tool, 0)
+
+    def get(self, tool: str, arguments: dict | None) -> tuple | None:
+        """(text, age in seconds) of a snapshot young enough for this tool, else None."""
+        max_age = self.max_age(tool)
+        if max_age <= 0:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text, taken FROM snapshots WHERE key = ?", (call_key(tool, arguments),)
+            ).fetchone()
+            age = time.time() - row[1] if row else None
+            if row is None or age > max_age:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0], age
+
+    def age(self, tool: str, arguments: dict | None) -> float | None:
+        """Seconds since the last snapshot of this call (any age), None if never taken."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT taken FROM snapshots WHERE key = ?", (call_key(tool, arguments),)
+            ).fetchone()
+        return time.time() - row[0] if row else None
+
+    def fresh(self, tool: str, arguments: dict | None) -> bool:
+        """Whether get() would answer (not counted as a hit or miss)."""
+        age = self.age(tool, arguments) if self.max_age(tool) > 0 else None
+        return age is not None and age <= self.max_age(tool)
+
+    def put(self, tool: str, arguments: dict | None, text: str, taken: float | None = None):
+        """Store a result of a snapshot tool (other tools and error texts are ignored)."""
+        if self.max_age(tool) <= 0 or text is None or text.lstrip().startswith(_ERROR_PREFIXES):
+            return
+        host = ((arguments or {}).get("host") or "").lower()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO snapshots (key, tool, host, taken, text) VALUES (?, ?, ?, ?, ?)",
+                (call_key(tool, arguments), tool, host, taken or time.time(), text),
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows, hosts = self._conn.execute("SELECT COUNT(*), COUNT(DISTINCT host) FROM snapshots").fetchone()
+        return {"snapshot_hits": self.hits, "snapshot_misses": self.misses,
+                "snapshot_rows": rows, "snapshot_hosts": hosts}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SnapshotCollector:
+    """Daemon thread that refreshes snapshots of every snapshot tool on `hosts()` every `interval` seconds.
+
+    A (host, tool) is only called when its snapshot would outlive the tool's max age
+    before the next round, so hardware facts are fetched about once a day while
+    services are refreshed every round; live results stored in between save calls. Calls go through `mcp` (the app's
+    client stack, so per-host limits apply) at most `parallel` at a time.
+    """
+
+    def __init__(self, mcp, store: SnapshotStore, hosts, interval: float = 900, parallel: int = 4,
+                 timeout: float = 120):
+        self.mcp = mcp
+        self.store = store
+        self.hosts = hosts  # Callable returning the host list (re-read every round)
+        self.interval = interval
+        self.parallel = parallel
+        self.timeout = timeout
+        self.rounds = 0
+        self.calls = 0
+        self.errors = 0
+        self.last_round = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="snapshot-collector", daemon=True)
+        self._thread.start()
+
+    def _due(self) -> list:
+        due = []
+        for host in self.hosts():
+            for tool, max_age in self.store.max_ages.items():
+                if max_age <= 0:
+                    continue
+                args = {"host": host}
+                age = self.store.age(tool, args)
+                if age is None or age + self.interval > max_age:
+                    due.append((tool, args))
+        return due
+
+    def _collect(self, call: tuple):
+        tool, args = call
+        try:
+            self.store.put(tool, args, self.mcp.call_tool(tool, args, timeout=self.timeout))
+            self.calls += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"[DEBUG] Snapshot {tool} on {args['host']} failed: {e}")
+
+    def collect_once(self):
+        """One round: refresh every due snapshot."""
+        due = self._due()
+        if due:
+            print(f"[DEBUG] Collecting {len(due)} snapshots")
+            with ThreadPoolExecutor(max_workers=max(1, self.parallel), thread_name_prefix="snapshot") as executor:
+                list(executor.map(self._collect, due))
+        self.rounds += 1
+        self.last_round = time.time()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.collect_once()
+            except Exception as e:
+                print(f"[WARN] Snapshot collection failed: {e}")
+            self._stop.wait(self.interval)
+
+    def stats(self) -> dict:
+        return {"snapshot_rounds": self.rounds, "snapshot_calls": self.calls, "snapshot_errors": self.errors}
+
+    def close(self):
+        self._stop.set()
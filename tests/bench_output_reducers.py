@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark: tokens sent to the LLM per tool result, truncated vs. reduced.
+
+Runs every reducer in mcp_reducers over the recorded server outputs in
+tests/samples/ (named <tool>.txt) and prints token counts for the raw output,
+for what the LLM got without reducers (the raw output cut to the app's default
+character budget MAX_CHARS, as app._truncate does) and for the reduced output,
+which gets the same budget. The ratio is truncated / reduced; "seen" is the
+share of the raw output the LLM saw without reducers.
+Tokens are counted with tiktoken (cl100k_base) when it is installed, otherwise
+approximated as words + punctuation marks.
+
+Usage: python tests/bench_output_reducers.py [top_n] [--show]
+"""
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mcp_reducers import DEFAULT_TOP_N, reduce_output
+
+SAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "samples")
+ARGS = [a for a in sys.argv[1:] if not a.startswith("--")]
+TOP_N = int(ARGS[0]) if ARGS else DEFAULT_TOP_N
+SHOW = "--show" in sys.argv[1:]
+# app.py default: min(MAX_TOOL_OUTPUT_CHARS, MODEL_CONTEXT_TOKENS * 0.12 * 4)
+MAX_CHARS = min(2400, int(4096 * 0.12 * 4))
+
+try:
+    import tiktoken
+
+    _encoding = tiktoken.get_encoding("cl100k_base")
+    TOKENIZER = "tiktoken cl100k_base"
+
+    def count_tokens(text: str) -> int:
+        return len(_encoding.encode(text))
+
+except ImportError:
+    TOKENIZER = "approx (words + punctuation)"
+
+    def count_tokens(text: str) -> int:
+        return len(re.findall(r"\w+|[^\w\s]", text))
+
+
+def truncate(text: str) -> str:
+    """app._truncate with the default budget."""
+    return text if len(text) <= MAX_CHARS else text[:MAX_CHARS] + "\n\n... (truncated)"
+
+
+def main():
+    print(f"Tool output tokens, truncated vs. reduced (top_n={TOP_N}, max_chars={MAX_CHARS}, {TOKENIZER})")
+    print("=" * 76)
+    print(f"{'tool':26s} {'raw':>7s} {'trunc':>7s} {'seen':>5s} {'reduced':>8s} {'ratio':>6s} {'chars':>12s}")
+    total_raw = total_truncated = total_reduced = 0
+    for filename in sorted(os.listdir(SAMPLES)):
+        if not filename.endswith(".txt"):
+            continue
+        tool = filename[: -len(".txt")]
+        with open(os.path.join(SAMPLES, filename), encoding="utf-8") as f:
+            raw = f.read()
+        truncated = truncate(raw)
+        reduced = truncate(reduce_output(tool, raw, TOP_N, MAX_CHARS))
+        raw_tokens, truncated_tokens, reduced_tokens = count_tokens(raw), count_tokens(truncated), count_tokens(reduced)
+        total_raw += raw_tokens
+        total_truncated += truncated_tokens
+        total_reduced += reduced_tokens
+        seen = min(len(raw), MAX_CHARS) / max(1, len(raw))
+        chars = f"{len(truncated)}->{len(reduced)}"
+        print(f"{tool:26s} {raw_tokens:7d} {truncated_tokens:7d} {seen:5.0%} {reduced_tokens:8d} "
+              f"{truncated_tokens / max(1, reduced_tokens):5.1f}x {chars:>12s}")
+        if SHOW:
+            print("-" * 76)
+            print(reduced)
+            print("-" * 76)
+    print("=" * 76)
+    print(f"{'total':26s} {total_raw:7d} {total_truncated:7d} {'':5s} {total_reduced:8d} "
+          f"{total_truncated / max(1, total_reduced):5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: RPC overhead of LinuxMCPClient against a local echo MCP server.
+
+Compares the old 10ms polling wait ("polling") with event-driven delivery
+("event") at 1, 8 and 64 concurrent callers and prints p50/p99 latency.
+
+Usage: python tests/bench_rpc_latency.py [calls_per_caller]
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mcp_client import LinuxMCPClient, MCPClientError
+
+ECHO_SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "echo_mcp_server.py")
+CONCURRENCY = [1, 8, 64]
+CALLS_PER_CALLER = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+
+class PollingLinuxMCPClient(LinuxMCPClient):
+    """Previous behavior: reader stores responses in a dict, callers poll it every 10ms."""
+
+    def __init__(self, *args, **kwargs):
+        self._responses = {}
+        self._responses_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def _reader(self):
+        for line in self.proc.stdout:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                response = json.loads(line)
+                if "id" in response:
+                    with self._responses_lock:
+                        self._responses[response["id"]] = response
+            except json.JSONDecodeError:
+                pass
+
+    def _rpc(self, method: str, params: dict, timeout: float | None = None, on_progress=None):
+        timeout = timeout or self.timeout
+        req_id = next(self._id_counter)
+        request = {"jsonrpc": "2.0", "id": req_id, "method": method, "params": params}
+        with self._write_lock:
+            self.proc.stdin.write((json.dumps(request) + "\n").encode("utf-8"))
+            self.proc.stdin.flush()
+        start_time = time.time()
+        while time.time() - start_time < timeout:
+            with self._responses_lock:
+                if req_id in self._responses:
+                    response = self._responses.pop(req_id)
+                    if "error" in response:
+                        raise MCPClientError(response["error"])
+                    return response.get("result")
+            time.sleep(0.01)
+        raise MCPClientError("Timeout waiting for MCP response")
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def run(client_cls, concurrency: int) -> list:
+    mcp = client_cls(sys.executable, args=[ECHO_SERVER])
+    mcp.call_tool("echo", {"warmup": True})
+    latencies = []
+    lock = threading.Lock()
+
+    def caller(n):
+        local = []
+        for i in range(CALLS_PER_CALLER):
+            start = time.perf_counter()
+            mcp.call_tool("echo", {"caller": n, "i": i})
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=caller, args=(n,)) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    mcp.close()
+    return latencies
+
+
+def main():
+    print(f"RPC overhead vs echo MCP server ({CALLS_PER_CALLER} calls per caller)")
+    print("=" * 60)
+    print(f"{'mode':10s} {'callers':>8s} {'p50 (ms)':>10s} {'p99 (ms)':>10s} {'cpu (s)':>9s}")
+    for label, client_cls in (("polling", PollingLinuxMCPClient), ("event", LinuxMCPClient)):
+        for concurrency in CONCURRENCY:
+            cpu_start = time.process_time()
+            latencies = run(client_cls, concurrency)
+            cpu = time.process_time() - cpu_start
+            p50 = percentile(latencies, 50) * 1000
+            p99 = percentile(latencies, 99) * 1000
+            print(f"{label:10s} {concurrency:8d} {p50:10.2f} {p99:10.2f} {cpu:9.2f}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
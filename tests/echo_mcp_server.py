@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Minimal stdio MCP server used for client benchmarks.
+
+Answers initialize, tools/list and tools/call (a single "echo" tool that returns
+its arguments as text) with no real work, so measured latency is pure client +
+pipe overhead. An optional "delay" argument (seconds) simulates a slow tool;
+when the request carries a progressToken, the delay is reported in steps via
+notifications/progress plus one notifications/message log line. A "stderr"
+argument (line count) writes that many WARNING log lines to stderr first, to
+exercise the client's stderr drain. A "fail" argument returns an isError result
+with that message; an "exit" argument (exit code) ends the server without replying; a "noise" argument first
+writes stdout lines that are valid JSON but not messages. A "cancelled" argument
+returns the request IDs named by the notifications/cancelled received so far,
+a "methods" argument the method of every request received so far.
+
+Pass --batch to negotiate protocol version 2025-03-26 (the one with JSON-RPC
+batches) and answer arrays; without it the server speaks 2024-11-05 and silently
+drops arrays, like the MCP Python SDK's stdio transport. Pass --legacy to speak
+the old listTools/callTool dialect ({"tool", "args"}) without the tools capability.
+"""
+import json
+import sys
+import time
+
+ACCEPT_BATCH = "--batch" in sys.argv[1:]
+LEGACY = "--legacy" in sys.argv[1:]
+CANCELLED = []  # requestId of every notifications/cancelled received
+METHODS = []  # method of every request received
+
+
+def send(message: dict):
+    sys.stdout.write(json.dumps(message) + "\n")
+    sys.stdout.flush()
+
+
+def handle(request: dict):
+    method = request.get("method")
+    METHODS.append(method)
+    if method == "initialize":
+        return {
+            "protocolVersion": "2025-03-26" if ACCEPT_BATCH else "2024-11-05",
+            "capabilities": {} if LEGACY else {"tools": {}},
+            "serverInfo": {"name": "echo-mcp-server", "version": "0.1.0"},
+        }
+    if method == ("listTools" if LEGACY else "tools/list"):
+        return {
+            "tools": [
+                {
+                    "name": "echo",
+                    "description": "Return the arguments as text.",
+                    "inputSchema": {"type": "object", "properties": {}},
+                }
+            ]
+        }
+    if method == ("callTool" if LEGACY else "tools/call"):
+        params = request.get("params") or {}
+        args = params.get("args" if LEGACY else "arguments") or {}
+        token = (params.get("_meta") or {}).get("progressToken")
+        for n in range(int(args.get("stderr") or 0)):
+            sys.stderr.write(f"WARNING echo: noisy log line {n} {'x' * 100}\n")
+        sys.stderr.flush()
+        if args.get("delay"):
+            delay, steps = float(args["delay"]), 4
+            if token is not None:
+                send({"jsonrpc": "2.0", "method": "notifications/message",
+                      "params": {"level": "info", "data": "echo: working"}})
+            for step in range(steps):
+                time.sleep(delay / steps)
+                if token is not None:
+                    send({"jsonrpc": "2.0", "method": "notifications/progress",
+                          "params": {"progressToken": token, "progress": step + 1, "total": steps}})
+        if args.get("noise"):
+            sys.stdout.write('42\n"debug"\nnull\n')
+        if "exit" in args:
+            sys.exit(int(args["exit"]))
+        if args.get("cancelled"):
+            return {"content": [{"type": "text", "text": json.dumps(CANCELLED)}]}
+        if args.get("methods"):
+            return {"content": [{"type": "text", "text": json.dumps(METHODS)}]}
+        if args.get("fail"):
+            return {"content": [{"type": "text", "text": f"Error executing tool echo: {args['fail']}"}], "isError": True}
+        return {"content": [{"type": "text", "text": json.dumps(args)}]}
+    if method == "ping":
+        return {}
+    return None
+
+
+def respond(request: dict):
+    """Build the response for one request (None for notifications)."""
+    if "id" not in request:
+        if request.get("method") == "notifications/cancelled":
+            CANCELLED.append((request.get("params") or {}).get("requestId"))
+        return None  # Notifications need no reply
+    result = handle(request)
+    if result is None:
+        return {
+            "jsonrpc": "2.0",
+            "id": request["id"],
+            "error": {"code": -32601, "message": f"Method not found: {request.get('method')}"},
+        }
+    return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+
+
+def main():
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        message = json.loads(line)
+        if isinstance(message, list):
+            if not ACCEPT_BATCH:
+                continue  # Dropped without a reply
+            responses = [r for r in (respond(m) for m in message) if r is not None]
+            if responses:
+                send(responses)
+            continue
+        response = respond(message)
+        if response is not None:
+            send(response)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""
+Unit tests for the app's pure modules (no LLM, no Streamlit, no SSH).
+
+Run from the repository root:  python -m pytest tests/unit
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# Minimal stdio MCP server for tests that need a real subprocess
+ECHO_SERVER = os.path.join(ROOT, "tests", "echo_mcp_server.py")
+SAMPLES = os.path.join(ROOT, "tests", "samples")
@@ -0,0 +1,43 @@
+"""Known hosts from inventories and SSH configs, and spotting them in a question."""
+from inventory import inventory_groups, load_hosts, mentioned_hosts
+
+HOSTS = ["web01.example.com", "db01.example.com", "10.0.0.5", "192.168.1.20", "2001.example.net"]
+
+
+def test_short_name_returns_inventory_host():
+    assert mentioned_hosts("is WEB01 slower than db01.example.com?", HOSTS) == [
+        "web01.example.com", "db01.example.com"]
+
+
+def test_numbers_are_not_ip_aliases():
+    assert mentioned_hosts("show the top 10 processes", HOSTS) == []
+    assert mentioned_hosts("what is 192 + 3", HOSTS) == []
+    assert mentioned_hosts("disk usage in 2001", HOSTS) == []
+
+
+def test_ip_address_matches_in_full():
+    assert mentioned_hosts("ping 10.0.0.5.", HOSTS) == ["10.0.0.5"]
+
+
+def test_full_name_wins_over_short_name():
+    assert mentioned_hosts("check web01", ["web01.example.com", "web01"]) == ["web01"]
+
+
+def test_each_host_once_in_order_of_mention():
+    assert mentioned_hosts("db01, web01 and db01 again", HOSTS) == ["db01.example.com", "web01.example.com"]
+
+
+def test_ansible_inventory_groups(tmp_path):
+    path = tmp_path / "hosts.ini"
+    path.write_text("bastion\n[web]\nweb01 ansible_host=10.0.0.1\nweb02\n[db]\ndb01\n"
+                    "[prod:children]\nweb\ndb\n[prod:vars]\nx=1\n")
+    groups = inventory_groups(str(path))
+    assert groups["ungrouped"] == ["bastion"]
+    assert groups["prod"] == ["web01", "web02", "db01"]
+    assert groups["all"] == ["bastion", "web01", "web02", "db01"]
+
+
+def test_load_hosts_merges_ssh_config(tmp_path):
+    (tmp_path / "inventory").write_text("web01\n")
+    (tmp_path / "config").write_text("Host web01 *.internal\n  HostName web01.example.com\nHost localhost\n")
+    assert load_hosts(str(tmp_path / "inventory"), str(tmp_path / "config")) == ["web01", "web01.example.com"]
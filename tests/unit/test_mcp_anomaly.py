@@ -0,0 +1,65 @@
+"""Fleet anomaly scores over a synthetic MetricStore."""
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from mcp_anomaly import detect, format_anomalies, peer_groups  # noqa: E402
+from mcp_metrics import MetricStore  # noqa: E402
+
+HOSTS = [f"web{i:02d}" for i in range(1, 13)]
+ROUNDS = 60
+
+
+def fleet(spike_host=None, disk_growth=0.0, missing_host=None):
+    """Quiet fleet sampled once a minute for an hour, with an optional load spike, filling disk and gap."""
+    rng = np.random.default_rng(7)
+    store = MetricStore(capacity=ROUNDS, max_hosts=32)
+    start = time.time() - ROUNDS * 60
+    for i in range(ROUNDS):
+        column = store.begin_round(start + i * 60)
+        for n, host in enumerate(HOSTS):
+            if host == missing_host and i >= ROUNDS - 5:
+                continue
+            load = 0.5 + rng.normal(0, 0.05)
+            if host == spike_host and i >= ROUNDS - 3:
+                load = 6.0
+            disk = 40.0 + n + (disk_growth * i if host == "web12" else 0.0)
+            store.record(column, host, {"load_1m": load, "mem_used_pct": 50 + rng.normal(0, 1),
+                                        "disk_used_pct:/": disk})
+    return store
+
+
+def test_clean_fleet_has_no_findings():
+    report = detect(fleet())
+    assert report["hosts"] == len(HOSTS) and report["metrics"] == 3
+    assert report["findings"] == [] and report["filling"] == [] and report["stale"] == []
+    assert "No host looks abnormal." in format_anomalies(report)
+
+
+def test_load_spike_is_found_against_self_and_peers():
+    report = detect(fleet(spike_host="web03"))
+    assert [(f["host"], f["metric"]) for f in report["findings"]] == [("web03", "load_1m")]
+    finding = report["findings"][0]
+    assert finding["self_z"] > 10 and finding["peer_z"] > 10
+    assert "web03 load_1m" in format_anomalies(report)
+
+
+def test_hosts_filter_limits_report_not_scoring():
+    store = fleet(spike_host="web03")
+    assert detect(store, hosts=["web04"])["findings"] == []
+    assert detect(store, hosts=["WEB03"])["findings"][0]["host"] == "web03"
+
+
+def test_filling_disk_and_stale_host():
+    # +0.5% a minute from 51%: about 0.4h to full at the end of the hour
+    report = detect(fleet(disk_growth=0.5, missing_host="web07"), metric="disk")
+    assert [f["host"] for f in report["filling"]] == ["web12"]
+    assert 0 < report["filling"][0]["eta_hours"] < 2
+    assert report["stale"] == ["web07"]
+
+
+def test_peer_groups_need_enough_members():
+    groups = {"all": HOSTS, "db": ["web01", "web02"], "front": HOSTS[:6]}
+    assert peer_groups(["web01", "web10"], groups) == ["front", "fleet"]
@@ -0,0 +1,46 @@
+"""ToolResultCache, and tool failures never being cached."""
+import sys
+
+import pytest
+
+from conftest import ECHO_SERVER
+from mcp_cache import ToolResultCache
+from mcp_client import LinuxMCPClient, MCPClientError, MCPToolError
+from mcp_fleet import run_fleet
+
+
+@pytest.fixture
+def echo():
+    client = LinuxMCPClient(sys.executable, args=[ECHO_SERVER], timeout=10)
+    yield client
+    client.close()
+
+
+def test_put_get_and_key_ignores_host_case():
+    cache = ToolResultCache({"echo": 60})
+    cache.put("echo", {"host": "Web01"}, "out")
+    assert cache.get("echo", {"host": "web01"}) == "out"
+    assert cache.get("echo", {"host": "web02"}) is None
+
+
+def test_uncacheable_tool_is_not_stored():
+    cache = ToolResultCache({"echo": 0})
+    cache.put("echo", {}, "out")
+    assert cache.get("echo", {}) is None
+
+
+def test_is_error_result_raises_tool_error(echo):
+    with pytest.raises(MCPToolError, match="boom"):
+        echo.call_tool("echo", {"fail": "boom"})
+    assert issubclass(MCPToolError, MCPClientError)  # Tool wrappers catch MCPClientError
+
+
+def test_failed_calls_are_not_cached(echo):
+    cache = ToolResultCache({"echo": 3600})
+    results = run_fleet(echo, "echo", ["ok-host"], cache=cache)
+    assert results[0]["ok"]
+    assert cache.get("echo", {"host": "ok-host"}) is not None
+
+    results = run_fleet(echo, "echo", ["bad-host"], {"fail": "ssh refused"}, cache=cache)
+    assert not results[0]["ok"] and "ssh refused" in results[0]["error"]
+    assert cache.get("echo", {"host": "bad-host", "fail": "ssh refused"}) is None
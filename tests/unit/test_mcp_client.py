@@ -0,0 +1,239 @@
+"""LinuxMCPClient and its in-process wrappers against the echo server."""
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from conftest import ECHO_SERVER
+from mcp_client import (
+    HostLimitedMCPClient,
+    LinuxMCPClient,
+    MCPClientError,
+    MCPServerExitedError,
+    MCPToolError,
+    SingleFlightMCPClient,
+    ToolCallBatcher,
+)
+
+
+@pytest.fixture
+def echo():
+    client = LinuxMCPClient(sys.executable, args=[ECHO_SERVER], timeout=10)
+    yield client
+    client.close()
+
+
+def test_concurrent_calls_each_get_their_own_response(echo):
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda n: echo.call_tool("echo", {"n": n}), range(40)))
+    assert [json.loads(r)["n"] for r in results] == list(range(40))
+    assert echo.stats()["pending"] == 0
+
+
+def test_server_exit_fails_in_flight_and_later_calls(echo):
+    echo.list_tools()
+    started = time.monotonic()
+    with pytest.raises(MCPServerExitedError, match="code 3"):
+        echo.call_tool("echo", {"exit": 3})
+    assert time.monotonic() - started < 5  # Failed on EOF, not on the 10s timeout
+    assert not echo.alive
+    with pytest.raises(MCPServerExitedError):
+        echo.call_tool("echo", {})
+    assert echo.stats()["pending"] == 0
+
+
+def test_timeout_sends_cancelled_and_drops_the_late_response(echo):
+    echo.list_tools()
+    with pytest.raises(MCPClientError, match="Timeout"):
+        echo.call_tool("echo", {"delay": 0.4}, timeout=0.1)
+    assert echo.stats()["cancelled_requests"] == 1
+    # The server answers in order: the late response comes first, then the cancel is read
+    cancelled = json.loads(echo.call_tool("echo", {"cancelled": True}))
+    assert cancelled == [3]  # Request IDs: 1 initialize, 2 tools/list, 3 the timed-out call
+    stats = echo.stats()
+    assert stats["dropped_responses"] == 1 and stats["pending"] == 0
+
+
+def test_call_within_its_timeout_is_not_cancelled(echo):
+    assert json.loads(echo.call_tool("echo", {"delay": 0.1}, timeout=5)) == {"delay": 0.1}
+    assert echo.stats()["cancelled_requests"] == 0
+
+
+def test_standard_dialect_comes_from_the_tools_capability(echo):
+    echo.call_tool("echo", {})
+    assert echo.dialect == "standard"
+    methods = json.loads(echo.call_tool("echo", {"methods": True}))
+    assert methods == ["initialize", "tools/call", "tools/call"]
+
+
+def test_legacy_dialect_is_detected_once_then_reused():
+    client = LinuxMCPClient(sys.executable, args=[ECHO_SERVER, "--legacy"], timeout=10)
+    try:
+        assert client.dialect is None
+        assert [t["name"] for t in client.list_tools()] == ["echo"]
+        assert client.dialect == "legacy"
+        assert json.loads(client.call_tool("echo", {"n": 1})) == {"n": 1}
+        methods = json.loads(client.call_tool("echo", {"methods": True}))
+        assert methods == ["initialize", "tools/list", "listTools", "callTool", "callTool"]
+        assert client.stats()["calls_legacy_dialect"] == 3
+    finally:
+        client.close()
+
+
+@pytest.mark.parametrize("flags, batch", [([], False), (["--batch"], True)])
+def test_round_is_a_batch_only_when_the_protocol_has_batches(flags, batch):
+    client = LinuxMCPClient(sys.executable, args=[ECHO_SERVER] + flags, timeout=10)
+    try:
+        client.call_tool("echo", {})  # Settles the dialect
+        assert client.supports_batch is batch
+        results = client.call_tools_batch([("echo", {"n": n}) for n in range(4)] + [("echo", {"fail": "no"})])
+        assert [json.loads(r)["n"] for r in results[:4]] == [0, 1, 2, 3]
+        assert isinstance(results[4], MCPToolError)
+        stats = client.stats()
+        assert (stats["batch_rounds"], stats["pipelined_rounds"]) == ((1, 0) if batch else (0, 1))
+    finally:
+        client.close()
+
+
+def test_batched_call_keeps_its_own_timeout(echo):
+    echo.call_tool("echo", {})
+    started = time.monotonic()
+    results = echo.call_tools_batch([("echo", {"delay": 0.6}, None, 5), ("echo", {"n": 1}, None, 0.2)])
+    # The server answers in order, so the short call times out behind the slow one
+    assert isinstance(results[1], MCPClientError) and "Timeout" in str(results[1])
+    assert json.loads(results[0]) == {"delay": 0.6}
+    assert time.monotonic() - started < 2
+
+
+def test_batcher_sends_a_lone_call_right_away(echo):
+    batcher = ToolCallBatcher(echo, window=1.0)
+    started = time.monotonic()
+    assert json.loads(batcher.call_tool("echo", {"n": 1})) == {"n": 1}
+    assert time.monotonic() - started < 0.5  # Didn't wait for the 1s window
+    assert echo.stats()["pipelined_rounds"] == 0
+
+
+def test_batcher_groups_concurrent_calls_into_rounds(echo):
+    echo.call_tool("echo", {})
+    batcher = ToolCallBatcher(echo, window=0.05)
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        results = list(executor.map(lambda n: batcher.call_tool("echo", {"n": n, "delay": 0.05}), range(6)))
+    assert [json.loads(r)["n"] for r in results] == list(range(6))
+    assert echo.stats()["pipelined_rounds"] >= 1
+
+
+def test_batcher_honors_each_callers_timeout(echo):
+    echo.call_tool("echo", {})
+    batcher = ToolCallBatcher(echo, window=0.05)
+    slow = ThreadPoolExecutor(max_workers=1).submit(batcher.call_tool, "echo", {"delay": 0.8})
+    time.sleep(0.1)
+    started = time.monotonic()
+    with pytest.raises(MCPClientError, match="Timeout"):
+        batcher.call_tool("echo", {"n": 1}, timeout=0.2)
+    assert time.monotonic() - started < 0.6
+    assert json.loads(slow.result(timeout=5)) == {"delay": 0.8}
+
+
+def test_single_flight_shares_one_request_between_identical_calls(echo):
+    echo.call_tool("echo", {})
+    shared = SingleFlightMCPClient(echo)
+    events = []
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        first = executor.submit(shared.call_tool, "echo", {"host": "web01", "delay": 0.4})
+        time.sleep(0.1)
+        second = executor.submit(shared.call_tool, "echo", {"host": "WEB01", "delay": 0.4}, None, events.append)
+        other = executor.submit(shared.call_tool, "echo", {"host": "web02", "delay": 0.4})
+        assert first.result() == second.result()
+        other.result()
+    assert shared.stats()["coalesced_calls"] == 1
+    assert any(e["type"] == "progress" for e in events)  # The follower sees the leader's progress
+    methods = json.loads(echo.call_tool("echo", {"methods": True}))
+    assert methods.count("tools/call") == 1 + 2 + 1  # Warm-up, web01 once, web02, this call
+
+
+def test_single_flight_shares_errors_and_keeps_nothing(echo):
+    shared = SingleFlightMCPClient(echo)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        calls = [executor.submit(shared.call_tool, "echo", {"fail": "down", "delay": 0.3})]
+        time.sleep(0.1)
+        calls.append(executor.submit(shared.call_tool, "echo", {"fail": "down", "delay": 0.3}))
+        for call in calls:
+            with pytest.raises(MCPToolError, match="down"):
+                call.result()
+    assert shared._flights == {}
+    assert json.loads(shared.call_tool("echo", {"n": 1})) == {"n": 1}
+
+
+class Counting:
+    """Wraps a client and records the most calls it ever had running at once, per host and in all."""
+
+    def __init__(self, client):
+        self.client, self.running, self.peak = client, Counter(), Counter()
+        self.lock = threading.Lock()
+
+    def call_tool(self, name, arguments, timeout=None, on_progress=None):
+        host = arguments.get("host", "")
+        with self.lock:
+            self.running[host] += 1
+            self.peak[host] = max(self.peak[host], self.running[host])
+            self.peak["*"] = max(self.peak["*"], sum(self.running.values()))
+        try:
+            return self.client.call_tool(name, arguments, timeout=timeout, on_progress=on_progress)
+        finally:
+            with self.lock:
+                self.running[host] -= 1
+
+    def stats(self):
+        return self.client.stats()
+
+
+def test_host_limit_runs_one_hosts_calls_one_at_a_time_in_arrival_order(echo):
+    echo.call_tool("echo", {})
+    inner = Counting(echo)
+    limited = HostLimitedMCPClient(inner, per_host=1)
+    finished, events = [], []
+
+    def call(n, host="web01"):
+        limited.call_tool("echo", {"host": host, "n": n, "delay": 0.1}, on_progress=events.append)
+        finished.append(n)
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        calls = []
+        for n in range(4):
+            calls.append(executor.submit(call, n))
+            time.sleep(0.03)
+        calls += [executor.submit(call, 10, "web02"), executor.submit(call, 20, "")]  # Local calls are not limited
+        for future in calls:
+            future.result()
+    assert [n for n in finished if n < 10] == [0, 1, 2, 3]
+    assert inner.peak["web01"] == 1 and inner.peak["web02"] == 1
+    assert inner.peak[""] == 1 and sum(inner.running.values()) == 0
+    stats = limited.stats()
+    assert stats["host_queued_calls"] == 3 and stats["host_queued_now"] == 0  # web02 and local never queued
+    waits = [e["message"] for e in events if e["type"] == "log" and "free slot" in e["message"]]
+    assert waits == ["waiting for a free slot on web01"] * 3
+
+
+def test_host_limit_lets_other_hosts_run_alongside(echo):
+    inner = Counting(echo)
+    limited = HostLimitedMCPClient(inner, per_host=1)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda h: limited.call_tool("echo", {"host": h, "delay": 0.2}), ["web01", "web02", "web03"]))
+    assert limited.stats()["host_queued_calls"] == 0
+    assert inner.peak["*"] == 3
+
+
+def test_host_limit_times_out_waiting_for_a_slot(echo):
+    limited = HostLimitedMCPClient(echo, per_host=1)
+    slow = ThreadPoolExecutor(max_workers=1).submit(limited.call_tool, "echo", {"host": "web01", "delay": 0.8})
+    time.sleep(0.1)
+    started = time.monotonic()
+    with pytest.raises(MCPClientError, match="free slot on web01"):
+        limited.call_tool("echo", {"host": "WEB01"}, timeout=0.2)
+    assert time.monotonic() - started < 0.6
+    slow.result(timeout=5)
+    assert json.loads(limited.call_tool("echo", {"host": "web01", "n": 1}))["n"] == 1  # The slot was freed
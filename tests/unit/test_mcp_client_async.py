@@ -0,0 +1,80 @@
+"""AsyncLinuxMCPClient over stdio: calls, fan-out and every way the server can go away."""
+import asyncio
+import json
+import sys
+
+import pytest
+
+import mcp_client_async
+from conftest import ECHO_SERVER
+from mcp_client import MCPClientError, MCPServerExitedError
+from mcp_client_async import AsyncLinuxMCPClient
+
+
+def run(coro_fn, **kwargs):
+    """Start an echo client, run coro_fn(client) and always close it."""
+
+    async def main():
+        client = await AsyncLinuxMCPClient.stdio(sys.executable, args=[ECHO_SERVER], timeout=10, **kwargs)
+        try:
+            return await coro_fn(client)
+        finally:
+            await client.close()
+
+    return asyncio.run(main())
+
+
+def test_call_many_keeps_input_order():
+    async def body(client):
+        return await client.call_many([("echo", {"n": n}) for n in range(10)], max_concurrency=4)
+
+    assert [json.loads(r)["n"] for r in run(body)] == list(range(10))
+
+
+def test_non_object_json_lines_are_skipped():
+    async def body(client):
+        first = await client.call_tool("echo", {"noise": 1})
+        return first, await client.call_tool("echo", {"n": 2})
+
+    first, second = run(body)
+    assert json.loads(first) == {"noise": 1} and json.loads(second) == {"n": 2}
+
+
+def test_server_exit_fails_pending_and_rejects_new_requests():
+    async def body(client):
+        await client.list_tools()
+        with pytest.raises(MCPServerExitedError, match="code 4"):
+            await client.call_tool("echo", {"exit": 4})
+        with pytest.raises(MCPServerExitedError):
+            await asyncio.wait_for(client.call_tool("echo", {}), 2)
+
+    run(body)
+
+
+def test_line_over_the_limit_is_a_client_error(monkeypatch):
+    monkeypatch.setattr(mcp_client_async, "_STDIO_LINE_LIMIT", 1024)
+
+    async def body(client):
+        await client.list_tools()
+        with pytest.raises(MCPServerExitedError, match="stdout failed"):
+            await client.call_tool("echo", {"pad": "x" * 4096})
+
+    run(body)
+
+
+def test_timeout_and_tool_error_are_client_errors():
+    async def body(client):
+        with pytest.raises(MCPClientError, match="Timeout"):
+            await client.call_tool("echo", {"delay": 1}, timeout=0.1)
+        with pytest.raises(MCPClientError, match="boom"):
+            await client.call_tool("echo", {"fail": "boom"})
+
+    run(body)
+
+
+def test_spawn_failure_is_a_client_error():
+    async def main():
+        await AsyncLinuxMCPClient.stdio("/nonexistent/linux-mcp-server")
+
+    with pytest.raises(MCPClientError, match="Could not start MCP server"):
+        asyncio.run(main())
@@ -0,0 +1,89 @@
+"""Delta mode: repeats in the same run are only their changes; later ones keep the output below them."""
+import json
+
+from mcp_delta import ObservationLog, change_summary
+
+MEMORY = {"ram": {"total": 16000, "used": 8123, "free": 7877}, "swap": {"total": 2048, "used": 0}}
+PROCESSES = """processes: 3; top 3 by CPU/memory (pid user cpu% mem% stat command)
+4211 postgres 38.2 6.1 Rs postgres: app appdb
+5120 app 12.0 20.5 Sl java -jar app.jar
+812 root 0 0.1 Ss sshd"""
+
+
+def test_first_result_is_unchanged():
+    log = ObservationLog({"get_memory_information"})
+    assert log.observe("get_memory_information", {"host": "web01"}, json.dumps(MEMORY)) == json.dumps(MEMORY)
+
+
+def test_no_change_json_keeps_every_field():
+    log = ObservationLog({"get_memory_information"})
+    text = json.dumps(MEMORY)
+    log.observe("get_memory_information", {"host": "web01"}, text)
+    shown = log.observe("get_memory_information", {"host": "web01"}, text)
+    summary, output = shown.split("\n", 1)
+    assert summary.startswith("[no change since the last check")
+    assert json.loads(output) == MEMORY
+    assert log.summaries == 1
+
+
+def test_changed_json_field_shows_old_and_new_and_full_output():
+    log = ObservationLog({"get_memory_information"})
+    log.observe("get_memory_information", {"host": "web01"}, json.dumps(MEMORY))
+    later = json.loads(json.dumps(MEMORY))
+    later["ram"]["used"], later["ram"]["free"] = 9000, 7000
+    shown = log.observe("get_memory_information", {"host": "web01"}, json.dumps(later))
+    assert "~ ram.used: 8123->9000 (+877)" in shown
+    assert shown.endswith(json.dumps(later))
+
+
+def test_rows_changed_new_and_gone():
+    later = PROCESSES.replace("38.2", "91.0").replace("812 root 0 0.1 Ss sshd", "900 root 5.0 0.2 R find /")
+    summary = change_summary(PROCESSES, later, 120)
+    assert summary.splitlines()[0].startswith("[3 rows changed/new/gone since the last check")
+    assert "~ 4211 postgres 38.2->91.0 6.1 Rs postgres: app appdb" in summary
+    assert "+ 900 root 5.0 0.2 R find /" in summary
+    assert "- 812 root 0 0.1 Ss sshd" in summary
+
+
+def test_summary_is_capped_and_counts_the_rest():
+    old = "\n".join(f"{pid} app 1.0 1.0 S worker" for pid in range(100, 200))
+    new = "\n".join(f"{pid} app 2.0 1.0 S worker" for pid in range(100, 200))
+    summary = change_summary(old, new, 60, max_chars=300)
+    assert len(summary) <= 300
+    assert summary.splitlines()[-1].endswith("more changes")
+
+
+def test_other_hosts_tools_and_clear_are_separate():
+    log = ObservationLog({"list_processes"})
+    log.observe("list_processes", {"host": "web01"}, PROCESSES)
+    assert log.observe("list_processes", {"host": "web02"}, PROCESSES) == PROCESSES
+    assert log.observe("get_disk_usage", {"host": "web01"}, PROCESSES) == PROCESSES
+    log.clear()
+    assert log.observe("list_processes", {"host": "web01"}, PROCESSES) == PROCESSES
+
+
+def test_repeat_in_the_same_run_is_only_the_changes():
+    log = ObservationLog({"list_processes"})
+    assert not log.seen("list_processes", {"host": "web01"})
+    log.observe("list_processes", {"host": "web01"}, PROCESSES, context=1)
+    assert log.seen("list_processes", {"host": "WEB01"}) and not log.seen("get_disk_usage", {"host": "web01"})
+    same = log.observe("list_processes", {"host": "web01"}, PROCESSES, context=1)
+    assert same.startswith("[no change since the last check") and same.endswith("same output]")
+    later = PROCESSES.replace("38.2", "91.0")
+    shown = log.observe("list_processes", {"host": "web01"}, later, context=1)
+    assert shown.splitlines() == [
+        "[1 rows changed/new/gone since the last check 0s ago, 3 unchanged; the rest as in the earlier output]",
+        "~ 4211 postgres 38.2->91.0 6.1 Rs postgres: app appdb",
+    ]
+    assert (log.deltas, log.summaries) == (2, 0)
+
+
+def test_repeat_in_a_later_run_or_with_too_many_changes_keeps_the_output():
+    log = ObservationLog({"list_processes"}, summary_chars=150)
+    log.observe("list_processes", {"host": "web01"}, PROCESSES, context=1)
+    assert log.observe("list_processes", {"host": "web01"}, PROCESSES, context=2).endswith(PROCESSES)
+    later = "\n".join(line.replace(" 0", " 9").replace("6.1", "7.2").replace("20.5", "1.5")
+                      for line in PROCESSES.splitlines())
+    shown = log.observe("list_processes", {"host": "web01"}, later, context=2)
+    assert "more changes" in shown and shown.endswith(later)  # A cut summary alone would lose changes
+    assert (log.deltas, log.summaries) == (0, 2)
@@ -0,0 +1,49 @@
+"""format_fleet: one line per host, failures first, identical output folded, budget shared."""
+import os
+
+from conftest import SAMPLES
+from mcp_fleet import MIN_HOST_CHARS, format_fleet
+
+with open(os.path.join(SAMPLES, "get_disk_usage.txt"), encoding="utf-8") as f:
+    DISK = f.read()
+
+
+def result(host, text="", error="", seconds=0.1, cached=False, age=None):
+    return {"host": host, "ok": not error, "seconds": seconds, "text": text, "error": error,
+            "cached": cached, "age": age}
+
+
+def test_failures_come_first_and_identical_output_is_folded():
+    results = [result("web01", DISK), result("web02", error="Timeout after 30s"), result("web03", DISK)]
+    lines = format_fleet("get_disk_usage", results).splitlines()
+    assert lines[0].startswith("get_disk_usage on 3 hosts: 2 ok, 1 failed; latency p50 100ms")
+    assert lines[2] == "web02 FAILED 100 | Timeout after 30s"
+    assert lines[3].startswith("web01 ok 100 | filesystems: ")
+    assert lines[4] == "web03 ok 100 | same as web01"
+
+
+def test_column_legend_is_said_once_in_the_header():
+    other = DISK.replace("/dev/sda1", "/dev/vda1")
+    lines = format_fleet("get_disk_usage", [result("web01", DISK), result("web02", other)]).splitlines()
+    assert lines[1] == "(host status ms | output (mount type size used avail use% device))"
+    assert "/dev/vda1" in lines[3] and all("(mount type" not in line for line in lines[2:])
+
+
+def test_cached_and_snapshot_results_show_where_they_came_from():
+    results = [result("web01", "a", cached=True), result("web02", "b", cached=True, age=7200),
+               result("web03", "c", seconds=0.25)]
+    lines = format_fleet("echo", results).splitlines()
+    assert lines[0].endswith("latency p50 250ms, max 250ms")  # Only live calls count
+    assert lines[2:] == ["web01 ok cached | a", "web02 ok snapshot:2h | b", "web03 ok 250 | c"]
+
+
+def test_distinct_outputs_share_the_budget():
+    results = [result(f"web{i:02d}", f"{i} " + "x" * 500) for i in range(10)]
+    text = format_fleet("echo", results, max_chars=1500)
+    assert len(text) <= 1500
+    bodies = [line.split(" | ", 1)[1] for line in text.splitlines()[2:]]
+    assert all(body.endswith("...") and len(body) >= MIN_HOST_CHARS for body in bodies)
+
+
+def test_empty_output_is_marked():
+    assert format_fleet("echo", [result("web01", "")]).splitlines()[2] == "web01 ok 100 | (No output)"
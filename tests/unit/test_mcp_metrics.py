@@ -0,0 +1,82 @@
+"""Window statistics against numpy's own reductions, and MetricStore ring-buffer wraparound."""
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from mcp_metrics import MetricStore, downsample, format_history, parse_metrics, window_stats  # noqa: E402
+
+
+def test_window_stats_match_numpy_on_rows_with_gaps():
+    rng = np.random.default_rng(3)
+    values = rng.normal(50, 10, size=(4, 30))
+    values[1, ::3] = np.nan
+    values[2, -5:] = np.nan
+    values[3, :] = np.nan
+    times = 1_700_000_000 + 60.0 * np.arange(30)
+    stats = window_stats(values, times)
+    assert list(stats["count"]) == [30, 20, 25, 0]
+    for row in range(3):
+        present = ~np.isnan(values[row])
+        v, hours = values[row, present], (times[present] - times[0]) / 3600
+        assert stats["min"][row] == pytest.approx(v.min())
+        assert stats["max"][row] == pytest.approx(v.max())
+        assert stats["mean"][row] == pytest.approx(v.mean())
+        assert stats["p95"][row] == pytest.approx(np.percentile(v, 95))
+        assert stats["last"][row] == pytest.approx(v[-1])
+        assert stats["slope"][row] == pytest.approx(np.polyfit(hours, v, 1)[0])
+    assert all(np.isnan(stats[key][3]) for key in ("min", "max", "mean", "p95", "last", "slope"))
+
+
+def test_slope_is_per_hour_and_needs_two_samples():
+    times = 1_700_000_000 + 600.0 * np.arange(7)  # One hour, every 10 minutes
+    values = np.array([10.0 + 2 * np.arange(7), [np.nan] * 6 + [5.0]])
+    stats = window_stats(values, times)
+    assert stats["slope"][0] == pytest.approx(12.0)  # +2 per 10 minutes
+    assert np.isnan(stats["slope"][1]) and stats["last"][1] == 5.0
+
+
+def test_downsample_averages_buckets_and_skips_gaps():
+    values = np.array([[1.0, 3.0, np.nan, 5.0, 7.0, 9.0]])
+    assert downsample(values, 3).tolist() == [[2.0, 5.0, 8.0]]
+    assert downsample(values, 10) is values
+
+
+def test_ring_buffer_wraps_and_keeps_time_order():
+    store = MetricStore(capacity=4, max_hosts=2)
+    start = time.time() - 600
+    for i in range(6):
+        column = store.begin_round(start + i * 60)
+        store.record(column, "web01", {"load_1m": float(i)})
+        if i != 4:
+            store.record(column, "WEB02", {"load_1m": 10.0 + i})
+    hosts, times, values = store.matrix("load_1m")
+    assert hosts == ["web01", "web02"]
+    assert (times - start).tolist() == [120, 180, 240, 300]  # Rounds 0 and 1 were overwritten
+    assert values[0].tolist() == [2, 3, 4, 5]
+    assert np.isnan(values[1, 2]) and values[1, 3] == 15  # Reused column was cleared before round 4
+    assert store.stats()["metric_rounds"] == 6
+    _, recent, _ = store.matrix("load_1m", seconds=400)
+    assert (recent - start).tolist() == [240, 300]
+
+
+def test_hosts_over_the_limit_are_dropped_and_counted():
+    store = MetricStore(capacity=4, max_hosts=1)
+    column = store.begin_round()
+    store.record(column, "", {"load_1m": 1.0, "mem_used_pct": 40.0})
+    store.record(column, "web09", {"load_1m": 2.0, "mem_used_pct": 50.0})
+    assert store.hosts == ["local"] and store.stats()["metric_dropped"] == 2
+
+
+def test_parse_metrics_and_history():
+    metrics = parse_metrics("get_memory_information", '{"ram": {"total": 1000, "available": 250}}')
+    assert metrics == {"mem_used_pct": 75.0}
+    assert parse_metrics("get_memory_information", "Error: ssh refused") == {}
+    store = MetricStore(capacity=8)
+    start = time.time() - 300
+    for i in range(4):
+        store.record(store.begin_round(start + i * 60), "web01", {"mem_used_pct": 70.0 + i})
+    history = format_history(store, "web01", "mem")
+    assert history.splitlines()[1].startswith("mem_used_pct: 70/73/71.5/")
+    assert format_history(store, "web02").startswith("Error: no samples for host 'web02'")
@@ -0,0 +1,160 @@
+"""mcp_pool wrappers against echo server subprocesses."""
+import json
+import sys
+import threading
+import time
+
+import pytest
+
+from conftest import ECHO_SERVER
+from mcp_client import LinuxMCPClient, MCPClientError, MCPServerExitedError
+from mcp_pool import HostShardedMCPClient, LinuxMCPClientPool, SupervisedMCPClient
+
+ARGS = [ECHO_SERVER]
+
+
+def test_pool_sends_concurrent_calls_to_the_least_loaded_member():
+    pool = LinuxMCPClientPool(sys.executable, args=ARGS, size=2)
+    try:
+        seen = []
+        threads = [threading.Thread(target=lambda: pool.call_tool("echo", {"delay": 0.4})) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)
+        seen.append(pool.in_flight())
+        for thread in threads:
+            thread.join()
+        assert seen == [[1, 1]]
+        assert pool.in_flight() == [0, 0]
+    finally:
+        pool.close()
+
+
+def test_pool_batch_goes_to_one_member():
+    pool = LinuxMCPClientPool(sys.executable, args=ARGS, size=2)
+    try:
+        results = pool.call_tools_batch([("echo", {"n": n}) for n in range(5)])
+        assert [json.loads(r)["n"] for r in results] == list(range(5))
+        assert sorted(m.stats()["pipelined_rounds"] for m in pool.members) == [0, 1]
+    finally:
+        pool.close()
+
+
+def test_pool_start_failure_closes_started_members():
+    started, lock = [], threading.Lock()
+
+    def factory(command, args=None, env=None):
+        with lock:
+            first = not started
+            if first:
+                started.append(LinuxMCPClient(command, args=args, env=env))
+        return started[0] if first else LinuxMCPClient("/nonexistent/linux-mcp-server")
+
+    with pytest.raises(MCPClientError, match="Could not start MCP server"):
+        LinuxMCPClientPool(sys.executable, args=ARGS, size=2, member_factory=factory)
+    assert started and started[0].proc.wait(timeout=5) is not None
+
+
+@pytest.fixture
+def sharded():
+    client = HostShardedMCPClient(sys.executable, args=ARGS, max_hosts=2, idle_timeout=0)
+    yield client
+    client.close()
+
+
+def test_sharded_gives_each_host_its_own_process(sharded):
+    sharded.call_tool("echo", {"host": "web01"})
+    sharded.call_tool("echo", {"host": "WEB01"})
+    sharded.call_tool("echo", {"host": "web02"})
+    sharded.call_tool("echo", {})  # No host: the default client
+    workers = sharded._workers
+    assert sharded.hosts() == ["web01", "web02"]
+    assert len({workers["web01"].client.proc.pid, workers["web02"].client.proc.pid, sharded.default.proc.pid}) == 3
+
+
+def test_sharded_slow_host_does_not_stall_others(sharded):
+    slow = threading.Thread(target=lambda: sharded.call_tool("echo", {"host": "slow", "delay": 1}))
+    slow.start()
+    time.sleep(0.2)
+    started = time.monotonic()
+    sharded.call_tool("echo", {"host": "fast"})
+    assert time.monotonic() - started < 0.5
+    slow.join()
+
+
+def test_sharded_evicts_least_recently_used_idle_host(sharded):
+    for host in ("web01", "web02", "web01", "web03"):
+        sharded.call_tool("echo", {"host": host})
+    assert sharded.hosts() == ["web01", "web03"]
+
+
+def test_sharded_restarts_a_dead_host_worker(sharded):
+    with pytest.raises(MCPClientError):
+        sharded.call_tool("echo", {"host": "web01", "exit": 1})
+    assert json.loads(sharded.call_tool("echo", {"host": "web01", "n": 1}))["n"] == 1
+
+
+def test_sharded_batch_splits_by_host(sharded):
+    calls = [("echo", {"host": h, "n": n}) for n, h in enumerate(["web01", "web02", "web01", ""])]
+    assert [json.loads(r)["n"] for r in sharded.call_tools_batch(calls)] == [0, 1, 2, 3]
+    assert sharded._workers["web01"].client.stats()["pipelined_rounds"] == 1
+
+
+def wait_for(predicate, seconds: float = 10):
+    deadline = time.monotonic() + seconds
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.02)
+
+
+def test_supervisor_fails_over_to_the_standby():
+    sup = SupervisedMCPClient(sys.executable, args=ARGS)
+    try:
+        wait_for(lambda: sup._standby is not None)
+        standby = sup._standby
+        with pytest.raises(MCPServerExitedError):
+            sup.call_tool("echo", {"exit": 1})  # Reached the server: not retried
+        wait_for(lambda: sup.active is standby)
+        assert json.loads(sup.call_tool("echo", {"n": 1}))["n"] == 1
+        assert sup.stats()["restarts"] == 1
+        wait_for(lambda: sup._standby is not None and sup._standby is not standby)
+    finally:
+        sup.close()
+
+
+def test_supervisor_retries_a_call_the_dead_server_never_got():
+    noticed = threading.Event()
+
+    class Lagging(LinuxMCPClient):
+        """Doesn't notice its server's exit until `noticed` is set, like right after a SIGKILL."""
+
+        @property
+        def alive(self) -> bool:
+            return not noticed.is_set() or LinuxMCPClient.alive.fget(self)
+
+        def _handle_exit(self):
+            noticed.wait(10)
+            super()._handle_exit()
+
+    sup = SupervisedMCPClient(sys.executable, args=ARGS, client_factory=Lagging)
+    try:
+        wait_for(lambda: sup._standby is not None)
+        killed = sup.active
+        killed.proc.kill()
+        killed.proc.wait()
+        assert json.loads(sup.call_tool("echo", {"n": 2}))["n"] == 2
+        assert sup.active is not killed and sup.restarts == 1
+    finally:
+        noticed.set()
+        sup.close()
+
+
+def test_supervisor_cold_starts_without_a_standby():
+    sup = SupervisedMCPClient(sys.executable, args=ARGS, standby=False)
+    try:
+        sup.active.proc.kill()
+        wait_for(lambda: not sup.active.alive)
+        assert json.loads(sup.call_tool("echo", {"n": 3}))["n"] == 3
+        assert sup.restarts == 1
+    finally:
+        sup.close()
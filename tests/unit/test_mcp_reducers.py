@@ -0,0 +1,108 @@
+"""Output reducers: compact tables of at most top-N rows that fit the caller's character budget."""
+import os
+
+import pytest
+
+from conftest import SAMPLES
+from mcp_reducers import REDUCERS, reduce_output
+
+# app.py default: min(MAX_TOOL_OUTPUT_CHARS, MODEL_CONTEXT_TOKENS * 0.12 * 4)
+SAFE_CHARS = 1966
+
+
+def sample(tool: str) -> str:
+    with open(os.path.join(SAMPLES, f"{tool}.txt"), encoding="utf-8") as f:
+        return f.read()
+
+
+TOOLS = sorted(f[: -len(".txt")] for f in os.listdir(SAMPLES) if f.endswith(".txt"))
+
+
+@pytest.mark.parametrize("tool", TOOLS)
+def test_reduced_sample_fits_budget(tool):
+    assert tool in REDUCERS
+    reduced = reduce_output(tool, sample(tool), 25, SAFE_CHARS)
+    assert len(reduced) <= SAFE_CHARS
+
+
+@pytest.mark.parametrize("tool", ["list_processes", "get_network_connections", "get_listening_ports",
+                                  "get_disk_usage"])
+def test_tables_drop_whole_rows_and_count_them(tool):
+    raw = sample(tool)
+    full = reduce_output(tool, raw, 25, 0)
+    budget = len(full) // 2
+    fitted = reduce_output(tool, raw, 25, budget)
+    assert len(fitted) <= budget
+    full, lines = full.splitlines(), fitted.splitlines()
+    assert len(lines) < len(full)
+    assert lines[0] == full[0] or tool == "list_processes"  # Processes header says how many are shown
+    kept = [line for line in lines if line in full]
+    assert len(kept) >= len(lines) - 2  # Whole rows only: at most the header and the "more" line differ
+    assert any("more" in line or line.startswith("other ") for line in lines)
+
+
+def test_services_name_only_failed_and_other_units():
+    reduced = reduce_output("list_services", sample("list_services"), 25, SAFE_CHARS)
+    lines = reduced.splitlines()
+    assert lines[0] == "services: 133 units; 2 failed, 22 running, 31 exited, 74 inactive, 1 other, 3 not-found"
+    assert "failed: dnf-makecache (dnf makecache), kdump (Crash recovery kernel arming)" in lines
+    assert "other: certbot-renew=activating/start" in lines
+    assert "sshd" not in reduced and "cloud-init" not in reduced  # Running and inactive units are counted only
+    assert lines[-1].startswith("Summary: ")
+
+
+def test_services_count_failed_units_past_top_n():
+    lines = reduce_output("list_services", sample("list_services"), 1, 0).splitlines()
+    assert "failed: dnf-makecache (dnf makecache)" in lines
+    assert "(+2 more failed/other units not listed)" in lines
+
+
+@pytest.mark.parametrize("tool", ["list_processes", "get_network_connections", "get_listening_ports",
+                                  "get_disk_usage"])
+def test_tables_stop_at_top_n_under_a_large_budget(tool):
+    raw = sample(tool)
+    assert reduce_output(tool, raw, 3, 100_000) == reduce_output(tool, raw, 3, 0)
+    lines = reduce_output(tool, raw, 3, 100_000).splitlines()
+    rows = [line for line in lines[1:] if not line.startswith(("(", "other "))]
+    assert len(rows) == 3 and len(lines) <= 6
+
+
+def test_processes_count_left_out_rows_in_other():
+    reduced = reduce_output("list_processes", sample("list_processes"), 25, 400)
+    header = reduced.splitlines()[0]
+    total, shown = header.split()[1], header.split("top ")[1].split()[0]
+    other = [line for line in reduced.splitlines() if line.startswith("other ")]
+    assert other and other[0].split()[1] == str(int(total) - int(shown))
+
+
+def test_processes_count_states_and_keep_top_n():
+    reduced = reduce_output("list_processes", sample("list_processes"), 5, 0)
+    assert reduced.splitlines()[0].startswith("processes: 193 (97 S, 95 I, 1 R); top 5 by CPU/memory")
+    assert reduced.splitlines()[-1].startswith("other 188 processes")
+
+
+def test_logs_keep_both_ends():
+    raw = sample("get_service_logs")
+    reduced = reduce_output("get_service_logs", raw, 25, SAFE_CHARS)
+    lines = [line for line in raw.splitlines() if line.strip()]
+    assert "entries omitted" in reduced
+    assert lines[-1] in reduced
+    assert len(reduced) <= SAFE_CHARS
+
+
+def test_logs_collapse_repeats():
+    raw = "\n".join(f"Oct 17 10:00:{i:02d} web01 sshd[{1000 + i}]: Connection closed by 10.0.0.9 port {50000 + i}"
+                    for i in range(40))
+    reduced = reduce_output("get_journal_logs", raw, 25, 0)
+    assert reduced.splitlines()[0] == "log: 40 lines, 1 after collapsing repeats (xN = similar lines)"
+    assert "(x40, last Oct 17 10:00:39)" in reduced
+
+
+def test_json_log_entries_are_read():
+    reduced = reduce_output("get_journal_logs", sample("get_journal_logs"), 25, SAFE_CHARS)
+    assert reduced.startswith("log: ") and '"entries"' not in reduced
+
+
+def test_unparseable_output_passes_through():
+    assert reduce_output("list_processes", "Error: permission denied", 25, 100) == "Error: permission denied"
+    assert reduce_output("no_reducer_tool", "x" * 5000, 25, 100) == "x" * 5000
@@ -0,0 +1,79 @@
+"""SnapshotStore save/load across reopening, max ages, and the collector refreshing only due snapshots."""
+import sys
+import time
+
+import pytest
+
+from conftest import ECHO_SERVER
+from mcp_client import LinuxMCPClient
+from mcp_snapshots import DEFAULT_SNAPSHOT_TOOLS, SnapshotCollector, SnapshotStore, format_age
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SnapshotStore(str(tmp_path / "snapshots.db"))
+    yield store
+    store.close()
+
+
+def test_snapshot_survives_reopening_the_file(tmp_path):
+    path = str(tmp_path / "sub" / "snapshots.db")
+    first = SnapshotStore(path)
+    first.put("get_system_information", {"host": "Web01"}, "Rocky Linux 9.4")
+    first.close()
+    second = SnapshotStore(path)
+    try:
+        text, age = second.get("get_system_information", {"host": "web01"})
+        assert text == "Rocky Linux 9.4" and 0 <= age < 5
+        assert second.stats() == {"snapshot_hits": 1, "snapshot_misses": 0, "snapshot_rows": 1, "snapshot_hosts": 1}
+    finally:
+        second.close()
+
+
+def test_put_replaces_and_keeps_the_latest(store):
+    store.put("list_services", {"host": "web01"}, "old")
+    store.put("list_services", {"host": "web01"}, "new")
+    assert store.get("list_services", {"host": "web01"})[0] == "new"
+    assert store.stats()["snapshot_rows"] == 1
+
+
+def test_errors_and_other_tools_are_not_stored(store):
+    store.put("get_system_information", {"host": "web01"}, "Error executing tool: ssh refused")
+    store.put("list_processes", {"host": "web01"}, "processes: 3")
+    assert store.age("get_system_information", {"host": "web01"}) is None
+    assert store.get("list_processes", {"host": "web01"}) is None
+    assert store.stats()["snapshot_rows"] == 0
+
+
+def test_too_old_snapshot_is_not_answered_but_has_an_age(store):
+    store.put("list_services", {"host": "web01"}, "services", taken=time.time() - 3600)
+    assert store.get("list_services", {"host": "web01"}) is None
+    assert not store.fresh("list_services", {"host": "web01"})
+    assert 3590 < store.age("list_services", {"host": "web01"}) < 3700
+    assert store.stats()["snapshot_misses"] == 1
+
+
+def test_format_age():
+    assert [format_age(s) for s in (-1, 45, 720, 3 * 3600 + 5, 2 * 86400)] == ["0s", "45s", "12m", "3h", "2d"]
+
+
+def test_collector_refreshes_only_due_snapshots(tmp_path):
+    only = {tool: 0 for tool in DEFAULT_SNAPSHOT_TOOLS}
+    only.update(get_hardware_information=86400, list_services=900)
+    store = SnapshotStore(str(tmp_path / "snapshots.db"), max_ages=only)
+    echo = LinuxMCPClient(sys.executable, args=[ECHO_SERVER], timeout=10)
+    collector = SnapshotCollector(echo, store, lambda: ["web01", "web02"], interval=1000)
+    try:
+        deadline = time.monotonic() + 10
+        while collector.rounds < 1:
+            assert time.monotonic() < deadline, "first round did not finish"
+            time.sleep(0.02)
+        assert collector.stats() == {"snapshot_rounds": 1, "snapshot_calls": 4, "snapshot_errors": 0}
+        assert store.get("get_hardware_information", {"host": "web02"})[0] == '{"host": "web02"}'
+        # 1000s until the next round: a 900s snapshot would be too old by then, a 1-day one not
+        collector.collect_once()
+        assert collector.stats()["snapshot_calls"] == 6
+    finally:
+        collector.close()
+        echo.close()
+        store.close()